@@ -0,0 +1,229 @@
+"""
+Bulk Gram Sahayak scheme recommendations over a claimant table.
+
+Reads FRAClaimantProfile records from CSV, Parquet or JSONL in chunks,
+dedupes identical profiles, evaluates eligibility for each chunk in one
+vectorized rule-engine pass and (optionally) asks Gemini for narratives with
+bounded concurrency. Each finished chunk is written as a Parquet part file
+and recorded in a checkpoint, so a crashed run resumes at the next chunk.
+
+CSV columns may hold nested fields as JSON strings (location, dependents,
+land_use_distribution) or as dotted columns such as location.district.
+
+Usage:
+    python batch_recommend.py claimants.csv output/recommendations
+    python batch_recommend.py claimants.parquet output/recommendations --narrative --concurrency 4
+"""
+
+import os
+import json
+import asyncio
+import hashlib
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional
+
+import pandas as pd
+
+from result_store import atomic_write_json
+from scheme_engine import SchemeRuleEngine, markdown_report
+
+PROFILE_FIELDS = [
+    "holder_name", "dependents", "social_category", "fra_right_type",
+    "land_use_primary", "land_use_distribution", "water_access", "location"
+]
+CHECKPOINT_FILE = "_checkpoint.json"
+DEFAULT_CHUNK_SIZE = 5000
+
+
+def _record(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Rebuild a nested profile from a flat row (dotted columns, JSON-encoded values)"""
+    record: Dict[str, Any] = {}
+    for key, value in row.items():
+        if value is None or (isinstance(value, float) and pd.isna(value)) or value == "":
+            continue
+        if isinstance(value, str) and value[:1] in "[{":
+            try:
+                value = json.loads(value)
+            except ValueError:
+                pass
+        if "." in key:
+            parent, child = key.split(".", 1)
+            record.setdefault(parent, {})[child] = value
+        else:
+            record[key] = value
+    return record
+
+
+def read_profiles(path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[List[Dict[str, Any]]]:
+    """Yield lists of profile records without loading the whole table"""
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield [_record(row) for row in batch.to_pylist()]
+    elif path.endswith(".csv"):
+        for frame in pd.read_csv(path, chunksize=chunk_size, dtype=str, keep_default_na=False):
+            yield [_record(row) for row in frame.to_dict("records")]
+    else:
+        chunk = []
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    chunk.append(json.loads(line))
+                if len(chunk) >= chunk_size:
+                    yield chunk
+                    chunk = []
+        if chunk:
+            yield chunk
+
+
+def profile_hash(profile: Dict[str, Any]) -> str:
+    """Hash of the profile fields, identical for duplicate claimant records"""
+    canonical = json.dumps({k: profile.get(k) for k in PROFILE_FIELDS}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class BatchRecommendationJob:
+    """
+    Resumable bulk recommendation run writing part-NNNNN.parquet files.
+
+    agent is a GramSahayakAgent, only needed when narratives are requested.
+    """
+
+    def __init__(self, input_path: str, output_dir: str, engine: SchemeRuleEngine, agent=None,
+                 id_field: str = "claim_id", chunk_size: int = DEFAULT_CHUNK_SIZE, concurrency: int = 4):
+        self.input_path = input_path
+        self.output_dir = output_dir
+        self.engine = engine
+        self.agent = agent
+        self.id_field = id_field
+        self.chunk_size = chunk_size
+        self.concurrency = concurrency
+        self.checkpoint_path = os.path.join(output_dir, CHECKPOINT_FILE)
+        self._narratives: Dict[str, str] = {}
+        os.makedirs(output_dir, exist_ok=True)
+
+    def _load_checkpoint(self) -> Dict[str, Any]:
+        if not os.path.exists(self.checkpoint_path):
+            return {"input": os.path.abspath(self.input_path), "chunk_size": self.chunk_size, "chunks_done": 0, "rows_done": 0}
+        with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+            checkpoint = json.load(f)
+        if checkpoint["input"] != os.path.abspath(self.input_path) or checkpoint["chunk_size"] != self.chunk_size:
+            raise ValueError(f"{self.output_dir} holds a run for {checkpoint['input']} "
+                             f"(chunk size {checkpoint['chunk_size']}); use a new output directory")
+        return checkpoint
+
+    def _part_path(self, index: int) -> str:
+        return os.path.join(self.output_dir, f"part-{index:05d}.parquet")
+
+    def _restore_narratives(self, chunks_done: int):
+        """Reuse narratives from finished parts so duplicates after a resume don't call the LLM again"""
+        for index in range(chunks_done):
+            part = pd.read_parquet(self._part_path(index), columns=["profile_hash", "user_report"])
+            self._narratives.update(zip(part["profile_hash"], part["user_report"]))
+
+    async def _narrate(self, unique: Dict[str, Dict[str, Any]], developer_json: Dict[str, Dict[str, Any]],
+                       executor: ThreadPoolExecutor) -> Dict[str, Optional[str]]:
+        """Gemini narratives for new profiles, at most `concurrency` calls in flight"""
+        loop = asyncio.get_event_loop()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        errors: Dict[str, Optional[str]] = {}
+
+        async def narrate(key: str):
+            async with semaphore:
+                try:
+                    text = await loop.run_in_executor(
+                        executor, self.agent._generate_narrative, unique[key], developer_json[key]
+                    )
+                    self._narratives[key] = text or markdown_report(unique[key], developer_json[key])
+                    errors[key] = None
+                except Exception as e:
+                    self._narratives[key] = markdown_report(unique[key], developer_json[key])
+                    errors[key] = str(e)
+
+        await asyncio.gather(*(narrate(key) for key in unique if key not in self._narratives))
+        return errors
+
+    def _process_chunk(self, index: int, records: List[Dict[str, Any]], executor: ThreadPoolExecutor) -> pd.DataFrame:
+        hashes = [profile_hash(record) for record in records]
+
+        # Evaluate each distinct profile once
+        unique: Dict[str, Dict[str, Any]] = {}
+        for key, record in zip(hashes, records):
+            unique.setdefault(key, record)
+        keys = list(unique)
+        developer_json = dict(zip(keys, self.engine.recommend([unique[k] for k in keys])))
+
+        errors: Dict[str, Optional[str]] = {}
+        if self.agent is not None:
+            errors = asyncio.run(self._narrate(unique, developer_json, executor))
+        else:
+            for key in keys:
+                self._narratives.setdefault(key, markdown_report(unique[key], developer_json[key]))
+
+        row_offset = index * self.chunk_size
+        rows = []
+        for i, (key, record) in enumerate(zip(hashes, records)):
+            analysis = developer_json[key]["scheme_analysis"]
+            rows.append({
+                "row": row_offset + i,
+                "claim_id": str(record.get(self.id_field, "")),
+                "holder_name": record.get("holder_name", ""),
+                "profile_hash": key,
+                "high_priority": [s["scheme_name"] for s in analysis["high_priority"]],
+                "medium_priority": [s["scheme_name"] for s in analysis["medium_priority"]],
+                "developer_json": json.dumps(developer_json[key], ensure_ascii=False),
+                "user_report": self._narratives[key],
+                "narrative_error": errors.get(key)
+            })
+        return pd.DataFrame(rows)
+
+    def run(self) -> Dict[str, Any]:
+        checkpoint = self._load_checkpoint()
+        self._restore_narratives(checkpoint["chunks_done"])
+        if checkpoint["chunks_done"]:
+            print(f"🔁 Resuming after {checkpoint['chunks_done']} chunks ({checkpoint['rows_done']} rows)")
+
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="gram-sahayak") as executor:
+            for index, records in enumerate(read_profiles(self.input_path, self.chunk_size)):
+                if index < checkpoint["chunks_done"]:
+                    continue
+
+                table = self._process_chunk(index, records, executor)
+
+                # Part first, then checkpoint: a crash in between only redoes this chunk
+                part_path = self._part_path(index)
+                table.to_parquet(f"{part_path}.tmp", index=False)
+                os.replace(f"{part_path}.tmp", part_path)
+                checkpoint["chunks_done"] = index + 1
+                checkpoint["rows_done"] += len(table)
+                atomic_write_json(self.checkpoint_path, checkpoint)
+                print(f"✅ Chunk {index}: {len(table)} rows, {table['profile_hash'].nunique()} distinct profiles")
+
+        return checkpoint
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk scheme recommendations for a claimant table")
+    parser.add_argument("profiles", help="CSV, Parquet or JSONL of FRAClaimantProfile records")
+    parser.add_argument("output_dir", help="Directory for part-*.parquet files and the checkpoint")
+    parser.add_argument("--id-field", default="claim_id", help="Column holding the claim id")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--narrative", action="store_true", help="Ask Gemini for a user report per distinct profile")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrent Gemini calls")
+    args = parser.parse_args()
+
+    agent = None
+    if args.narrative:
+        from test1 import GramSahayakAgent
+        agent = GramSahayakAgent()
+    engine = agent.rule_engine if agent else SchemeRuleEngine()
+
+    job = BatchRecommendationJob(args.profiles, args.output_dir, engine, agent=agent, id_field=args.id_field,
+                                 chunk_size=args.chunk_size, concurrency=args.concurrency)
+    checkpoint = job.run()
+    print(f"✅ {checkpoint['rows_done']} recommendations written to {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
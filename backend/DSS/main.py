@@ -2,13 +2,21 @@
 FRA Claimant Data Processing Agent using Gemini 2.5 - FIXED VERSION
 """
 import os
+import sys
 import json
 import google.generativeai as genai
 from dotenv import load_dotenv
 from typing import Dict, Any, Optional
 from models.schemas import FRAClaimantProfile, ProcessingRequest, ProcessingResponse
-from utils.helper import validate_and_parse_response, format_error_response, format_success_response
-from prompt import SYSTEM_PROMPT, USER_PROMPT_TEMPLATE
+from utils.helper import format_error_response, format_success_response
+from prompt import DOCUMENT_FIELDS_SYSTEM_PROMPT, DOCUMENT_FIELDS_TEMPLATE
+from prompt_assembly import model_registry, prompt_usage
+from profile_builder import FUZZY_FIELDS, build_profile, fallback_fields, fuzzy_fields_needed, parse_land_cover_text
+
+# Schema-enforced Gemini JSON output, shared with the OCR-NER classifier
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'OCR-NER'))
+from structured_output import gemini_schema, json_generation_config, generate_structured
+from single_flight import SingleFlight, text_key
 
 # Load environment variables
 load_dotenv()
@@ -25,23 +33,51 @@ class FRADataProcessor:
         # Configure Gemini
         genai.configure(api_key=self.api_key)
         
-        # Initialize the model
-        self.model = genai.GenerativeModel(
-            model_name="gemini-2.0-flash-exp",  # Fixed model name
-            system_instruction=SYSTEM_PROMPT
-        )
+        # Model for the fuzzy document fields (static system prompt, context-cached when possible)
+        self.model_name = "gemini-2.0-flash-exp"  # Fixed model name
         
-        # Generation config for consistent JSON output
-        self.generation_config = genai.types.GenerationConfig(
+        # JSON mode constrained to the FRAClaimantProfile fields the LLM fills
+        self.document_fields_schema = gemini_schema(FRAClaimantProfile, fields=FUZZY_FIELDS + ["social_category"])
+        self.generation_config = json_generation_config(
+            self.document_fields_schema,
             candidate_count=1,
             temperature=0.1,  # Low temperature for consistent output
-            max_output_tokens=2048,
+            max_output_tokens=1024,
+        )
+        
+        # Concurrent extractions for the same document share one Gemini call
+        self.in_flight = SingleFlight()
+    
+    def extract_document_fields(self, document_analysis: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Ask Gemini for the fields rules can't derive (holder name, dependents, location)
+        
+        Depends only on the document, so callers can cache it independently of land cover.
+        """
+        user_prompt = DOCUMENT_FIELDS_TEMPLATE.render(
+            fields=", ".join(fuzzy_fields_needed(document_analysis)),
+            document_analysis=document_analysis
+        )
+        prompt_usage("Document fields", user_prompt)
+        fields, _ = self.in_flight.do(
+            text_key(user_prompt), generate_structured,
+            model_registry.get(self.model_name, DOCUMENT_FIELDS_SYSTEM_PROMPT), user_prompt, FRAClaimantProfile,
+            generation_config=self.generation_config, schema=self.document_fields_schema
         )
+        return fields.model_dump(exclude_none=True, include=set(self.document_fields_schema["properties"]))
+    
+    def build_profile(self, document_analysis: Dict[str, Any], land_cover: Dict[str, float],
+                      document_fields: Optional[Dict[str, Any]] = None) -> FRAClaimantProfile:
+        """Rule-derived profile fields merged with the extracted document fields"""
+        return build_profile(document_analysis, land_cover, document_fields)
     
     def process_data(self, document_analysis: Dict[str, Any], land_cover_data: str) -> ProcessingResponse:
         """
         Process FRA claimant data and return structured profile
         
+        Land use, water access, right type and (when stated plainly) social
+        category come from local rules; Gemini is only asked for the fuzzy fields.
+        
         Args:
             document_analysis: Dictionary containing document analysis results
             land_cover_data: String containing land cover data
@@ -56,31 +92,24 @@ class FRADataProcessor:
                 land_cover_data=land_cover_data
             )
             
-            # Create the user prompt
-            user_prompt = USER_PROMPT_TEMPLATE.format(
-                document_analysis=json.dumps(request.document_analysis, indent=2),
-                land_cover_data=request.land_cover_data
-            )
+            try:
+                document_fields = self.extract_document_fields(request.document_analysis)
+                raw_response = json.dumps(document_fields, ensure_ascii=False)
+            except Exception as e:
+                print(f"⚠️ Gemini field extraction failed, using extracted fields: {e}")
+                document_fields = fallback_fields(request.document_analysis)
+                raw_response = None
             
-            # Generate response
-            response = self.model.generate_content(
-                user_prompt,
-                generation_config=self.generation_config
+            profile = self.build_profile(
+                request.document_analysis,
+                parse_land_cover_text(request.land_cover_data),
+                document_fields
             )
             
-            if not response.text:
-                return ProcessingResponse(
-                    success=False,
-                    error="No response generated from Gemini"
-                )
-            
-            # Parse and validate the response
-            profile = validate_and_parse_response(response.text)
-            
             return ProcessingResponse(
                 success=True,
                 data=profile,
-                raw_response=response.text
+                raw_response=raw_response
             )
             
         except Exception as e:
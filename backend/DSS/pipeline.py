@@ -0,0 +1,192 @@
+"""
+End-to-end DSS pipeline: document OCR -> FRA profile -> scheme analysis.
+
+Stages pass in-memory objects to each other instead of going through
+sample_doc.json / land_cover.txt / fra_profile_output.json, and each stage's
+output is cached under a hash of its inputs. Re-running a claim whose
+document hasn't changed skips OCR and the LLM field extraction (the rest of
+the profile is rule-based and rebuilt from the current land cover); an
+unchanged profile skips the scheme analysis. OCR and land cover (lookup or
+segmentation) run concurrently.
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import hashlib
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from result_store import ResultStore, LandCoverStore, land_cover_store, scheme_repository
+
+DSS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Top-level module names used by the DSS scripts that OCR-NER also defines
+_DSS_MODULE_NAMES = ("main", "test1", "prompt", "models", "utils")
+
+
+def load_dss_agents():
+    """
+    Import FRADataProcessor and GramSahayakAgent into the API process.
+
+    The DSS scripts import top-level "main", "utils", "models" and "prompt",
+    which clash with OCR-NER modules already on sys.path, so those entries
+    are swapped out while the DSS modules load and restored afterwards.
+    """
+    def dss_owned(name):
+        return name.split(".")[0] in _DSS_MODULE_NAMES
+
+    shadowed = {name: sys.modules.pop(name) for name in list(sys.modules) if dss_owned(name)}
+    sys.path.insert(0, DSS_DIR)
+    try:
+        from main import FRADataProcessor
+        from test1 import GramSahayakAgent
+    finally:
+        sys.path.remove(DSS_DIR)
+        for name in [n for n in sys.modules if dss_owned(n)]:
+            del sys.modules[name]
+        sys.modules.update(shadowed)
+    return FRADataProcessor, GramSahayakAgent
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class StageCache:
+    """Stage outputs keyed by a hash of (stage, version, inputs)"""
+
+    def __init__(self, store: Optional[ResultStore] = None):
+        self.store = store or ResultStore("pipeline_cache")
+
+    @staticmethod
+    def key(stage: str, version: str, inputs: Any) -> str:
+        payload = json.dumps([stage, version, inputs], sort_keys=True, default=str, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        record = self.store.get(key)
+        return record["output"] if record else None
+
+    def put(self, key: str, stage: str, output: Any):
+        self.store.put(key, {"stage": stage, "output": output, "created_at": datetime.now().isoformat()})
+
+
+class DSSPipeline:
+    """
+    Chains OCR, profile building and scheme analysis with per-stage caching.
+
+    ocr is a callable (document_path) -> document analysis dict in the shape
+    of /api/ocr results ({"extraction": ..., "classification": ...}).
+    The Gemini agents are created on first use.
+    """
+
+    # Bump when a stage's logic changes so stale cache entries are ignored
+    STAGE_VERSIONS = {"ocr": "1", "document_fields": "1", "schemes": "2"}
+
+    def __init__(self, ocr: Optional[Callable[[str], Dict[str, Any]]] = None,
+                 processor=None, scheme_agent=None, cache: Optional[StageCache] = None):
+        self.ocr = ocr
+        self._processor = processor
+        self._scheme_agent = scheme_agent
+        self.cache = cache or StageCache()
+
+    def _agents(self):
+        if self._processor is None or self._scheme_agent is None:
+            FRADataProcessor, GramSahayakAgent = load_dss_agents()
+            self._processor = self._processor or FRADataProcessor()
+            self._scheme_agent = self._scheme_agent or GramSahayakAgent()
+        return self._processor, self._scheme_agent
+
+    @property
+    def scheme_agent(self):
+        """GramSahayakAgent shared with the pipeline's scheme stage"""
+        return self._agents()[1]
+
+    def _document_fields(self, document_analysis: Dict[str, Any]) -> Dict[str, Any]:
+        processor, _ = self._agents()
+        return processor.extract_document_fields(document_analysis)
+
+    def _analyze_schemes(self, profile: Dict[str, Any]) -> Dict[str, Any]:
+        _, scheme_agent = self._agents()
+        result = scheme_agent.analyze_profile_with_search(profile_data=profile)
+        if not result.get("success"):
+            raise RuntimeError(f"Scheme stage failed: {result.get('error')}")
+        return result
+
+    async def _stage(self, name: str, inputs: Any, fn: Callable, *args, report: Dict[str, Any]) -> Any:
+        """Run fn off the event loop unless its output for these inputs is cached"""
+        start = time.perf_counter()
+        key = StageCache.key(name, self.STAGE_VERSIONS[name], inputs)
+        loop = asyncio.get_event_loop()
+
+        output = await loop.run_in_executor(None, self.cache.get, key)
+        cached = output is not None
+        if not cached:
+            output = await loop.run_in_executor(None, fn, *args)
+            await loop.run_in_executor(None, self.cache.put, key, name, output)
+
+        report[name] = {"cached": cached, "seconds": round(time.perf_counter() - start, 3)}
+        return output
+
+    async def run(self, claim_id: Optional[str] = None, document_path: Optional[str] = None,
+                  document_analysis: Optional[Dict[str, Any]] = None, land_cover: Optional[Dict[str, float]] = None,
+                  land_cover_source: Optional[Awaitable[Dict[str, float]]] = None) -> Dict[str, Any]:
+        """
+        Run the pipeline for one claim.
+
+        The document comes from document_analysis or is OCR'd from
+        document_path. Land cover comes from land_cover, the awaitable
+        land_cover_source (e.g. a segmentation call), or the stored result
+        for claim_id, in that order.
+        """
+        report: Dict[str, Any] = {}
+        loop = asyncio.get_event_loop()
+
+        async def resolve_document():
+            if document_analysis is not None:
+                return document_analysis
+            if not document_path:
+                raise ValueError("Provide document_analysis or a document path to OCR")
+            if self.ocr is None:
+                raise RuntimeError("OCR components not available")
+            document_hash = await loop.run_in_executor(None, file_sha256, document_path)
+            return await self._stage("ocr", document_hash, self.ocr, document_path, report=report)
+
+        async def resolve_land_cover():
+            if land_cover is not None:
+                return land_cover
+            if land_cover_source is not None:
+                return await land_cover_source
+            record = land_cover_store.get(claim_id) if claim_id else None
+            if record is None:
+                raise ValueError("No land cover given and none stored for this claim; run asset mapping first")
+            return record["land_cover_percentages"]
+
+        # OCR and land cover don't depend on each other
+        document, cover = await asyncio.gather(resolve_document(), resolve_land_cover())
+
+        # Only the fuzzy fields need the LLM and they depend on the document alone;
+        # the rest of the profile is rebuilt locally from the current land cover
+        document_fields = await self._stage("document_fields", document, self._document_fields, document, report=report)
+        processor, _ = self._agents()
+        profile = processor.build_profile(document, cover, document_fields).model_dump(exclude_none=True)
+        analysis = await self._stage("schemes", profile, self._analyze_schemes, profile, report=report)
+
+        # Index fresh analyses (or cached ones new to this claim) for /api/dss/analyze
+        if claim_id and (not report["schemes"]["cached"] or scheme_repository.get(claim_id=claim_id) is None):
+            await loop.run_in_executor(None, scheme_repository.save, analysis, claim_id)
+
+        return {
+            "claim_id": claim_id,
+            "land_cover": cover,
+            "profile": profile,
+            "scheme_analysis": analysis,
+            "stages": report
+        }
@@ -0,0 +1,155 @@
+"""
+Rule-based FRA claimant profile construction.
+
+Implements the mechanical DATA MAPPING RULES from prompt.SYSTEM_PROMPT
+(land use, water access, right type, and social category when the
+classification states it plainly) so only the fuzzy fields - holder name,
+dependents and location - need the LLM.
+"""
+
+import re
+from typing import Any, Dict, List, Optional
+
+from models.schemas import FRAClaimantProfile
+
+# Fields that still need the LLM to read through noisy OCR/NER output
+FUZZY_FIELDS = ["holder_name", "dependents", "location"]
+
+# Land-cover classes mapped to the categories of LandUseDistribution
+LAND_USE_CATEGORIES = {
+    "Agriculture land": "Agriculture",
+    "Tree": "Forest",
+    "Water": "Water",
+    "Building": "Settlement",
+    "Developed_Space": "Settlement",
+    "Road": "Settlement",
+    "Rangeland": "Other",
+    "Bareland": "Other",
+}
+
+# Clean labels for land_use_primary
+LAND_USE_LABELS = {
+    "Agriculture land": "Agriculture",
+    "Tree": "Forest",
+    "Developed_Space": "Developed Space",
+}
+
+RAIN_FED_WATER_THRESHOLD = 1.0  # percent
+
+# "Scheduled Tribes and Other Traditional Forest Dwellers (Recognition of Forest Rights) Act"
+ACT_TITLE = re.compile(r"\b(act|rules|recognition)\b")
+
+
+def parse_land_cover_text(land_cover_data: str) -> Dict[str, float]:
+    """Parse "Class: 12.34%" lines into {class: percent}"""
+    land_cover = {}
+    for line in land_cover_data.splitlines():
+        if ':' not in line:
+            continue
+        key, value = line.split(':', 1)
+        try:
+            land_cover[key.strip()] = float(value.strip().rstrip('%').strip())
+        except ValueError:
+            continue
+    return land_cover
+
+
+def land_use_primary(land_cover: Dict[str, float]) -> Optional[str]:
+    """Highest-percentage class, excluding Background"""
+    candidates = {k: v for k, v in land_cover.items() if k != "Background"}
+    if not candidates:
+        return None
+    top = max(candidates, key=candidates.get)
+    return LAND_USE_LABELS.get(top, top.replace("_", " "))
+
+
+def land_use_distribution(land_cover: Dict[str, float]) -> Dict[str, str]:
+    """Percentages grouped into Agriculture / Forest / Water / Settlement / Other"""
+    totals: Dict[str, float] = {}
+    for name, value in land_cover.items():
+        if name == "Background":
+            continue
+        category = LAND_USE_CATEGORIES.get(name, "Other")
+        totals[category] = totals.get(category, 0.0) + value
+    return {category: f"{value:.2f}%" for category, value in totals.items()}
+
+
+def water_access(land_cover: Dict[str, float]) -> Optional[str]:
+    if "Water" not in land_cover:
+        return None
+    if land_cover["Water"] < RAIN_FED_WATER_THRESHOLD:
+        return "Presumed Rain-fed"
+    return "Surface Water Available"
+
+
+def fra_right_type(classification: Dict[str, Any]) -> Optional[str]:
+    """Right type from classification.document_type"""
+    document_type = (classification or {}).get("document_type") or ""
+    lowered = document_type.lower()
+    if "community forest resource" in lowered or re.search(r"\bcfr\b", lowered):
+        return "Community Forest Resource Rights"
+    if "community" in lowered or re.search(r"\bcr\b", lowered):
+        return "Community Forest Rights"
+    if "individual" in lowered or re.search(r"\bifr\b", lowered):
+        return "Individual Forest Rights"
+    return document_type or None
+
+
+def social_category(classification: Dict[str, Any]) -> Optional[str]:
+    """
+    Category from classification.key_indicators when only one is named.
+
+    Indicators quoting the Act's title name both categories (often with OCR
+    typos) and are skipped; returns None when the indicators don't settle it.
+    """
+    found = set()
+    for indicator in (classification or {}).get("key_indicators") or []:
+        text = str(indicator).lower()
+        if ACT_TITLE.search(text):
+            continue
+        otfd = "traditional forest dweller" in text or "otfd" in text
+        tribe = "scheduled tribe" in text
+        if otfd and not tribe:
+            found.add("Other Traditional Forest Dweller")
+        elif tribe and not otfd:
+            found.add("Scheduled Tribe")
+    return found.pop() if len(found) == 1 else None
+
+
+def rule_fields(document_analysis: Dict[str, Any], land_cover: Dict[str, float]) -> Dict[str, Any]:
+    """All profile fields that can be derived without the LLM"""
+    classification = document_analysis.get("classification") or {}
+    fields = {
+        "social_category": social_category(classification),
+        "fra_right_type": fra_right_type(classification),
+        "land_use_primary": land_use_primary(land_cover),
+        "land_use_distribution": land_use_distribution(land_cover) or None,
+        "water_access": water_access(land_cover),
+    }
+    return {k: v for k, v in fields.items() if v is not None}
+
+
+def fuzzy_fields_needed(document_analysis: Dict[str, Any]) -> List[str]:
+    """Fields the LLM has to fill for this document"""
+    fields = list(FUZZY_FIELDS)
+    if social_category(document_analysis.get("classification") or {}) is None:
+        fields.append("social_category")
+    return fields
+
+
+def fallback_fields(document_analysis: Dict[str, Any]) -> Dict[str, Any]:
+    """Best-effort fuzzy fields from extracted_fields, used when the LLM is unavailable"""
+    extracted = (document_analysis.get("extraction") or {}).get("extracted_fields") or {}
+    return {"holder_name": extracted.get("holder_name")} if extracted.get("holder_name") else {}
+
+
+def build_profile(document_analysis: Dict[str, Any], land_cover: Dict[str, float],
+                  document_fields: Optional[Dict[str, Any]] = None) -> FRAClaimantProfile:
+    """Merge LLM-extracted document fields with the rule-derived ones"""
+    fields = dict(document_fields or {})
+    rules = rule_fields(document_analysis, land_cover)
+    if fields.get("social_category") not in ("Scheduled Tribe", "Other Traditional Forest Dweller"):
+        fields.pop("social_category", None)
+    # Rule-derived values win; the LLM only fills what the rules couldn't
+    fields.update(rules)
+    return FRAClaimantProfile(**{k: v for k, v in fields.items() if k in FRAClaimantProfile.model_fields})
@@ -0,0 +1,109 @@
+"""
+Prompt assembly for the DSS Gemini agents.
+
+Templates are parsed once and rendered by concatenation, with dict/list
+values serialized as compact JSON (no indentation or padding, which only
+costs tokens). System instructions are static, so each (model, instruction)
+pair gets one GenerativeModel per process, backed by a Gemini context cache
+when the instruction is long enough for caching to pay off. prompt_usage()
+reports the prompt token count of each call.
+"""
+
+import os
+import json
+import time
+import threading
+from datetime import timedelta
+from string import Formatter
+from typing import Any, Dict, Optional, Tuple
+
+import google.generativeai as genai
+
+try:
+    from google.generativeai import caching
+except ImportError:  # google-generativeai < 0.7 has no context caching
+    caching = None
+
+# Gemini rejects context caches below a model-specific minimum size
+CONTEXT_CACHE_MIN_TOKENS = int(os.getenv("GEMINI_CONTEXT_CACHE_MIN_TOKENS", "4096"))
+CONTEXT_CACHE_TTL = int(os.getenv("GEMINI_CONTEXT_CACHE_TTL", "3600"))  # seconds
+
+
+def compact_json(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token) for when the API doesn't report usage"""
+    return max(1, len(text) // 4)
+
+
+class PromptTemplate:
+    """A str.format-style template parsed once"""
+
+    def __init__(self, template: str):
+        self.template = template
+        self._parts = [(literal, field) for literal, field, _, _ in Formatter().parse(template)]
+
+    def render(self, **values: Any) -> str:
+        parts = []
+        for literal, field in self._parts:
+            parts.append(literal)
+            if field is not None:
+                value = values[field]
+                parts.append(value if isinstance(value, str) else compact_json(value))
+        return "".join(parts)
+
+
+class ModelRegistry:
+    """One GenerativeModel per (model name, system instruction), context-cached when large enough"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._models: Dict[Tuple[str, str], Tuple[Any, float]] = {}
+
+    def _create(self, model_name: str, system_instruction: str) -> Tuple[Any, float]:
+        if caching is not None and estimate_tokens(system_instruction) >= CONTEXT_CACHE_MIN_TOKENS:
+            try:
+                cached = caching.CachedContent.create(
+                    model=model_name,
+                    system_instruction=system_instruction,
+                    ttl=timedelta(seconds=CONTEXT_CACHE_TTL)
+                )
+                # Recreate a minute before the cache expires on the server
+                return genai.GenerativeModel.from_cached_content(cached_content=cached), time.time() + CONTEXT_CACHE_TTL - 60
+            except Exception as e:
+                print(f"⚠️ Context cache unavailable for {model_name}, sending the system prompt with each call: {e}")
+        return genai.GenerativeModel(model_name=model_name, system_instruction=system_instruction), float("inf")
+
+    def get(self, model_name: str, system_instruction: str):
+        key = (model_name, system_instruction)
+        with self._lock:
+            model, expires = self._models.get(key, (None, 0.0))
+            if model is None or time.time() >= expires:
+                model, expires = self._create(model_name, system_instruction)
+                self._models[key] = (model, expires)
+            return model
+
+
+model_registry = ModelRegistry()
+
+
+def prompt_usage(label: str, prompt: str, response: Optional[Any] = None) -> Dict[str, Any]:
+    """
+    Prompt token counts of one call, from the response's usage metadata
+    when the SDK provides it (read after a stream is consumed), else estimated.
+    """
+    metadata = getattr(response, "usage_metadata", None) if response is not None else None
+    if metadata is not None and getattr(metadata, "prompt_token_count", None):
+        usage = {
+            "prompt_tokens": metadata.prompt_token_count,
+            "cached_tokens": getattr(metadata, "cached_content_token_count", 0) or 0,
+            "output_tokens": getattr(metadata, "candidates_token_count", 0) or 0,
+            "estimated": False
+        }
+    else:
+        usage = {"prompt_tokens": estimate_tokens(prompt), "cached_tokens": 0, "output_tokens": 0, "estimated": True}
+    print(f"🧮 {label} prompt: {usage['prompt_tokens']} tokens"
+          f"{' (estimated)' if usage['estimated'] else ''}, {usage['cached_tokens']} from context cache")
+    return usage
@@ -0,0 +1,88 @@
+"""
+Scheme recommendations shared by claimants with equivalent profiles.
+
+Claimants in a village often share social category, right type, land use,
+water access and district. The cache key is a canonical projection of those
+eligibility fields plus the rules the profile matched (which captures the
+land-cover thresholds); names, dependents and exact percentages are left
+out. Entries hold a templated developer_json and user report whose personal
+values are placeholders, so a hit only costs scheme_engine.personalize().
+"""
+
+import json
+import hashlib
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from result_store import ResultStore
+from scheme_engine import SchemeRuleEngine, PERSONAL_FIELDS
+
+KEY_FIELDS = ("social_category", "fra_right_type", "land_use_primary", "water_access")
+LOCATION_KEY_FIELDS = ("district", "state")
+
+# Land-use categories whose share is rendered through a {*_pct} placeholder
+_PCT_PLACEHOLDERS = {
+    "Agriculture": "agriculture_pct",
+    "Forest": "forest_pct",
+    "Water": "water_pct",
+    "Settlement": "settlement_pct",
+}
+
+
+def _canonical(value: Any) -> str:
+    return " ".join(str(value or "").split()).casefold()
+
+
+def template_profile(profile: Dict[str, Any]) -> Dict[str, Any]:
+    """The profile as shared by its cache entry: placeholders for personal values, no dependents"""
+    templated = {field: profile[field] for field in KEY_FIELDS if profile.get(field)}
+    templated["holder_name"] = "{holder_name}"
+    distribution = profile.get("land_use_distribution") or {}
+    if distribution:
+        templated["land_use_distribution"] = {
+            category: f"{{{_PCT_PLACEHOLDERS[category]}:.2f}}%"
+            for category in distribution if category in _PCT_PLACEHOLDERS
+        }
+    location = {k: v for k, v in (profile.get("location") or {}).items() if k in LOCATION_KEY_FIELDS and v}
+    if location:
+        templated["location"] = location
+    return templated
+
+
+class RecommendationCache:
+    """Templated recommendations keyed by canonical profile projection"""
+
+    def __init__(self, engine: SchemeRuleEngine, store: Optional[ResultStore] = None):
+        self.engine = engine
+        self.store = store or ResultStore("recommendation_cache")
+        # Rule or placeholder changes invalidate every entry
+        self._rules_digest = hashlib.sha256(
+            json.dumps([engine.rules, PERSONAL_FIELDS], sort_keys=True, ensure_ascii=False).encode("utf-8")
+        ).hexdigest()[:16]
+
+    def projection(self, profile: Dict[str, Any]) -> Dict[str, Any]:
+        location = profile.get("location") or {}
+        projection = {field: _canonical(profile.get(field)) for field in KEY_FIELDS}
+        projection.update({field: _canonical(location.get(field)) for field in LOCATION_KEY_FIELDS})
+        projection["matched_rules"] = self.engine.matched_rules(profile)
+        return projection
+
+    def key(self, profile: Dict[str, Any]) -> str:
+        payload = json.dumps([self._rules_digest, self.projection(profile)], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self.store.get(key)
+
+    def put(self, key: str, developer_json: Dict[str, Any], user_report: Optional[str] = None,
+            raw_response: Optional[str] = None):
+        """Store templated outputs; user_report is only set once a narrative was generated"""
+        self.store.put(key, {
+            "developer_json": developer_json,
+            "user_report": user_report,
+            "raw_response": raw_response,
+            "created_at": datetime.now().isoformat()
+        })
+
+    def stats(self) -> Dict[str, Any]:
+        return self.store.stats()
@@ -0,0 +1,452 @@
+"""
+Keyed result stores for per-claim DSS inputs and outputs.
+
+Each result is one JSON file named after its key (claim ID or asset-mapping
+task ID), written atomically via a temp file + rename so concurrent runs
+never see or clobber each other's data. Reads go through an in-memory cache,
+so repeated DSS requests for the same claim don't touch the disk.
+
+Scheme analyses keep their scheme_analysis_*.json files and are found
+through an index keyed by claim ID and claimant name, kept as a snapshot
+plus an append-only log.
+"""
+
+import os
+import re
+import json
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+RESULTS_DIR = os.getenv("DSS_RESULTS_DIR", os.path.join(os.path.dirname(__file__), "output"))
+RESULT_CACHE_SIZE = int(os.getenv("DSS_RESULT_CACHE_SIZE", "1024"))
+
+
+def safe_key(key: str) -> str:
+    """File-system safe form of a claim/task key"""
+    cleaned = re.sub(r"[^A-Za-z0-9_.-]+", "_", str(key)).strip("._")
+    if not cleaned:
+        raise ValueError(f"Invalid result key: {key!r}")
+    return cleaned
+
+
+def atomic_write_json(path: str, data: Any):
+    """Write JSON to path so readers see either the old or the new file, never a partial one"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+@contextmanager
+def file_lock(path: str):
+    """Exclusive lock across processes, held on a sidecar lock file"""
+    with open(path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class ResultStore:
+    """JSON documents keyed by claim/task ID with a read-through LRU cache"""
+
+    LATEST_FILE = "_latest.json"
+
+    def __init__(self, namespace: str, base_dir: str = RESULTS_DIR, cache_size: int = RESULT_CACHE_SIZE):
+        self.directory = os.path.join(base_dir, namespace)
+        self.cache_size = cache_size
+        os.makedirs(self.directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{safe_key(key)}.json")
+
+    def _remember(self, key: str, record: Dict[str, Any]):
+        with self._lock:
+            self._cache[key] = record
+            self._cache.move_to_end(key)
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def put(self, key: str, record: Dict[str, Any]) -> str:
+        """Atomically store a record under key and mark it as the latest; returns the file path"""
+        key = safe_key(key)
+        path = self._path(key)
+        # Keep the file, the latest pointer and the cache in the same order across threads
+        with self._write_lock:
+            atomic_write_json(path, record)
+            atomic_write_json(os.path.join(self.directory, self.LATEST_FILE), {"key": key})
+            self._remember(key, record)
+        return path
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Record for key from memory, falling back to its file"""
+        key = safe_key(key)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return self._cache[key]
+            self.misses += 1
+
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            return None
+        self._remember(key, record)
+        return record
+
+    def latest_key(self) -> Optional[str]:
+        try:
+            with open(os.path.join(self.directory, self.LATEST_FILE), "r", encoding="utf-8") as f:
+                return json.load(f).get("key")
+        except (OSError, ValueError):
+            return None
+
+    def latest(self) -> Optional[Dict[str, Any]]:
+        """Most recently stored record, for callers that don't pass a key"""
+        key = self.latest_key()
+        return self.get(key) if key else None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "directory": self.directory,
+            "cached": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+
+class LandCoverStore(ResultStore):
+    """Land cover percentages per claim, as produced by /api/asset-mapping/process"""
+
+    def __init__(self, base_dir: str = RESULTS_DIR, cache_size: int = RESULT_CACHE_SIZE):
+        super().__init__("land_cover", base_dir, cache_size)
+
+    def save(self, key: str, percentages: Dict[str, float], hectares: Optional[Dict[str, float]] = None,
+             total_hectares: Optional[float] = None, source: Optional[str] = None) -> str:
+        record = {
+            "key": safe_key(key),
+            "land_cover_percentages": percentages,
+            "land_cover_hectares": hectares,
+            "total_hectares": total_hectares,
+            "source": source,
+            "created_at": datetime.now().isoformat()
+        }
+        return self.put(key, record)
+
+    @staticmethod
+    def as_text(percentages: Dict[str, float]) -> str:
+        """Render land cover percentages in the "Class: value%" format the DSS prompts expect"""
+        return "\n".join(f"{name}: {value}%" for name, value in percentages.items())
+
+
+class SchemeAnalysisRepository:
+    """
+    Scheme analyses (GramSahayakAgent reports) indexed by claim ID and claimant.
+
+    The index maps each key to the newest scheme_analysis_*.json for it, so
+    lookups never list or stat the output directory. It is kept as a
+    compacted snapshot plus an append-only log: a save appends one line under
+    a cross-process file lock, so its cost doesn't grow with the number of
+    analyses, and the API and the CLI can save concurrently without losing
+    each other's entries. Readers replay only the log lines added since their
+    last look; the log is folded into a new snapshot every compact_after
+    saves. Deserialized payloads are kept in an LRU cache.
+    """
+
+    INDEX_FILE = "scheme_index.json"
+    LOCK_FILE = "scheme_index.lock"
+
+    def __init__(self, output_dir: str = RESULTS_DIR, cache_size: int = 256, compact_after: int = 1000):
+        self.output_dir = output_dir
+        self.index_path = os.path.join(output_dir, self.INDEX_FILE)
+        self.lock_path = os.path.join(output_dir, self.LOCK_FILE)
+        self.cache_size = cache_size
+        self.compact_after = compact_after
+        os.makedirs(output_dir, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._payloads: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._index: Optional[Dict[str, Any]] = None
+        self._index_mtime = None
+        self._generation = 0
+        self._log_offset = 0
+        self._log_entries = 0
+        self._lock_depth = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def claimant_key(name: str) -> str:
+        return safe_key(str(name).strip().replace(" ", "_").lower())
+
+    @staticmethod
+    def _empty_index() -> Dict[str, Any]:
+        return {"entries": {}, "by_claim": {}, "by_claimant": {}, "latest": None}
+
+    @contextmanager
+    def _file_lock(self):
+        """file_lock(), reentrant for this repository; the caller holds self._lock"""
+        if self._lock_depth:
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+            return
+        with file_lock(self.lock_path):
+            self._lock_depth = 1
+            try:
+                yield
+            finally:
+                self._lock_depth = 0
+
+    def _log_path(self, generation: Optional[int] = None) -> str:
+        generation = self._generation if generation is None else generation
+        return os.path.join(self.output_dir, f"scheme_index.{generation}.log")
+
+    @staticmethod
+    def _entry(payload: Dict[str, Any], claim_id: Optional[str]) -> Dict[str, Any]:
+        return {
+            "claim_id": claim_id,
+            "claimant_name": payload.get("claimant_name", ""),
+            "processing_timestamp": payload.get("processing_timestamp", "")
+        }
+
+    def _add_entry(self, index: Dict[str, Any], filename: str, entry: Dict[str, Any]):
+        index["entries"][filename] = entry
+
+        def newer(current: Optional[str]) -> bool:
+            if current is None or current not in index["entries"]:
+                return True
+            return entry["processing_timestamp"] >= index["entries"][current]["processing_timestamp"]
+
+        claim_id = entry["claim_id"]
+        if claim_id and newer(index["by_claim"].get(claim_id)):
+            index["by_claim"][claim_id] = filename
+        if entry["claimant_name"]:
+            name_key = self.claimant_key(entry["claimant_name"])
+            if newer(index["by_claimant"].get(name_key)):
+                index["by_claimant"][name_key] = filename
+        if newer(index["latest"]):
+            index["latest"] = filename
+
+    def _write_snapshot(self, index: Dict[str, Any], generation: int):
+        """Replace the snapshot; the caller holds the file lock"""
+        atomic_write_json(self.index_path, {**index, "generation": generation})
+
+    def _build_index(self):
+        """One-time scan of analyses written before the index existed; the caller holds the file lock"""
+        index = self._empty_index()
+        for filename in os.listdir(self.output_dir):
+            if filename.startswith("scheme_analysis_") and filename.endswith(".json"):
+                try:
+                    with open(os.path.join(self.output_dir, filename), "r", encoding="utf-8") as f:
+                        payload = json.load(f)
+                except (OSError, ValueError):
+                    continue
+                self._add_entry(index, filename, self._entry(payload, payload.get("claim_id")))
+        open(self._log_path(1), "a").close()
+        self._write_snapshot(index, 1)
+
+    def _read_log(self, offset: int) -> int:
+        """Apply complete log lines from offset on to the in-memory index; returns the new offset"""
+        try:
+            with open(self._log_path(), "rb") as f:
+                f.seek(offset)
+                data = f.read()
+        except FileNotFoundError:
+            raise
+        except OSError:
+            return offset
+        end = data.rfind(b"\n") + 1  # A line still being written is picked up next time
+        for line in data[:end].splitlines():
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            filename = record.pop("file", None)
+            if filename:
+                self._add_entry(self._index, filename, record)
+                self._log_entries += 1
+        return offset + end
+
+    def _reload(self):
+        """Read the snapshot and replay its log from the start"""
+        for _ in range(5):
+            try:
+                with open(self.index_path, "r", encoding="utf-8") as f:
+                    mtime = os.fstat(f.fileno()).st_mtime_ns
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                with self._file_lock():
+                    # Another process may have built it while we waited
+                    if not self._snapshot_readable():
+                        self._build_index()
+                continue
+
+            self._generation = snapshot.pop("generation", 0)
+            self._index = {**self._empty_index(), **snapshot}
+            self._index_mtime = mtime
+            self._log_entries = 0
+            try:
+                self._log_offset = self._read_log(0)
+            except FileNotFoundError:
+                if self._generation == 0:
+                    self._log_offset = 0  # Index written before the log existed
+                    return
+                continue  # Compacted under us; read the new snapshot
+            return
+        raise OSError(f"Could not load scheme index from {self.index_path}")
+
+    def _snapshot_readable(self) -> bool:
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                json.load(f)
+            return True
+        except (OSError, ValueError):
+            return False
+
+    def _refresh(self) -> Dict[str, Any]:
+        """Bring the in-memory index up to date with other processes; the caller holds self._lock"""
+        try:
+            mtime = os.stat(self.index_path).st_mtime_ns
+        except OSError:
+            mtime = None
+        if self._index is None or mtime != self._index_mtime:
+            self._reload()
+        else:
+            try:
+                self._log_offset = self._read_log(self._log_offset)
+            except FileNotFoundError:
+                self._reload()
+        return self._index
+
+    def _compact(self):
+        """Fold the log into a new snapshot; the caller holds both locks and is up to date"""
+        old_log = self._log_path()
+        generation = self._generation + 1
+        open(self._log_path(generation), "a").close()
+        self._write_snapshot(self._index, generation)
+        self._generation, self._log_offset, self._log_entries = generation, 0, 0
+        self._index_mtime = os.stat(self.index_path).st_mtime_ns
+        try:
+            os.remove(old_log)
+        except OSError:
+            pass  # Still open by a reader on Windows; it's never read again
+
+    def save(self, result: Dict[str, Any], claim_id: Optional[str] = None) -> str:
+        """Write an analysis and index it under its claim ID and claimant; returns the file path"""
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        claimant = self.claimant_key(result.get("claimant_name") or "unknown")
+        filename = f"scheme_analysis_{claimant}_{timestamp}.json"
+        path = os.path.join(self.output_dir, filename)
+
+        if claim_id:
+            claim_id = safe_key(claim_id)
+            result = {**result, "claim_id": claim_id}
+        atomic_write_json(path, result)
+
+        entry = self._entry(result, claim_id)
+        line = (json.dumps({"file": filename, **entry}, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._lock, self._file_lock():
+            # Catch up inside the lock so no other process's entry is missed
+            self._refresh()
+            if self._generation == 0:
+                self._compact()  # Move a pre-log index onto the log
+            with open(self._log_path(), "ab") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+            self._log_offset += len(line)
+            self._log_entries += 1
+            self._add_entry(self._index, filename, entry)
+            if self._log_entries >= self.compact_after:
+                self._compact()
+            self._remember(filename, result)
+        return path
+
+    def _remember(self, filename: str, payload: Dict[str, Any]):
+        self._payloads[filename] = payload
+        self._payloads.move_to_end(filename)
+        if len(self._payloads) > self.cache_size:
+            self._payloads.popitem(last=False)
+
+    def _payload(self, filename: Optional[str]) -> Optional[Dict[str, Any]]:
+        if not filename:
+            return None
+        with self._lock:
+            if filename in self._payloads:
+                self._payloads.move_to_end(filename)
+                self.hits += 1
+                return self._payloads[filename]
+            self.misses += 1
+        try:
+            with open(os.path.join(self.output_dir, filename), "r", encoding="utf-8") as f:
+                payload = json.load(f)
+        except (OSError, ValueError):
+            return None
+        with self._lock:
+            self._remember(filename, payload)
+        return payload
+
+    def get(self, claim_id: Optional[str] = None, claimant_name: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Newest analysis for a claim ID or claimant name, or the newest overall if neither is given"""
+        with self._lock:
+            index = self._refresh()
+            if claim_id:
+                filename = index["by_claim"].get(safe_key(claim_id))
+            elif claimant_name:
+                filename = index["by_claimant"].get(self.claimant_key(claimant_name))
+            else:
+                filename = index["latest"]
+        return self._payload(filename)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            index = self._refresh()
+            return {
+                "analyses": len(index["entries"]),
+                "claims": len(index["by_claim"]),
+                "claimants": len(index["by_claimant"]),
+                "log_entries": self._log_entries,
+                "cached": len(self._payloads),
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+
+land_cover_store = LandCoverStore()
+scheme_repository = SchemeAnalysisRepository()
@@ -0,0 +1,149 @@
+"""
+Scheme catalogue loaded once from data/scheme_catalogue.json.
+
+Every scheme key, official name and alias is normalized ("Pradhan Mantri"
+-> "pm", punctuation dropped) and indexed three ways: an exact alias map, a
+token inverted index and a character-trigram index for misspellings. A lookup
+only scores the aliases that share a token or trigram with the query, so its
+cost depends on the query, not on how many schemes the catalogue holds.
+
+Generic words ("pm", "national", "mission", "yojana", ...) are left out of
+token and trigram matching: they are shared by many schemes, so a name has
+to agree on its distinctive words to match. Names made only of generic words
+match nothing and get GENERIC_SCHEME_INFO.
+"""
+
+import os
+import re
+import json
+import threading
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, List, Optional, Set
+
+CATALOGUE_PATH = os.getenv("SCHEME_CATALOGUE_PATH", os.path.join(os.path.dirname(__file__), "data", "scheme_catalogue.json"))
+
+TOKEN_MATCH_THRESHOLD = 0.6    # Jaccard overlap of query and alias tokens
+FUZZY_MATCH_THRESHOLD = 0.75   # Dice coefficient of character trigrams
+GENERIC_TOKENS = {"scheme", "the", "of", "and", "for", "yojana", "pm", "mission", "national", "abhiyan"}
+
+GENERIC_SCHEME_INFO = {
+    "link": "https://www.india.gov.in/topics/rural",
+    "description": "Government scheme information",
+    "documents": "Aadhaar Card, Bank Account"
+}
+
+
+def normalize(name: str) -> str:
+    text = str(name).lower()
+    text = re.sub(r"\bpradhan\s+mantri\b", "pm", text)
+    text = re.sub(r"[^a-z0-9]+", " ", text)
+    return " ".join(text.split())
+
+
+def distinctive(text: str) -> str:
+    """Normalized text without generic words"""
+    return " ".join(t for t in text.split() if t not in GENERIC_TOKENS)
+
+
+def _tokens(text: str) -> Set[str]:
+    return set(text.split())
+
+
+def _trigrams(text: str) -> Set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SchemeCatalogue:
+    def __init__(self, schemes: List[Dict[str, str]]):
+        self.schemes = schemes
+        self._exact: Dict[str, int] = {}
+        self._alias_scheme: List[int] = []
+        self._alias_tokens: List[Set[str]] = []
+        self._alias_trigrams: List[Set[str]] = []
+        self._token_index: Dict[str, Set[int]] = defaultdict(set)
+        self._trigram_index: Dict[str, Set[int]] = defaultdict(set)
+
+        for scheme_id, scheme in enumerate(schemes):
+            names = [scheme["key"], scheme.get("official_name", "")] + scheme.get("aliases", [])
+            for alias in {normalize(n) for n in names if n}:
+                self._exact.setdefault(alias, scheme_id)
+                alias = distinctive(alias)
+                if not alias:
+                    continue  # Only reachable by its exact name
+                alias_id = len(self._alias_scheme)
+                self._alias_scheme.append(scheme_id)
+                self._alias_tokens.append(_tokens(alias))
+                self._alias_trigrams.append(_trigrams(alias))
+                for token in self._alias_tokens[-1]:
+                    self._token_index[token].add(alias_id)
+                for gram in self._alias_trigrams[-1]:
+                    self._trigram_index[gram].add(alias_id)
+
+        self.lookup = lru_cache(maxsize=4096)(self._lookup)
+
+    @classmethod
+    def load(cls, path: str = CATALOGUE_PATH) -> "SchemeCatalogue":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f)["schemes"])
+
+    def _token_match(self, query: str) -> Optional[int]:
+        tokens = _tokens(query)
+        candidates = set().union(*(self._token_index.get(t, set()) for t in tokens)) if tokens else set()
+        best, best_score = None, 0.0
+        for alias_id in candidates:
+            alias_tokens = self._alias_tokens[alias_id]
+            # No containment bonus: "PM Kisan Maandhan" shares one of its two words with "PM Kisan"
+            score = len(tokens & alias_tokens) / len(tokens | alias_tokens)
+            if score > best_score:
+                best, best_score = alias_id, score
+        return best if best_score >= TOKEN_MATCH_THRESHOLD else None
+
+    def _fuzzy_match(self, query: str) -> Optional[int]:
+        grams = _trigrams(query)
+        counts: Dict[int, int] = defaultdict(int)
+        for gram in grams:
+            for alias_id in self._trigram_index.get(gram, ()):
+                counts[alias_id] += 1
+        best, best_score = None, 0.0
+        for alias_id, shared in counts.items():
+            score = 2.0 * shared / (len(grams) + len(self._alias_trigrams[alias_id]))
+            if score > best_score:
+                best, best_score = alias_id, score
+        return best if best_score >= FUZZY_MATCH_THRESHOLD else None
+
+    def _lookup(self, name: str) -> Optional[Dict[str, str]]:
+        query = normalize(name)
+        if not query:
+            return None
+        if query in self._exact:
+            return self.schemes[self._exact[query]]
+        query = distinctive(query)
+        if not query:
+            return None
+        alias_id = self._token_match(query)
+        if alias_id is None:
+            alias_id = self._fuzzy_match(query)
+        return self.schemes[self._alias_scheme[alias_id]] if alias_id is not None else None
+
+    def info(self, name: str) -> Dict[str, str]:
+        """Official info for a scheme name, or generic portal info if it isn't catalogued"""
+        scheme = self.lookup(name)
+        if scheme is None:
+            return {"official_name": name, **GENERIC_SCHEME_INFO}
+        return {k: scheme[k] for k in ("official_name", "link", "description", "documents")}
+
+
+_catalogue: Optional[SchemeCatalogue] = None
+_catalogue_lock = threading.Lock()
+
+
+def get_catalogue() -> SchemeCatalogue:
+    """Process-wide catalogue, loaded on first use"""
+    global _catalogue
+    if _catalogue is None:
+        with _catalogue_lock:
+            if _catalogue is None:
+                _catalogue = SchemeCatalogue.load()
+    return _catalogue
@@ -0,0 +1,329 @@
+"""
+Declarative scheme eligibility rules evaluated over many profiles at once.
+
+Each rule names a scheme, a priority and a condition over FRA profile fields.
+Profiles are flattened into a pandas frame and every condition is compiled to
+a vectorized boolean mask, so a district-wide run is one pass per rule rather
+than one LLM call per claimant. The output is the same developer_json
+structure GramSahayakAgent used to ask Gemini for.
+"""
+
+from string import Formatter
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import re
+
+import numpy as np
+import pandas as pd
+
+from scheme_catalogue import get_catalogue
+
+SOCIAL_CATEGORIES = ["Scheduled Tribe", "Other Traditional Forest Dweller"]
+FOREST_SHARE_THRESHOLD = 10.0  # percent of the claim under tree cover
+
+# Conditions: {"field": {op: value}}, {"any": [...]}, {"all": [...]}, or {"always": True}
+# Ops: "contains" (case-insensitive substring), "in", "gte", "lt"
+SCHEME_RULES: List[Dict[str, Any]] = [
+    {
+        "scheme": "PM-KISAN",
+        "priority": "high",
+        "when": {"land_use_primary": {"contains": "agriculture"}},
+        "reasoning": "Claimant's primary land use is agriculture ({agriculture_pct:.1f}% of the claim), qualifying for direct income support to farmers.",
+        "estimated_benefit": "₹6000 per year"
+    },
+    {
+        "scheme": "PM Fasal Bima",
+        "priority": "high",
+        "when": {"land_use_primary": {"contains": "agriculture"}},
+        "reasoning": "Claimant cultivates the claimed land, so crop insurance protects against losses from natural calamities.",
+        "estimated_benefit": "Coverage against crop loss based on the sum insured"
+    },
+    {
+        "scheme": "MGNREGA",
+        "priority": "high",
+        "when": {"always": True},
+        "reasoning": "Universal scheme for rural households guaranteeing wage employment and additional income security.",
+        "estimated_benefit": "Wage employment for up to 100 days per household"
+    },
+    {
+        "scheme": "PM Awas Yojana",
+        "priority": "high",
+        "when": {"social_category": {"in": SOCIAL_CATEGORIES}},
+        "reasoning": "Claimant belongs to the {social_category} category, which is prioritized for housing assistance.",
+        "estimated_benefit": "Financial assistance for constructing a pucca house"
+    },
+    {
+        "scheme": "Ayushman Bharat",
+        "priority": "high",
+        "when": {"always": True},
+        "reasoning": "Health insurance coverage for rural families, including FRA beneficiaries.",
+        "estimated_benefit": "Health insurance coverage up to ₹5 lakhs per family per year"
+    },
+    {
+        "scheme": "PM-KUSUM",
+        "priority": "medium",
+        "when": {"land_use_primary": {"contains": "agriculture"}},
+        "reasoning": "Solar pumps can cut irrigation costs on the claimant's agricultural land (water access: {water_access_lower}).",
+        "estimated_benefit": "Subsidised solar pumps and income from surplus solar power"
+    },
+    {
+        "scheme": "National Livestock Mission",
+        "priority": "medium",
+        "when": {"any": [{"land_use_primary": {"contains": "forest"}}, {"forest_pct": {"gte": FOREST_SHARE_THRESHOLD}}]},
+        "reasoning": "Forest cover on the claim ({forest_pct:.1f}%) supports forest-based animal husbandry.",
+        "estimated_benefit": "Support for livestock development and productivity"
+    },
+    {
+        "scheme": "PM Vishwakarma",
+        "priority": "medium",
+        "when": {"any": [{"land_use_primary": {"contains": "forest"}}, {"forest_pct": {"gte": FOREST_SHARE_THRESHOLD}}]},
+        "reasoning": "Access to forest produce ({forest_pct:.1f}% tree cover) supports traditional forest crafts.",
+        "estimated_benefit": "Credit, toolkit and skill support for traditional artisans"
+    },
+]
+
+# Per-claimant columns; templated recommendations keep them as {field:spec} placeholders
+PERSONAL_FIELDS = ("holder_name", "agriculture_pct", "forest_pct", "water_pct", "settlement_pct")
+PLACEHOLDER = re.compile(r"\{(" + "|".join(PERSONAL_FIELDS) + r")(?::([^{}]*))?\}")
+
+LIVELIHOOD_FOCUS = {
+    "agriculture": "Agriculture",
+    "forest": "Forest-based livelihood",
+    "water": "Fisheries and water-based livelihood",
+}
+
+
+def _percent(value: Any) -> float:
+    try:
+        return float(str(value).strip().rstrip('%'))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def profile_frame(profiles: List[Dict[str, Any]]) -> pd.DataFrame:
+    """Flatten profiles into the columns rules are written against"""
+    distributions = [p.get("land_use_distribution") or {} for p in profiles]
+    locations = [p.get("location") or {} for p in profiles]
+    water_access = [p.get("water_access") or "Unknown" for p in profiles]
+    return pd.DataFrame({
+        "holder_name": [p.get("holder_name") or "" for p in profiles],
+        "social_category": [p.get("social_category") or "" for p in profiles],
+        "fra_right_type": [p.get("fra_right_type") or "" for p in profiles],
+        "land_use_primary": [p.get("land_use_primary") or "" for p in profiles],
+        "water_access": water_access,
+        "water_access_lower": [w.lower() for w in water_access],
+        "district": [l.get("district") or "" for l in locations],
+        "state": [l.get("state") or "" for l in locations],
+        "agriculture_pct": [_percent(d.get("Agriculture")) for d in distributions],
+        "forest_pct": [_percent(d.get("Forest")) for d in distributions],
+        "water_pct": [_percent(d.get("Water")) for d in distributions],
+        "settlement_pct": [_percent(d.get("Settlement")) for d in distributions],
+    })
+
+
+def _keep_placeholders(template: str, fields: Any) -> str:
+    """Rewrite a format template so the given fields survive .format() as literal placeholders"""
+    parts = []
+    for literal, name, spec, conversion in Formatter().parse(template):
+        parts.append(literal.replace("{", "{{").replace("}", "}}"))
+        if name is None:
+            continue
+        field = name + (f"!{conversion}" if conversion else "") + (f":{spec}" if spec else "")
+        parts.append(f"{{{{{field}}}}}" if name in fields else f"{{{field}}}")
+    return "".join(parts)
+
+
+def _personal_values(profile: Dict[str, Any]) -> Dict[str, Any]:
+    row = profile_frame([profile]).iloc[0]
+    values = {name: row[name] for name in PERSONAL_FIELDS}
+    values["holder_name"] = values["holder_name"] or "there"
+    return values
+
+
+def _fill(text: str, values: Dict[str, Any]) -> str:
+    return PLACEHOLDER.sub(lambda m: format(values[m.group(1)], m.group(2) or ""), text)
+
+
+def personalize(value: Any, profile: Dict[str, Any]) -> Any:
+    """Fill the personal placeholders of a templated recommendation (strings, dicts, lists) for one profile"""
+    values = _personal_values(profile)
+
+    def walk(item: Any) -> Any:
+        if isinstance(item, str):
+            return _fill(item, values)
+        if isinstance(item, dict):
+            return {k: walk(v) for k, v in item.items()}
+        if isinstance(item, list):
+            return [walk(v) for v in item]
+        return item
+
+    return walk(value)
+
+
+def personalize_stream(chunks: Iterator[str], profile: Dict[str, Any]) -> Iterator[str]:
+    """personalize() for streamed text; holds back a chunk tail that may be the start of a placeholder"""
+    values = _personal_values(profile)
+    pending = ""
+    for chunk in chunks:
+        pending += chunk
+        cut = pending.rfind("{")
+        if cut == -1 or "}" in pending[cut:]:
+            cut = len(pending)
+        if cut:
+            yield _fill(pending[:cut], values)
+            pending = pending[cut:]
+    if pending:
+        yield _fill(pending, values)
+
+
+def compile_condition(condition: Dict[str, Any]) -> Callable[[pd.DataFrame], np.ndarray]:
+    """Turn a declarative condition into a function frame -> boolean mask"""
+    if condition.get("always"):
+        return lambda frame: np.ones(len(frame), dtype=bool)
+    if "any" in condition:
+        parts = [compile_condition(c) for c in condition["any"]]
+        return lambda frame: np.logical_or.reduce([p(frame) for p in parts])
+    if "all" in condition:
+        parts = [compile_condition(c) for c in condition["all"]]
+        return lambda frame: np.logical_and.reduce([p(frame) for p in parts])
+
+    (field, test), = condition.items()
+    (op, value), = test.items()
+    if op == "contains":
+        return lambda frame: frame[field].str.lower().str.contains(value.lower(), regex=False).to_numpy()
+    if op == "in":
+        return lambda frame: frame[field].isin(value).to_numpy()
+    if op == "gte":
+        return lambda frame: (frame[field] >= value).to_numpy()
+    if op == "lt":
+        return lambda frame: (frame[field] < value).to_numpy()
+    raise ValueError(f"Unsupported rule operator: {op}")
+
+
+class SchemeRuleEngine:
+    """
+    Compiled scheme rules producing developer_json locally.
+
+    catalogue maps a scheme key to its official info ({"official_name",
+    "link", ...}) and defaults to the shared scheme catalogue; it is
+    resolved once per rule at construction.
+    """
+
+    def __init__(self, rules: Optional[List[Dict[str, Any]]] = None,
+                 catalogue: Optional[Callable[[str], Dict[str, str]]] = None):
+        self.rules = rules or SCHEME_RULES
+        self._conditions = [compile_condition(rule["when"]) for rule in self.rules]
+        catalogue = catalogue or get_catalogue().info
+        self._info = [catalogue(rule["scheme"]) for rule in self.rules]
+
+    def eligibility(self, frame: pd.DataFrame) -> np.ndarray:
+        """Boolean matrix of profiles x rules"""
+        if frame.empty:
+            return np.zeros((0, len(self.rules)), dtype=bool)
+        return np.column_stack([condition(frame) for condition in self._conditions])
+
+    def _rule_entries(self, index: int, frame: pd.DataFrame, rows: np.ndarray,
+                      templated: bool = False) -> Dict[int, Dict[str, str]]:
+        """Scheme entries of one rule for the given row positions"""
+        rule, info = self.rules[index], self._info[index]
+        template = rule["reasoning"]
+        if templated:
+            template = _keep_placeholders(template, PERSONAL_FIELDS)
+        fields = {name for _, name, _, _ in Formatter().parse(template) if name}
+
+        if fields:
+            columns = {name: frame[name].to_numpy()[rows] for name in fields}
+            reasons = [template.format(**{name: columns[name][k] for name in fields}) for k in range(len(rows))]
+        else:
+            reasons = [template.format()] * len(rows)
+
+        name, link, benefit = info.get("official_name", rule["scheme"]), info.get("link", ""), rule["estimated_benefit"]
+        return {
+            int(row): {"scheme_name": name, "reasoning": reason, "official_link": link, "estimated_benefit": benefit}
+            for row, reason in zip(rows, reasons)
+        }
+
+    @staticmethod
+    def _profile_analyses(frame: pd.DataFrame) -> List[Dict[str, Any]]:
+        land_use = frame["land_use_primary"].tolist()
+        focus = list(land_use)
+        lowered = frame["land_use_primary"].str.lower()
+        for key, label in reversed(list(LIVELIHOOD_FOCUS.items())):
+            for i in np.flatnonzero(lowered.str.contains(key, regex=False).to_numpy()):
+                focus[i] = label
+
+        analyses = []
+        for category, right, use, main_focus, state in zip(
+                frame["social_category"].tolist(), frame["fra_right_type"].tolist(), land_use, focus,
+                frame["state"].tolist()):
+            factors = [category, right, f"{use} as primary land use" if use else ""]
+            analyses.append({
+                "primary_eligibility_factors": [f for f in factors if f],
+                "main_livelihood_focus": main_focus,
+                "geographic_advantages": f"Eligible for {state} state schemes in addition to central schemes" if state else ""
+            })
+        return analyses
+
+    def recommend_frame(self, frame: pd.DataFrame, templated: bool = False) -> List[Dict[str, Any]]:
+        """
+        developer_json for every row of a profile frame.
+
+        With templated=True, PERSONAL_FIELDS are left as placeholders for
+        personalize() so the result can be shared by equivalent profiles.
+        """
+        matches = self.eligibility(frame)
+        # Render each rule's entries column-wise, only for the rows it matched
+        entries = [self._rule_entries(i, frame, np.flatnonzero(matches[:, i]), templated)
+                   for i in range(len(self.rules))]
+        high = [i for i, rule in enumerate(self.rules) if rule["priority"] == "high"]
+        medium = [i for i, rule in enumerate(self.rules) if rule["priority"] != "high"]
+
+        results = []
+        for row, analysis in enumerate(self._profile_analyses(frame)):
+            results.append({
+                "scheme_analysis": {
+                    "high_priority": [entries[i][row] for i in high if row in entries[i]],
+                    "medium_priority": [entries[i][row] for i in medium if row in entries[i]],
+                    "profile_analysis": analysis
+                }
+            })
+        return results
+
+    def recommend(self, profiles: List[Dict[str, Any]], templated: bool = False) -> List[Dict[str, Any]]:
+        """developer_json for each profile, evaluated in one vectorized pass"""
+        return self.recommend_frame(profile_frame(profiles), templated)
+
+    def matched_rules(self, profile: Dict[str, Any]) -> List[str]:
+        """Schemes whose rules match one profile"""
+        matched = np.flatnonzero(self.eligibility(profile_frame([profile]))[0])
+        return [self.rules[i]["scheme"] for i in matched]
+
+    def matched_schemes(self, profile: Dict[str, Any]) -> List[Dict[str, str]]:
+        """Matching rules for one profile as {"name", "priority", "reason"}"""
+        frame = profile_frame([profile])
+        matched = np.flatnonzero(self.eligibility(frame)[0])
+        return [
+            {"name": self.rules[i]["scheme"], "priority": self.rules[i]["priority"],
+             "reason": self._rule_entries(i, frame, np.array([0]))[0]["reasoning"]}
+            for i in matched
+        ]
+
+
+def markdown_report(profile: Dict[str, Any], developer_json: Dict[str, Any]) -> str:
+    """Plain user report for developer_json, used when no LLM narrative is requested or available"""
+    analysis = developer_json.get("scheme_analysis", {})
+    name = profile.get("holder_name") or "there"
+    lines = [f"Hello {name},", "", "Based on your FRA profile, these schemes can benefit you and your family:", ""]
+    for title, key in (("High Priority Schemes", "high_priority"), ("Medium Priority Schemes", "medium_priority")):
+        schemes = analysis.get(key, [])
+        if not schemes:
+            continue
+        lines.append(f"**{title}:**")
+        lines.append("")
+        for scheme in schemes:
+            lines.append(f"*   **{scheme['scheme_name']}:** {scheme['reasoning']}")
+            if scheme.get("official_link"):
+                lines.append(f"    *   **Apply:** {scheme['official_link']}")
+            lines.append(f"    *   **Estimated Benefit:** {scheme['estimated_benefit']}")
+        lines.append("")
+    return "\n".join(lines).strip()
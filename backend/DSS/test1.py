@@ -2,13 +2,23 @@
 Gram Sahayak (Village Assistant) - Enhanced with Web Search
 """
 import os
+import sys
 import json
 import google.generativeai as genai
 from dotenv import load_dotenv
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Iterator, Optional, List
 from datetime import datetime
 import requests
 from dataclasses import dataclass
+from result_store import scheme_repository
+from scheme_engine import SchemeRuleEngine, markdown_report, personalize, personalize_stream
+from recommendation_cache import RecommendationCache, template_profile
+from scheme_catalogue import get_catalogue
+from prompt import GRAM_SAHAYAK_SYSTEM_PROMPT, NARRATIVE_TEMPLATE
+from prompt_assembly import model_registry, prompt_usage
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'OCR-NER'))
+from single_flight import SingleFlight
 
 # Load environment variables
 load_dotenv()
@@ -25,82 +35,8 @@ class WebSearcher:
         """
         Search for current scheme information
         """
-        # Predefined scheme database (most current as of 2025)
-        scheme_database = {
-            "PM-KISAN": {
-                "official_name": "Pradhan Mantri Kisan Samman Nidhi",
-                "link": "https://pmkisan.gov.in/",
-                "description": "Direct income support of ₹6000 per year to farmers",
-                "documents": "Aadhaar Card, Bank Account, Land Records"
-            },
-            "PM Awas Yojana": {
-                "official_name": "Pradhan Mantri Awas Yojana - Gramin",
-                "link": "https://pmaymis.gov.in/",
-                "description": "Housing assistance for rural households",
-                "documents": "Aadhaar Card, Bank Account, Income Certificate"
-            },
-            "MGNREGA": {
-                "official_name": "Mahatma Gandhi National Rural Employment Guarantee Act",
-                "link": "https://nrega.nic.in/",
-                "description": "100 days guaranteed employment per household",
-                "documents": "Aadhaar Card, Bank Account, Job Card"
-            },
-            "National Livestock Mission": {
-                "official_name": "National Livestock Mission",
-                "link": "https://dahd.nic.in/schemes/programmes/national-livestock-mission",
-                "description": "Support for livestock development and productivity",
-                "documents": "Aadhaar Card, Bank Account, Caste Certificate"
-            },
-            "PM Fasal Bima": {
-                "official_name": "Pradhan Mantri Fasal Bima Yojana",
-                "link": "https://pmfby.gov.in/",
-                "description": "Crop insurance scheme for farmers",
-                "documents": "Aadhaar Card, Bank Account, Land Records, Sowing Certificate"
-            },
-            "PM Matsya Sampada": {
-                "official_name": "Pradhan Mantri Matsya Sampada Yojana",
-                "link": "https://pmmsy.dof.gov.in/",
-                "description": "Development of fisheries sector",
-                "documents": "Aadhaar Card, Bank Account, Fisherman Card"
-            },
-            "PM-KUSUM": {
-                "official_name": "PM Kisan Urja Suraksha evam Utthaan Mahabhiyan",
-                "link": "https://pmkusum.mnre.gov.in/",
-                "description": "Solar energy solutions for farmers",
-                "documents": "Aadhaar Card, Bank Account, Land Records, Electricity Bill"
-            },
-            "Skill India": {
-                "official_name": "Skill India Mission",
-                "link": "https://www.skillindia.gov.in/",
-                "description": "Skill development and training programs",
-                "documents": "Aadhaar Card, Educational Certificates"
-            },
-            "PM Vishwakarma": {
-                "official_name": "PM Vishwakarma Yojana",
-                "link": "https://pmvishwakarma.gov.in/",
-                "description": "Support for traditional craftsmen and artisans",
-                "documents": "Aadhaar Card, Bank Account, Skill Certificate"
-            },
-            "Ayushman Bharat": {
-                "official_name": "Ayushman Bharat - Pradhan Mantri Jan Arogya Yojana",
-                "link": "https://pmjay.gov.in/",
-                "description": "Health insurance coverage up to ₹5 lakhs",
-                "documents": "Aadhaar Card, Ration Card, SECC Database"
-            }
-        }
-        
-        # Search for matching scheme
-        for key, info in scheme_database.items():
-            if key.lower() in scheme_name.lower() or scheme_name.lower() in key.lower():
-                return info
-        
-        # If not found in database, return generic government portal
-        return {
-            "official_name": scheme_name,
-            "link": "https://www.india.gov.in/topics/rural",
-            "description": "Government scheme information",
-            "documents": "Aadhaar Card, Bank Account"
-        }
+        # Indexed catalogue (data/scheme_catalogue.json), loaded once per process
+        return get_catalogue().info(scheme_name)
 
 class GramSahayakAgent:
     def __init__(self, api_key: Optional[str] = None):
@@ -114,104 +50,40 @@ class GramSahayakAgent:
         # Initialize web searcher
         self.searcher = WebSearcher()
         
+        # Eligibility decided locally; Gemini only writes the narrative report
+        self.rule_engine = SchemeRuleEngine(catalogue=self.searcher.search_scheme_info)
+        
+        # Claimants with equivalent profiles share one templated recommendation,
+        # and concurrent requests for it share one narrative call
+        self.recommendation_cache = RecommendationCache(self.rule_engine)
+        self.narrative_flight = SingleFlight()
+        
         # Configure Gemini
         genai.configure(api_key=self.api_key)
         
-        # Initialize the model with enhanced system instructions
-        self.system_prompt = self._get_enhanced_system_prompt()
-        self.model = genai.GenerativeModel(
-            model_name="gemini-2.0-flash-exp",
-            system_instruction=self.system_prompt
-        )
+        # Static system instructions, shared (and context-cached when possible) across agents
+        self.model_name = "gemini-2.0-flash-exp"
+        self.system_prompt = GRAM_SAHAYAK_SYSTEM_PROMPT
         
         # Generation config
         self.generation_config = genai.types.GenerationConfig(
             candidate_count=1,
             temperature=0.2,  # Lower temperature for more consistent recommendations
-            max_output_tokens=4096,
+            max_output_tokens=2048,
         )
     
-    def _get_enhanced_system_prompt(self) -> str:
-        """
-        Enhanced system prompt with current scheme information
-        """
-        current_date = datetime.now().strftime("%d %B %Y")
-        
-        return f"""## ROLE AND GOAL 
-You are 'Gram Sahayak' (Village Assistant), a highly knowledgeable AI advisor specializing in Forest Rights Act (FRA) beneficiaries and central government schemes. Your goal is to provide personalized, actionable scheme recommendations that can genuinely improve the lives of rural beneficiaries.
-
-## CONTEXT
-- **Current Date:** {current_date}
-- **Focus:** FRA claimants (Scheduled Tribes and Other Traditional Forest Dwellers)
-- **Expertise:** Central Government schemes, eligibility criteria, application processes
-
-## KEY SCHEMES TO CONSIDER (2025 Focus):
-**Agricultural Support:**
-- PM-KISAN (₹6000/year direct benefit transfer)
-- PM Fasal Bima Yojana (crop insurance)
-- PM-KUSUM (solar solutions for farmers)
-
-**Livelihood & Employment:**
-- MGNREGA (100 days guaranteed work)
-- PM Vishwakarma (traditional artisans)
-- National Livestock Mission
-
-**Housing & Infrastructure:**
-- PM Awas Yojana - Gramin
-- PM Gram Sadak Yojana
-
-**Health & Social Security:**
-- Ayushman Bharat (₹5 lakh health coverage)
-- National Food Security Act
-
-## ANALYSIS METHODOLOGY:
-
-1. **Profile Synthesis:** 
-   - `social_category` + `fra_right_type` = Primary eligibility base
-   - `land_use_primary` + `water_access` = Livelihood focus
-   - `location` = State-specific schemes availability
-
-2. **Priority Logic:**
-   - **HIGH:** Direct individual benefits, immediate eligibility
-   - **MEDIUM:** Community benefits, conditional eligibility
-
-3. **Personalization:** Always connect recommendations to specific profile elements
-
-## OUTPUT FORMAT:
-
-### User-Friendly Report (Markdown):
-- Use encouraging, empowering language
-- Include specific eligibility reasoning
-- Provide practical next steps
-- Mention common documents needed
-
-### Developer JSON:
-```json
-{{
-  "scheme_analysis": {{
-    "high_priority": [
-      {{
-        "scheme_name": "Official Scheme Name",
-        "reasoning": "Specific profile field connections",
-        "official_link": "Current official portal",
-        "estimated_benefit": "Quantified benefit if available"
-      }}
-    ],
-    "medium_priority": [...],
-    "profile_analysis": {{
-      "primary_eligibility_factors": ["factor1", "factor2"],
-      "main_livelihood_focus": "derived focus area",
-      "geographic_advantages": "location-based opportunities"
-    }}
-  }}
-}}
-
-
-Always provide accurate, current information and focus on schemes where the claimant has genuine eligibility."""
-
-    def analyze_profile_with_search(self, profile_path: str = None, profile_data: Dict = None) -> Dict[str, Any]:
+    @property
+    def model(self):
+        # Looked up per call so an expired context cache is recreated
+        return model_registry.get(self.model_name, self.system_prompt)
+    
+    def analyze_profile_with_search(self, profile_path: str = None, profile_data: Dict = None,
+                                    narrative: bool = True) -> Dict[str, Any]:
         """
         Enhanced profile analysis with web search integration
+        
+        developer_json comes from the local rule engine; Gemini is only asked for
+        the user-friendly report when narrative is True.
         """
         try:
             # Load profile data
@@ -223,49 +95,10 @@ Always provide accurate, current information and focus on schemes where the clai
             else:
                 raise ValueError("Either profile_path or profile_data must be provided")
             
-            # Analyze profile for scheme matching
-            scheme_suggestions = self._identify_relevant_schemes(claimant_profile)
-            
-            # Enrich with current scheme information
-            enriched_schemes = []
-            for scheme in scheme_suggestions:
-                scheme_info = self.searcher.search_scheme_info(scheme['name'])
-                enriched_schemes.append({
-                    **scheme,
-                    'official_info': scheme_info
-                })
-            
-            # Create enhanced prompt with current scheme data
-            user_prompt = f"""
-Please analyze this FRA claimant profile and provide personalized scheme recommendations using the current scheme information provided:
-
-**CLAIMANT PROFILE:**
-{json.dumps(claimant_profile, indent=2, ensure_ascii=False)}
-
-**CURRENT SCHEME DATABASE:**
-{json.dumps([s['official_info'] for s in enriched_schemes], indent=2, ensure_ascii=False)}
-
-**PRE-IDENTIFIED RELEVANT SCHEMES:**
-{json.dumps(scheme_suggestions, indent=2, ensure_ascii=False)}
-
-Generate both outputs as specified:
-1. User-friendly Markdown report with encouraging tone
-2. Developer JSON with precise reasoning
-
-Focus on schemes where this specific claimant has direct eligibility and quantifiable benefits.
-"""
-            
-            # Generate response
-            response = self.model.generate_content(
-                user_prompt,
-                generation_config=self.generation_config
-            )
-            
-            if not response.text:
-                return {"success": False, "error": "No response generated"}
-            
-            # Parse response
-            return self._parse_response(response.text, claimant_profile)
+            result = None
+            for event in self.stream_analysis(claimant_profile, narrative=narrative):
+                result = event["data"]
+            return result
             
         except Exception as e:
             return {
@@ -273,69 +106,113 @@ Focus on schemes where this specific claimant has direct eligibility and quantif
                 "error": f"Error in enhanced analysis: {str(e)}"
             }
     
-    def _identify_relevant_schemes(self, profile: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def stream_analysis(self, profile: Dict[str, Any], narrative: bool = True) -> Iterator[Dict[str, Any]]:
         """
-        Pre-identify potentially relevant schemes based on profile
-        """
-        schemes = []
-        
-        # Extract key profile elements
-        social_category = profile.get('social_category', '')
-        fra_right = profile.get('fra_right_type', '')
-        land_use = profile.get('land_use_primary', '')
-        water_access = profile.get('water_access', '')
-        location = profile.get('location', {})
+        Analysis as a sequence of events for streaming clients
         
-        # Agricultural schemes
-        if 'agriculture' in land_use.lower():
-            schemes.extend([
-                {"name": "PM-KISAN", "priority": "high", "reason": "Direct farmer benefit"},
-                {"name": "PM Fasal Bima", "priority": "high", "reason": "Crop insurance for farmers"},
-                {"name": "PM-KUSUM", "priority": "medium", "reason": "Solar solutions for agriculture"}
-            ])
-        
-        # Employment schemes
-        schemes.append({"name": "MGNREGA", "priority": "high", "reason": "Universal rural employment"})
+        Yields "recommendations" (developer_json, ready before any LLM call),
+        "report" markdown chunks as Gemini writes them, "report_replace" with
+        the local report if generation fails, and "done" with the full result.
+        """
+        key = self.recommendation_cache.key(profile)
+        entry = self.recommendation_cache.get(key)
+        cache_status = "hit" if entry and (entry["user_report"] or not narrative) else "miss"
         
-        # Housing schemes
-        if 'Traditional Forest Dweller' in social_category or 'Scheduled Tribe' in social_category:
-            schemes.append({"name": "PM Awas Yojana", "priority": "high", "reason": "Priority for ST/OTFD"})
+        if entry:
+            template_json = entry["developer_json"]
+        else:
+            template_json = self.rule_engine.recommend([profile], templated=True)[0]
+        developer_json = personalize(template_json, profile)
+        yield {"event": "recommendations", "data": developer_json}
         
-        # Health schemes
-        schemes.append({"name": "Ayushman Bharat", "priority": "high", "reason": "Universal health coverage"})
+        template_report = entry["user_report"] if entry else None
+        response_text = entry["raw_response"] if entry else None
+        future, leader, usage = None, False, {}
+        if template_report:
+            user_report = personalize(template_report, profile)
+            yield {"event": "report", "data": user_report}
+        else:
+            parts = []
+            future, leader = self.narrative_flight.claim(key) if narrative else (None, False)
+            if leader:
+                try:
+                    # Narrated for the templated profile so the text can be shared
+                    chunks = self._narrative_stream(template_profile(profile), template_json, usage)
+                    chunks = self._collect(chunks, parts)
+                    for text in personalize_stream(chunks, profile):
+                        yield {"event": "report", "data": text}
+                    template_report = response_text = "".join(parts).strip() or None
+                except Exception as e:
+                    print(f"⚠️ Narrative generation failed, using local report: {e}")
+                finally:
+                    self.narrative_flight.release(key, template_report)
+            elif future is not None:
+                # An equivalent profile is being narrated for another request; reuse its text
+                template_report = response_text = future.result()
+                cache_status = "shared"
+                if template_report:
+                    yield {"event": "report", "data": personalize(template_report, profile)}
+            if template_report:
+                user_report = personalize(template_report, profile)
+            else:
+                user_report = markdown_report(profile, developer_json)
+                # Replaces any partial narrative the client already received
+                yield {"event": "report_replace" if parts else "report", "data": user_report}
         
-        # Forest-based livelihoods
-        if 'forest' in land_use.lower() or any('forest' in str(v).lower() for v in profile.get('land_use_distribution', {}).values()):
-            schemes.extend([
-                {"name": "National Livestock Mission", "priority": "medium", "reason": "Forest-based animal husbandry"},
-                {"name": "PM Vishwakarma", "priority": "medium", "reason": "Traditional forest crafts"}
-            ])
+        if (not entry or (template_report and not entry["user_report"])) and (leader or not narrative):
+            self.recommendation_cache.put(key, template_json, template_report, response_text)
         
-        return schemes
+        response_text = personalize(response_text, profile) if response_text else None
+        result = self._build_result(user_report, developer_json, response_text, profile)
+        result["analysis_metadata"]["recommendation_cache"] = cache_status
+        if leader and usage:
+            result["analysis_metadata"]["prompt_usage"] = usage
+        yield {"event": "done", "data": result}
+    
+    @staticmethod
+    def _collect(chunks: Iterator[str], parts: List[str]) -> Iterator[str]:
+        for chunk in chunks:
+            parts.append(chunk)
+            yield chunk
     
-    def _parse_response(self, response_text: str, profile: Dict) -> Dict[str, Any]:
+    def _narrative_stream(self, profile: Dict[str, Any], developer_json: Dict[str, Any],
+                          usage: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+        """Markdown report chunks from Gemini for recommendations already decided by the rule engine"""
+        user_prompt = NARRATIVE_TEMPLATE.render(
+            current_date=datetime.now().strftime("%d %B %Y"),
+            profile=profile,
+            developer_json=developer_json
+        )
+        response = self.model.generate_content(
+            user_prompt,
+            generation_config=self.generation_config,
+            stream=True
+        )
+        for chunk in response:
+            if chunk.text:
+                yield chunk.text
+        if usage is not None:
+            usage.update(prompt_usage("Narrative", user_prompt, response))
+    
+    def _generate_narrative(self, profile: Dict[str, Any], developer_json: Dict[str, Any]) -> Optional[str]:
+        """Complete markdown report from Gemini"""
+        text = "".join(self._narrative_stream(profile, developer_json)).strip()
+        return text or None
+    
+    def _identify_relevant_schemes(self, profile: Dict[str, Any]) -> List[Dict[str, Any]]:
         """
-        Parse the model response into structured format
+        Pre-identify potentially relevant schemes based on profile
+        """
+        return self.rule_engine.matched_schemes(profile)
+    
+    def _build_result(self, user_report: str, developer_json: Dict[str, Any], response_text: Optional[str],
+                      profile: Dict) -> Dict[str, Any]:
+        """
+        Assemble the analysis result in the format saved to output/
         """
-        # Extract JSON from response
-        json_start = response_text.find('```json')
-        json_end = response_text.find('```', json_start + 7)
-        
-        if json_start != -1 and json_end != -1:
-            json_content = response_text[json_start + 7:json_end].strip()
-            markdown_content = response_text[:json_start].strip()
-            
-            try:
-                developer_json = json.loads(json_content)
-            except json.JSONDecodeError as e:
-                developer_json = {"error": f"JSON parse error: {str(e)}", "raw_json": json_content}
-        else:
-            markdown_content = response_text
-            developer_json = {"error": "No JSON block found in response"}
-        
         return {
             "success": True,
-            "user_report": markdown_content,
+            "user_report": user_report,
             "developer_json": developer_json,
             "raw_response": response_text,
             "claimant_name": profile.get('holder_name', 'Unknown'),
@@ -350,7 +227,8 @@ Focus on schemes where this specific claimant has direct eligibility and quantif
             }
         }
     
-    def generate_detailed_report(self, profile_path: str = None, profile_data: Dict = None, save_output: bool = True) -> Dict[str, Any]:
+    def generate_detailed_report(self, profile_path: str = None, profile_data: Dict = None, save_output: bool = True,
+                                 claim_id: str = None) -> Dict[str, Any]:
         """
         Generate comprehensive analysis with optional file saving
         """
@@ -364,17 +242,8 @@ Focus on schemes where this specific claimant has direct eligibility and quantif
             
             # Save if requested
             if save_output:
-                output_dir = "output"
-                os.makedirs(output_dir, exist_ok=True)
-                
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                claimant_name = result['claimant_name'].replace(' ', '_').lower()
-                
-                # Save JSON analysis only
-                json_file = os.path.join(output_dir, f"scheme_analysis_{claimant_name}_{timestamp}.json")
-                with open(json_file, 'w', encoding='utf-8') as f:
-                    json.dump(result, f, indent=2, ensure_ascii=False)
-                
+                # Indexed by claim ID and claimant so the API can look it up directly
+                json_file = scheme_repository.save(result, claim_id=claim_id)
                 print(f"✅ Analysis saved: {json_file}")
         
         return result
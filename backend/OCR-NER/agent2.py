@@ -1,11 +1,11 @@
 import google.generativeai as genai
-import json
-import re
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum
 from typing import List
 from dotenv import load_dotenv
 import os
+from structured_output import gemini_schema, json_generation_config, generate_structured
+from single_flight import SingleFlight, text_key
 
 # REMOVED: from structured_parser import StructuredDocumentParser
 load_dotenv()  # auto-load .env
@@ -20,9 +20,9 @@ class DocumentClassification:
     document_type: str
     confidence_level: ConfidenceLevel
     confidence_score: float
-    reasoning: str
-    key_indicators: List[str]
-    suggested_actions: List[str]
+    reasoning: str = ""
+    key_indicators: List[str] = field(default_factory=list)
+    suggested_actions: List[str] = field(default_factory=list)
     document_purpose: str = "Not specified"
     issuing_authority: str = "Not specified"
 
@@ -33,6 +33,11 @@ class DocumentClassifierAgent:
             raise ValueError("❌ Missing GEMINI_API_KEY in .env file")
         genai.configure(api_key=api_key)
         self.model = genai.GenerativeModel("gemini-2.5-flash")
+        # JSON mode with the DocumentClassification schema; replies are checked as they stream
+        self.schema = gemini_schema(DocumentClassification)
+        self.generation_config = json_generation_config(self.schema)
+        # The same document uploaded twice in a burst shares one Gemini call
+        self.in_flight = SingleFlight()
 
     def classify(self, text: str) -> DocumentClassification:
         prompt = f"""
@@ -52,31 +57,11 @@ class DocumentClassifierAgent:
             "issuing_authority": "authority here"
         }}
         """
-        response = self.model.generate_content(prompt).text
-        match = re.search(r"\{.*\}", response, re.DOTALL)
-        if not match:
-            raise ValueError("No JSON found in response")
-        data = json.loads(match.group())
-        
-        # Validate response before creating object
-        if not self._validate_response(data):
-            raise ValueError("Invalid response structure from AI model")
-            
-        return DocumentClassification(
-            document_type=data.get("document_type", "Unknown"),
-            confidence_level=ConfidenceLevel(data.get("confidence_level", "LOW")),
-            confidence_score=float(data.get("confidence_score", 0)),
-            reasoning=data.get("reasoning", ""),
-            key_indicators=data.get("key_indicators", []),
-            suggested_actions=data.get("suggested_actions", []),
-            document_purpose=data.get("document_purpose", "Not specified"),
-            issuing_authority=data.get("issuing_authority", "Not specified"),
+        classification, _ = self.in_flight.do(
+            text_key(prompt), generate_structured, self.model, prompt, DocumentClassification,
+            generation_config=self.generation_config, schema=self.schema
         )
-    
-    def _validate_response(self, data: dict) -> bool:
-        """Validate AI response has required fields"""
-        required_fields = ["document_type", "confidence_level", "confidence_score"]
-        return all(field in data for field in required_fields)
+        return classification
 
 # Optional: Keep a simple test function if needed for standalone testing
 def test_classifier():
@@ -0,0 +1,131 @@
+"""
+Process-wide registry for heavy OCR/layout models.
+
+Models are registered with a loader and only built on first use. Every
+extractor instance and worker thread shares the same loaded object.
+"""
+import os
+import sys
+import time
+import threading
+from typing import Any, Callable, Dict, Iterable, Optional
+
+# Memory reporting (install: pip install psutil); falls back to resource on Unix
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+
+def _current_rss_mb() -> Optional[float]:
+    """Resident memory of this process in MB, if it can be measured"""
+    if PSUTIL_AVAILABLE:
+        return psutil.Process(os.getpid()).memory_info().rss / (1024 * 1024)
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is bytes on macOS, kilobytes on Linux
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except Exception:
+        return None
+
+
+class ModelRegistry:
+    def __init__(self):
+        """Initialize an empty registry"""
+        self._loaders: Dict[str, Callable[[], Any]] = {}
+        self._models: Dict[str, Any] = {}
+        self._errors: Dict[str, str] = {}
+        self._stats: Dict[str, Dict[str, Any]] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._registry_lock = threading.Lock()
+
+    def register(self, name: str, loader: Callable[[], Any]):
+        """Register a loader; the model is not built until get() is called"""
+        with self._registry_lock:
+            self._loaders[name] = loader
+            self._locks.setdefault(name, threading.Lock())
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._models
+
+    def get(self, name: str) -> Any:
+        """Return the shared model, loading it on first use"""
+        if name in self._models:
+            return self._models[name]
+
+        if name not in self._loaders:
+            raise KeyError(f"Unknown model: {name}")
+
+        with self._locks[name]:
+            # Another thread may have finished loading while we waited
+            if name in self._models:
+                return self._models[name]
+            if name in self._errors:
+                raise RuntimeError(f"Model '{name}' failed to load: {self._errors[name]}")
+
+            rss_before = _current_rss_mb()
+            start = time.perf_counter()
+            try:
+                model = self._loaders[name]()
+            except Exception as e:
+                # Remember the failure so callers don't retry an expensive load
+                self._errors[name] = str(e)
+                self._stats[name] = {"loaded": False, "error": str(e)}
+                raise RuntimeError(f"Model '{name}' failed to load: {e}") from e
+
+            load_time = time.perf_counter() - start
+            rss_after = _current_rss_mb()
+            self._stats[name] = {
+                "loaded": True,
+                "load_time_seconds": round(load_time, 3),
+                "memory_mb": round(rss_after - rss_before, 1) if rss_before is not None and rss_after is not None else None,
+                "loaded_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            }
+            self._models[name] = model
+            print(f"✅ Loaded model '{name}' in {load_time:.2f}s")
+            return model
+
+    def get_optional(self, name: str) -> Optional[Any]:
+        """Like get(), but returns None when the model is unavailable"""
+        try:
+            return self.get(name)
+        except (KeyError, RuntimeError):
+            return None
+
+    def warm(self, names: Optional[Iterable[str]] = None) -> Dict[str, bool]:
+        """Eagerly load the given models (all registered models by default)"""
+        names = list(names) if names is not None else list(self._loaders)
+        warmed = {}
+        for name in names:
+            warmed[name] = self.get_optional(name) is not None
+        return warmed
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Load status, load time and memory delta for every registered model"""
+        return {
+            name: self._stats.get(name, {"loaded": False})
+            for name in self._loaders
+        }
+
+
+def _load_easyocr():
+    import easyocr
+    return easyocr.Reader(['en', 'hi'])  # English and Hindi
+
+
+def _load_layout_model():
+    import layoutparser as lp
+    # Download pre-trained model for table detection
+    return lp.Detectron2LayoutModel(
+        'lp://PubLayNet/faster_rcnn_R_50_FPN_3x/config',
+        extra_config=["MODEL.ROI_HEADS.SCORE_THRESH_TEST", 0.8],
+        label_map={0: "Text", 1: "Title", 2: "List", 3: "Table", 4: "Figure"}
+    )
+
+
+# Shared process-wide instance
+model_registry = ModelRegistry()
+model_registry.register("easyocr", _load_easyocr)
+model_registry.register("layout", _load_layout_model)
@@ -0,0 +1,69 @@
+"""
+Single-flight coalescing for expensive calls (Gemini requests).
+
+Concurrent calls with the same key share one in-flight Future: the first
+caller runs the function, later callers wait for its result instead of
+issuing a duplicate request. Nothing is kept once the call finishes, so
+this only removes overlap; caching results is left to the callers.
+"""
+
+import copy
+import hashlib
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Tuple
+
+
+def text_key(*parts: str) -> str:
+    """Key for calls identified by their prompt text"""
+    return hashlib.sha256("\x00".join(parts).encode("utf-8")).hexdigest()
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, Future] = {}
+        self.calls = 0
+        self.shared = 0
+
+    def claim(self, key: str) -> Tuple[Future, bool]:
+        """
+        The in-flight Future for key and whether the caller leads it.
+
+        A leader must call release() when done, even on failure.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.shared += 1
+                return future, False
+            future = Future()
+            self._calls[key] = future
+            self.calls += 1
+            return future, True
+
+    def release(self, key: str, result: Any = None, error: BaseException = None):
+        with self._lock:
+            future = self._calls.pop(key)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def do(self, key: str, fn: Callable, *args, **kwargs) -> Any:
+        """fn(*args, **kwargs), shared with concurrent callers using the same key"""
+        future, leader = self.claim(key)
+        if not leader:
+            # Followers get their own copy so callers can mutate results safely
+            return copy.deepcopy(future.result())
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            self.release(key, error=e)
+            raise
+        self.release(key, result)
+        return result
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"calls": self.calls, "shared": self.shared, "in_flight": len(self._calls)}
@@ -0,0 +1,331 @@
+"""
+Schema-enforced JSON output from Gemini.
+
+The target type (a pydantic model or a dataclass) is converted to a Gemini
+response schema and sent with response_mime_type="application/json". The
+response is streamed through StreamingJSONValidator, which checks keys,
+value types and enum values as they arrive: a response that goes off-schema
+is aborted after a few tokens instead of being read to the end, and reading
+stops as soon as the root object closes. Truncated or slightly malformed
+output is repaired locally before falling back to a retry.
+"""
+
+import json
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import google.generativeai as genai
+from pydantic import TypeAdapter, ValidationError
+
+MAX_PREAMBLE_CHARS = 200  # Text tolerated before the JSON starts (e.g. a ```json fence)
+
+_JSON_TYPES = {"string": "STRING", "number": "NUMBER", "integer": "INTEGER",
+               "boolean": "BOOLEAN", "array": "ARRAY", "object": "OBJECT"}
+
+# First character a value of each schema type may start with
+_VALUE_STARTS = {
+    "STRING": '"',
+    "NUMBER": "-0123456789",
+    "INTEGER": "-0123456789",
+    "BOOLEAN": "tf",
+    "ARRAY": "[",
+    "OBJECT": "{",
+}
+
+
+class StructuredOutputError(ValueError):
+    """Model output that can't be made to match the schema"""
+
+
+def _resolve(node: Dict[str, Any], definitions: Dict[str, Any]) -> Dict[str, Any]:
+    if "$ref" in node:
+        return _resolve(definitions[node["$ref"].split("/")[-1]], definitions)
+    return node
+
+
+def _convert(node: Dict[str, Any], definitions: Dict[str, Any]) -> Dict[str, Any]:
+    """JSON Schema (pydantic flavour) -> the OpenAPI subset Gemini accepts"""
+    node = _resolve(node, definitions)
+    nullable = False
+    if "anyOf" in node:
+        options = [_resolve(option, definitions) for option in node["anyOf"]]
+        nullable = any(option.get("type") == "null" for option in options)
+        options = [option for option in options if option.get("type") != "null"]
+        node = options[0] if len(options) == 1 else {"type": "string"}
+
+    schema: Dict[str, Any] = {}
+    if "enum" in node or "const" in node:
+        schema.update({"type": "STRING", "format": "enum",
+                       "enum": [str(v) for v in node.get("enum", [node.get("const")])]})
+    else:
+        schema["type"] = _JSON_TYPES.get(node.get("type"), "STRING")
+    if node.get("description"):
+        schema["description"] = node["description"]
+    if schema["type"] == "ARRAY":
+        schema["items"] = _convert(node.get("items", {"type": "string"}), definitions)
+    if schema["type"] == "OBJECT":
+        schema["properties"] = {name: _convert(prop, definitions) for name, prop in node.get("properties", {}).items()}
+        if node.get("required"):
+            schema["required"] = list(node["required"])
+    if nullable:
+        schema["nullable"] = True
+    return schema
+
+
+def gemini_schema(target: Any, fields: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """
+    Gemini response schema for a pydantic model or dataclass.
+
+    fields restricts the top-level properties, for prompts that only ask for
+    part of a model.
+    """
+    json_schema = TypeAdapter(target).json_schema()
+    schema = _convert(json_schema, json_schema.get("$defs", {}))
+    if fields is not None:
+        fields = list(fields)
+        schema["properties"] = {k: v for k, v in schema["properties"].items() if k in fields}
+        schema["required"] = [k for k in schema.get("required", []) if k in fields]
+    return schema
+
+
+def json_generation_config(schema: Dict[str, Any], **kwargs):
+    """GenerationConfig in JSON mode with schema, degrading on SDKs without response_schema"""
+    for extra in ({"response_mime_type": "application/json", "response_schema": schema},
+                  {"response_mime_type": "application/json"}, {}):
+        try:
+            return genai.types.GenerationConfig(**kwargs, **extra)
+        except TypeError:
+            continue
+
+
+class StreamingJSONValidator:
+    """
+    Incremental JSON scanner that checks the text against a Gemini schema.
+
+    feed() raises StructuredOutputError on the first key, value type or
+    enum value the schema doesn't allow, and returns True once the root
+    value is complete.
+    """
+
+    def __init__(self, schema: Dict[str, Any]):
+        self.schema = schema
+        self.text: List[str] = []
+        self.started = False
+        self.complete = False
+        self._preamble = 0
+        # Containers: {"kind": "object"/"array", "schema": ..., "key": ..., "expect": ...}
+        self._stack: List[Dict[str, Any]] = []
+        self._string: Optional[List[str]] = None
+        self._string_role: Optional[str] = None  # "key" or "value"
+        self._string_schema: Optional[Dict[str, Any]] = None
+        self._escape = False
+        self._scalar = False
+
+    def _error(self, message: str):
+        raise StructuredOutputError(f"{message} after {len(''.join(self.text))} characters")
+
+    def _value_schema(self) -> Optional[Dict[str, Any]]:
+        """Schema of the value about to start at the current position"""
+        if not self._stack:
+            return self.schema
+        top = self._stack[-1]
+        if top["schema"] is None:
+            return None
+        if top["kind"] == "array":
+            return top["schema"].get("items")
+        return top["schema"].get("properties", {}).get(top["key"])
+
+    def _start_value(self, char: str):
+        schema = self._value_schema()
+        if schema is not None:
+            allowed = _VALUE_STARTS.get(schema.get("type"), "")
+            if char not in allowed and not (char == "n" and schema.get("nullable")):
+                self._error(f"Expected {schema.get('type')} but got {char!r}")
+        if char == "{":
+            self._stack.append({"kind": "object", "schema": schema, "key": None, "expect": "key"})
+        elif char == "[":
+            self._stack.append({"kind": "array", "schema": schema, "expect": "value"})
+        elif char == '"':
+            self._string, self._string_role, self._string_schema = [], "value", schema
+        else:
+            self._scalar = True
+        if self._stack and char not in "{[":
+            self._stack[-1]["expect"] = "separator"
+
+    def _end_string(self):
+        value = "".join(self._string)
+        if self._string_role == "key":
+            top = self._stack[-1]
+            properties = (top["schema"] or {}).get("properties")
+            if properties is not None and value not in properties:
+                self._error(f"Unexpected key {value!r}")
+            top["key"], top["expect"] = value, "colon"
+        else:
+            enum = (self._string_schema or {}).get("enum")
+            if enum and value not in enum:
+                self._error(f"{value!r} is not one of {enum}")
+            if not self._stack:
+                self.complete = True
+        self._string = None
+
+    def _close(self, char: str):
+        if not self._stack or {"object": "}", "array": "]"}[self._stack[-1]["kind"]] != char:
+            self._error(f"Unbalanced {char!r}")
+        if self._stack[-1]["kind"] == "object" and self._stack[-1]["expect"] in ("colon", "value"):
+            self._error(f"Missing value before {char!r}")
+        closed = self._stack.pop()
+        if closed["kind"] == "object" and closed["schema"]:
+            missing = [k for k in closed["schema"].get("required", []) if k not in closed.get("seen", ())]
+            if missing:
+                self._error(f"Missing required keys {missing}")
+        if self._stack:
+            self._stack[-1]["expect"] = "separator"
+        else:
+            self.complete = True
+
+    def feed(self, chunk: str) -> bool:
+        for char in chunk:
+            if self.complete:
+                break
+            self.text.append(char)
+
+            if self._string is not None:
+                if self._escape:
+                    self._escape = False
+                    self._string.append(char)
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._end_string()
+                else:
+                    self._string.append(char)
+                continue
+
+            if not self.started:
+                if char in "{[":
+                    self.started = True
+                    self.text = [char]
+                    self._start_value(char)
+                else:
+                    self._preamble += 1
+                    if self._preamble > MAX_PREAMBLE_CHARS:
+                        self._error("No JSON value")
+                continue
+
+            if self._scalar:
+                if char not in ",}] \t\r\n":
+                    continue
+                self._scalar = False
+                if not self._stack:
+                    self.complete = True
+                    break
+
+            if char in " \t\r\n":
+                continue
+            top = self._stack[-1] if self._stack else None
+            if char in "}]":
+                self._close(char)
+            elif top is None:
+                self._error(f"Unexpected {char!r} after the JSON value")
+            elif char == ",":
+                if top["expect"] != "separator":
+                    self._error("Unexpected ','")
+                top["expect"] = "key" if top["kind"] == "object" else "value"
+            elif top["expect"] == "colon":
+                if char != ":":
+                    self._error(f"Expected ':' but got {char!r}")
+                top.setdefault("seen", set()).add(top["key"])
+                top["expect"] = "value"
+            elif top["expect"] == "separator":
+                self._error(f"Expected ',' but got {char!r}")
+            elif top["kind"] == "object" and top["expect"] == "key":
+                if char != '"':
+                    self._error(f"Expected a key but got {char!r}")
+                self._string, self._string_role = [], "key"
+            else:
+                self._start_value(char)
+        return self.complete
+
+    def value(self) -> str:
+        return "".join(self.text)
+
+
+def repair_json(text: str) -> str:
+    """Close an unterminated string/containers and drop trailing commas, e.g. after max_output_tokens"""
+    text = re.sub(r"^\s*```(?:json)?\s*", "", text.strip())
+    text = re.sub(r"\s*```\s*$", "", text)
+    stack, in_string, escape = [], False, False
+    for char in text:
+        if in_string:
+            if escape:
+                escape = False
+            elif char == "\\":
+                escape = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+        elif char in "}]" and stack:
+            stack.pop()
+    if in_string:
+        text += '"'
+    text = re.sub(r"[,:]\s*$", "", text.rstrip())
+    text = re.sub(r",\s*([}\]])", r"\1", text)
+    return text + "".join(reversed(stack))
+
+
+def parse_structured(text: str, target: Any) -> Any:
+    """
+    Validate JSON text as target, repairing it if needed.
+
+    Optional top-level fields that fail validation are dropped rather than
+    failing the whole response.
+    """
+    adapter = TypeAdapter(target)
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        try:
+            data = json.loads(repair_json(text))
+        except json.JSONDecodeError as e:
+            raise StructuredOutputError(f"Invalid JSON response: {e}")
+
+    required = set(adapter.json_schema().get("required", []))
+    for _ in range(2):
+        try:
+            return adapter.validate_python(data)
+        except ValidationError as e:
+            bad = {error["loc"][0] for error in e.errors() if error["loc"]}
+            if not isinstance(data, dict) or not bad or bad & required:
+                raise StructuredOutputError(f"Response does not match the schema: {e}")
+            data = {k: v for k, v in data.items() if k not in bad}
+    raise StructuredOutputError("Response does not match the schema")
+
+
+def generate_structured(model, prompt: str, target: Any, generation_config=None,
+                        schema: Optional[Dict[str, Any]] = None, attempts: int = 2) -> Tuple[Any, str]:
+    """
+    Stream a JSON response for prompt and return (validated target, raw JSON).
+
+    generation_config should come from json_generation_config(schema). A
+    response that fails the streaming check is abandoned at that point and
+    retried, up to attempts times.
+    """
+    schema = schema or gemini_schema(target)
+    last_error: Optional[Exception] = None
+    for _ in range(attempts):
+        validator = StreamingJSONValidator(schema)
+        try:
+            for chunk in model.generate_content(prompt, generation_config=generation_config, stream=True):
+                if chunk.text and validator.feed(chunk.text):
+                    break  # Root value closed; don't wait for trailing tokens
+            if not validator.started:
+                raise StructuredOutputError("No JSON value in response")
+            raw = validator.value()
+            return parse_structured(raw, target), raw
+        except StructuredOutputError as e:
+            last_error = e
+            print(f"⚠️ Structured output rejected: {e}")
+    raise StructuredOutputError(f"No schema-valid response after {attempts} attempts: {last_error}")
@@ -101,6 +101,9 @@ class StructuredDocumentParser:
             r'(occupation.*right.*)',
             r'([A-Z\s]{10,}(?:CERTIFICATE|TITLE|FORM|APPLICATION).*)'
         ]
+        
+        # Installed Tesseract language packs, looked up once on first use
+        self._tesseract_languages = None
 
     def _find_tesseract(self):
         """Try to find Tesseract installation automatically"""
@@ -173,10 +176,145 @@ class StructuredDocumentParser:
         
         return [original] + variants
     
-    def extract_text_with_layout(self, image: np.ndarray) -> Dict[str, Any]:
+    def _available_languages(self) -> List[str]:
+        """Installed Tesseract language packs (cached)"""
+        if self._tesseract_languages is None:
+            try:
+                self._tesseract_languages = pytesseract.get_languages(config='')
+            except Exception:
+                self._tesseract_languages = ['eng']
+        return self._tesseract_languages
+    
+    @staticmethod
+    def _glyph_height(ink: np.ndarray) -> float:
+        """Median height of glyph-sized connected components, the page's text scale"""
+        _, _, stats, _ = cv2.connectedComponentsWithStats(ink, connectivity=8)
+        heights = stats[1:, cv2.CC_STAT_HEIGHT]
+        widths = stats[1:, cv2.CC_STAT_WIDTH]
+        glyphs = (heights >= 5) & (widths < 10 * heights) & (heights < ink.shape[0] // 4)
+        return float(np.median(heights[glyphs])) if glyphs.any() else 10.0
+    
+    @staticmethod
+    def _ruling_mask(ink: np.ndarray, glyph_height: float) -> np.ndarray:
+        """Table rulings and box edges: strokes far longer than any word or glyph
+        
+        The ink is thickened across each direction before the opening so that
+        rulings in slightly skewed scans still form one straight run.
+        """
+        horizontal = cv2.morphologyEx(
+            cv2.dilate(ink, np.ones((5, 1), np.uint8)), cv2.MORPH_OPEN,
+            cv2.getStructuringElement(cv2.MORPH_RECT, (int(max(15 * glyph_height, 40)), 1))
+        )
+        vertical = cv2.morphologyEx(
+            cv2.dilate(ink, np.ones((1, 5), np.uint8)), cv2.MORPH_OPEN,
+            cv2.getStructuringElement(cv2.MORPH_RECT, (1, int(max(3 * glyph_height, 20))))
+        )
+        return cv2.dilate(horizontal | vertical, np.ones((3, 3), np.uint8))
+    
+    @staticmethod
+    def _headline(band: np.ndarray, min_run: int):
+        """Row of the band best covered by horizontal runs of at least min_run pixels
+        
+        Returns (covered pixels, row, column mask of those runs).
+        """
+        edges = np.diff(np.pad(band.astype(np.int8), ((0, 0), (1, 1))), axis=1)
+        best = (0, 0, None)
+        for row in range(band.shape[0]):
+            starts = np.flatnonzero(edges[row] == 1)
+            lengths = np.flatnonzero(edges[row] == -1) - starts
+            long_runs = lengths >= min_run
+            covered = int(lengths[long_runs].sum())
+            if covered > best[0]:
+                mask = np.zeros(band.shape[1], dtype=bool)
+                for start, length in zip(starts[long_runs], lengths[long_runs]):
+                    mask[start:start + length] = True
+                best = (covered, row, mask)
+        return best
+    
+    def _devanagari_word_ratio(self, binary: np.ndarray) -> float:
+        """Fraction of word blobs that carry a Devanagari headline (shirorekha)
+        
+        Devanagari words hang from a continuous horizontal stroke across the top
+        of the glyph band, which Latin words do not have, so it is a cheap script
+        cue that needs no OCR pass. Rulings are removed first and boxed fields
+        skipped, and the headline must be a thin stroke with glyph bodies hanging
+        below it: blurred bold Latin merges into solid tops, underlines and
+        leftover rulings have nothing under them.
+        """
+        ink = (binary < 128).astype(np.uint8)
+        glyph_height = self._glyph_height(ink)
+        text = ink & (1 - self._ruling_mask(ink, glyph_height))
+        min_run = max(3, int(glyph_height))
+        probe_offset = max(2, int(round(glyph_height * 0.3)))
+        
+        # Merge neighbouring glyphs into word blobs
+        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (9, 3))
+        blobs = cv2.dilate(text, kernel)
+        contours, hierarchy = cv2.findContours(blobs, cv2.RETR_CCOMP, cv2.CHAIN_APPROX_SIMPLE)
+        if hierarchy is None:
+            return 0.0
+        hierarchy = hierarchy[0]
+        
+        word_count = 0
+        devanagari_count = 0
+        for idx, contour in enumerate(contours):
+            if hierarchy[idx][3] != -1:
+                continue  # A hole, handled with its outer blob
+            x, y, w, h = cv2.boundingRect(contour)
+            # Skip specks and isolated glyphs
+            if h < 8 or w < 2 * h:
+                continue
+            # Skip boxed fields: a blob enclosing a large hole is a frame, not a word
+            hole_area, child = 0.0, hierarchy[idx][2]
+            while child != -1:
+                hole_area += cv2.contourArea(contours[child])
+                child = hierarchy[child][0]
+            if hole_area > 0.25 * w * h:
+                continue
+            
+            word = text[y:y+h, x:x+w].astype(bool)
+            inked_columns = word.any(axis=0).sum()
+            word_count += 1
+            covered, row, mask = self._headline(word[:max(1, int(h * 0.6))], min_run)
+            if mask is None or covered < 0.65 * inked_columns:
+                continue
+            
+            # Walk up to the top edge of the stroke, then look just below it
+            while row > 0 and word[row - 1][mask].mean() > 0.5:
+                row -= 1
+            hanging = word[min(h - 1, row + probe_offset)][mask].mean()
+            if 0.1 <= hanging <= 0.8:
+                devanagari_count += 1
+        
+        return devanagari_count / word_count if word_count else 0.0
+    
+    def detect_ocr_language(self, binary: np.ndarray) -> str:
+        """Pick 'eng', 'hin' or 'eng+hin' for a binarized page or region
+        
+        eng+hin roughly doubles recognition time, so Hindi is only added when
+        Devanagari is actually present and the hin pack is installed. If the
+        script check itself fails the page is read as English.
+        """
+        if 'hin' not in self._available_languages():
+            return 'eng'
+        
+        # Calibrated on English and Hindi FRA forms, including ruled tables,
+        # boxed fields and all-caps headings: English pages stay below 0.01
+        try:
+            ratio = self._devanagari_word_ratio(binary)
+        except Exception as e:
+            print(f"⚠️ Script detection failed, using English OCR: {str(e)}")
+            return 'eng'
+        if ratio < 0.05:
+            return 'eng'
+        if ratio > 0.85:
+            return 'hin'
+        return 'eng+hin'
+    
+    def extract_text_with_layout(self, image: np.ndarray, lang: str = 'eng') -> Dict[str, Any]:
         """Extract text with detailed layout information"""
         # Get bounding box data
-        data = pytesseract.image_to_data(image, output_type=pytesseract.Output.DICT)
+        data = pytesseract.image_to_data(image, lang=lang, output_type=pytesseract.Output.DICT)
         
         # Filter high confidence text
         words_info = []
@@ -219,6 +357,91 @@ class StructuredDocumentParser:
             'avg_confidence': np.mean([w['confidence'] for w in words_info]) if words_info else 0
         }
     
+    def fuse_extractions(self, extractions: List[Dict[str, Any]], iou_threshold: float = 0.5) -> Dict[str, Any]:
+        """Fuse OCR results from several preprocessing variants into one reading
+        
+        Words from all variants are aligned by bounding-box overlap and, for each
+        location, the highest-confidence reading wins. Returns a result shaped like
+        extract_text_with_layout(), or None if no variant produced any words.
+        """
+        words = [word for extraction in extractions for word in extraction['words_info']]
+        if not words:
+            return None
+        
+        boxes = np.array(
+            [[w['left'], w['top'], w['left'] + w['width'], w['top'] + w['height']] for w in words],
+            dtype=np.float32
+        )
+        confidences = np.array([w['confidence'] for w in words], dtype=np.float32)
+        areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+        
+        # Bucket boxes into rows of one word height; boxes that overlap vertically
+        # share a bucket, so each box is only compared with its own rows
+        row_height = max(float(np.median(boxes[:, 3] - boxes[:, 1])), 1.0)
+        first_row = (boxes[:, 1] // row_height).astype(int)
+        last_row = (boxes[:, 3] // row_height).astype(int)
+        rows = defaultdict(list)
+        for idx in range(len(words)):
+            for row in range(first_row[idx], last_row[idx] + 1):
+                rows[row].append(idx)
+        
+        # Keep the most confident reading at each location, suppress overlapping ones
+        suppressed = np.zeros(len(words), dtype=bool)
+        keep = []
+        for idx in np.argsort(-confidences, kind='stable'):
+            if suppressed[idx]:
+                continue
+            keep.append(idx)
+            candidates = np.unique(np.concatenate([rows[row] for row in range(first_row[idx], last_row[idx] + 1)]))
+            inter_w = np.clip(np.minimum(boxes[idx, 2], boxes[candidates, 2]) - np.maximum(boxes[idx, 0], boxes[candidates, 0]), 0, None)
+            inter_h = np.clip(np.minimum(boxes[idx, 3], boxes[candidates, 3]) - np.maximum(boxes[idx, 1], boxes[candidates, 1]), 0, None)
+            intersection = inter_w * inter_h
+            iou = intersection / (areas[idx] + areas[candidates] - intersection + 1e-6)
+            suppressed[candidates[iou > iou_threshold]] = True
+        keep = np.array(keep)
+        
+        # Rebuild lines: a new line starts when the vertical centre jumps by over half a word height
+        kept_boxes = boxes[keep]
+        centers_y = (kept_boxes[:, 1] + kept_boxes[:, 3]) / 2
+        median_height = max(float(np.median(kept_boxes[:, 3] - kept_boxes[:, 1])), 1.0)
+        by_y = np.argsort(centers_y, kind='stable')
+        line_breaks = np.diff(centers_y[by_y], prepend=centers_y[by_y][0]) > median_height / 2
+        line_ids = np.empty(len(keep), dtype=int)
+        line_ids[by_y] = np.cumsum(line_breaks)
+        reading_order = np.lexsort((kept_boxes[:, 0], line_ids))
+        
+        words_info = []
+        line_texts = []
+        raw_data = {key: [] for key in ('level', 'page_num', 'block_num', 'par_num', 'line_num', 'word_num',
+                                        'left', 'top', 'width', 'height', 'conf', 'text')}
+        current_line, word_num = None, 0
+        for pos in reading_order:
+            word = dict(words[keep[pos]])
+            if line_ids[pos] != current_line:
+                current_line, word_num = line_ids[pos], 0
+                line_texts.append(word['text'])
+            else:
+                line_texts[-1] += " " + word['text']
+            word_num += 1
+            word['line_num'] = int(line_ids[pos]) + 1
+            word['word_num'] = word_num
+            words_info.append(word)
+            # Word-level rows in pytesseract's image_to_data layout
+            for key, value in (('level', 5), ('page_num', 1), ('block_num', 1), ('par_num', 1),
+                               ('line_num', word['line_num']), ('word_num', word_num),
+                               ('left', word['left']), ('top', word['top']), ('width', word['width']),
+                               ('height', word['height']), ('conf', word['confidence']), ('text', word['text'])):
+                raw_data[key].append(value)
+        
+        return {
+            'full_text': "".join(line + "\n" for line in line_texts),
+            'line_texts': line_texts,
+            'words_info': words_info,
+            'raw_data': raw_data,
+            'avg_confidence': float(np.mean(confidences[keep])),
+            'variant_id': 'fused'
+        }
+    
     def extract_document_title(self, text: str) -> str:
         """Extract document title/heading with better accuracy"""
         lines = [line.strip() for line in text.split('\n') if line.strip()]
@@ -400,9 +623,12 @@ class StructuredDocumentParser:
             
             all_extractions = []
             
+            # Detect the script once per page and reuse it for every variant
+            ocr_language = self.detect_ocr_language(image_variants[1])
+            
             for i, variant in enumerate(image_variants[1:], 1):  # Skip original
                 try:
-                    ocr_result = self.extract_text_with_layout(variant)
+                    ocr_result = self.extract_text_with_layout(variant, lang=ocr_language)
                     ocr_result['variant_id'] = i
                     all_extractions.append(ocr_result)
                     
@@ -415,6 +641,12 @@ class StructuredDocumentParser:
             if not best_result:
                 raise Exception("Failed to extract text from any variant")
             
+            # Combine the best word readings from every variant we already paid for
+            if len(all_extractions) > 1:
+                fused_result = self.fuse_extractions(all_extractions)
+                if fused_result:
+                    best_result = fused_result
+            
             # Extract title
             title = self.extract_document_title(best_result['full_text'])
             
@@ -448,6 +680,7 @@ class StructuredDocumentParser:
                 'full_text': best_result['full_text'],
                 'ocr_confidence': best_result['avg_confidence'],
                 'extraction_variants': len(all_extractions),
+                'ocr_language': ocr_language,
                 'processing_status': 'success'
             }
             
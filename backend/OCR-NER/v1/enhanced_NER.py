@@ -9,6 +9,11 @@ from PIL import Image
 import pandas as pd
 from collections import defaultdict
 import os
+import sys
+
+# Shared lazy model registry lives one level up in OCR-NER
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from model_registry import model_registry
 
 # For table detection (install: pip install table-transformer or layoutparser)
 try:
@@ -43,27 +48,22 @@ class ExtractedData:
     processing_method: str
 
 class OfflineDocumentExtractor:
-    def __init__(self, tesseract_path: str = None):
-        """Initialize offline document extractor"""
+    def __init__(self, tesseract_path: str = None, batched_recognition: bool = True, ocr_batch_size: int = 16):
+        """Initialize offline document extractor
+        
+        Args:
+            tesseract_path: Optional path to the Tesseract binary
+            batched_recognition: Detect text once per page and recognize all crops in a
+                single batched EasyOCR call instead of one readtext() per crop
+            ocr_batch_size: Recognizer batch size used in batched mode (16 suits CPU)
+        """
         if tesseract_path:
             pytesseract.pytesseract.tesseract_cmd = tesseract_path
         
-        # Initialize EasyOCR if available
-        if EASYOCR_AVAILABLE:
-            self.easyocr_reader = easyocr.Reader(['en', 'hi'])  # English and Hindi
-        
-        # Initialize layout parser if available
-        if LAYOUT_AVAILABLE:
-            try:
-                # Download pre-trained model for table detection
-                self.layout_model = lp.Detectron2LayoutModel(
-                    'lp://PubLayNet/faster_rcnn_R_50_FPN_3x/config',
-                    extra_config=["MODEL.ROI_HEADS.SCORE_THRESH_TEST", 0.8],
-                    label_map={0: "Text", 1: "Title", 2: "List", 3: "Table", 4: "Figure"}
-                )
-            except:
-                self.layout_model = None
-                print("Could not load layout model")
+        self.batched_recognition = batched_recognition
+        self.ocr_batch_size = ocr_batch_size
+        
+        # EasyOCR and the layout model are loaded lazily from the shared registry
         
         # Enhanced field patterns for Indian government forms
         self.field_mapping = {
@@ -142,6 +142,18 @@ class OfflineDocumentExtractor:
             }
         }
     
+    @property
+    def easyocr_reader(self):
+        """Shared EasyOCR reader, loaded on first use"""
+        return model_registry.get("easyocr")
+    
+    @property
+    def layout_model(self):
+        """Shared PubLayNet layout model, or None if it could not be loaded"""
+        if not LAYOUT_AVAILABLE:
+            return None
+        return model_registry.get_optional("layout")
+    
     def preprocess_image_for_tables(self, image_path: str) -> np.ndarray:
         """Preprocess image specifically for table extraction"""
         img = cv2.imread(image_path)
@@ -156,8 +168,12 @@ class OfflineDocumentExtractor:
         
         return binary
     
-    def detect_table_structure(self, image: np.ndarray) -> List[TableCell]:
-        """Detect table structure using computer vision"""
+    def detect_table_structure(self, image: np.ndarray, offset: Tuple[int, int] = (0, 0)) -> List[TableCell]:
+        """Detect table structure using computer vision
+        
+        offset is the (x, y) position of image within the page, used when a
+        single layout region is passed in instead of the whole page.
+        """
         # Find horizontal and vertical lines
         horizontal_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (40, 1))
         vertical_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (1, 40))
@@ -171,43 +187,165 @@ class OfflineDocumentExtractor:
         # Find contours for table cells
         contours, _ = cv2.findContours(table_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
         
-        # Extract text from each potential cell
-        cells = []
-        for i, contour in enumerate(contours):
+        # Collect candidate cell boxes first so they can be recognized together
+        boxes = []
+        for contour in contours:
             x, y, w, h = cv2.boundingRect(contour)
             if w > 50 and h > 20:  # Filter small contours
-                cell_img = image[y:y+h, x:x+w]
-                
-                # Extract text from cell
-                if EASYOCR_AVAILABLE:
-                    results = self.easyocr_reader.readtext(cell_img)
-                    text = " ".join([result[1] for result in results if result[2] > 0.5])
-                    avg_conf = np.mean([result[2] for result in results]) if results else 0
-                else:
-                    text = pytesseract.image_to_string(cell_img).strip()
-                    avg_conf = 0.7  # Default confidence for pytesseract
-                
-                if text.strip():
-                    cells.append(TableCell(
-                        text=text.strip(),
-                        bbox=(x, y, x+w, y+h),
-                        confidence=avg_conf,
-                        row_idx=int(y/30),  # Approximate row based on y position
-                        col_idx=int(x/200)  # Approximate column based on x position
-                    ))
+                boxes.append((x, y, w, h))
+        
+        if EASYOCR_AVAILABLE and self.batched_recognition:
+            cell_results = self._recognize_cells_batched(image, boxes)
+        else:
+            cell_results = [self._recognize_cell(image[y:y+h, x:x+w]) for x, y, w, h in boxes]
+        
+        # Extract text from each potential cell
+        cells = []
+        for (x, y, w, h), (text, avg_conf) in zip(boxes, cell_results):
+            x, y = x + offset[0], y + offset[1]
+            if text.strip():
+                cells.append(TableCell(
+                    text=text.strip(),
+                    bbox=(x, y, x+w, y+h),
+                    confidence=avg_conf,
+                    row_idx=int(y/30),  # Approximate row based on y position
+                    col_idx=int(x/200)  # Approximate column based on x position
+                ))
         
         return cells
     
+    def _recognize_cell(self, cell_img: np.ndarray) -> Tuple[str, float]:
+        """Recognize a single cell crop (unbatched path)"""
+        if EASYOCR_AVAILABLE:
+            results = self.easyocr_reader.readtext(cell_img)
+            text = " ".join([result[1] for result in results if result[2] > 0.5])
+            avg_conf = np.mean([result[2] for result in results]) if results else 0
+        else:
+            text = pytesseract.image_to_string(cell_img).strip()
+            avg_conf = 0.7  # Default confidence for pytesseract
+        return text, avg_conf
+    
+    def _recognize_cells_batched(self, image: np.ndarray, boxes: List[Tuple[int, int, int, int]]) -> List[Tuple[str, float]]:
+        """Recognize all cell boxes with one batched EasyOCR recognize() call"""
+        if not boxes:
+            return []
+        
+        # EasyOCR expects horizontal boxes as [x_min, x_max, y_min, y_max]
+        horizontal_list = [[x, x + w, y, y + h] for x, y, w, h in boxes]
+        results = self.easyocr_reader.recognize(
+            image,
+            horizontal_list=horizontal_list,
+            free_list=[],
+            batch_size=self.ocr_batch_size
+        )
+        
+        # recognize() reorders crops by vertical position, so map back by top-left corner
+        by_corner = defaultdict(list)
+        for bbox, text, conf in results:
+            x_min, y_min = int(bbox[0][0]), int(bbox[0][1])
+            by_corner[(x_min, y_min)].append((text, conf))
+        
+        cell_results = []
+        for x, y, w, h in boxes:
+            readings = by_corner.get((x, y), [])
+            text = " ".join([t for t, conf in readings if conf > 0.5])
+            avg_conf = np.mean([conf for _, conf in readings]) if readings else 0
+            cell_results.append((text, avg_conf))
+        return cell_results
+    
+    def _read_page_text(self, image) -> List[Tuple[Any, str, float]]:
+        """Run EasyOCR on a page (path or array), detecting once and recognizing in batches"""
+        if not self.batched_recognition:
+            return self.easyocr_reader.readtext(image)
+        
+        page = cv2.imread(image) if isinstance(image, str) else image
+        horizontal_list, free_list = self.easyocr_reader.detect(page)
+        return self.easyocr_reader.recognize(
+            page,
+            horizontal_list=horizontal_list[0],
+            free_list=free_list[0],
+            batch_size=self.ocr_batch_size
+        )
+    
+    def _ocr_region(self, page: np.ndarray, bbox: Tuple[int, int, int, int]) -> str:
+        """OCR a single layout region of the page"""
+        x1, y1, x2, y2 = bbox
+        crop = page[y1:y2, x1:x2]
+        if crop.size == 0:
+            return ""
+        if EASYOCR_AVAILABLE:
+            results = self._read_page_text(crop)
+            return " ".join([result[1] for result in results if result[2] > 0.3])
+        return pytesseract.image_to_string(crop).strip()
+    
+    def _extract_with_layout_routing(self, image_path: str, processed_img: np.ndarray):
+        """Run the layout model once and route each region to the matching extractor
+        
+        Returns (title_text, body_text, table_cells), or None when no layout model is
+        available or it finds no usable regions. Figure regions (seals, photos,
+        signatures) are never OCR'd.
+        """
+        layout_model = self.layout_model
+        if layout_model is None:
+            return None
+        
+        page = cv2.imread(image_path)
+        height, width = page.shape[:2]
+        layout = layout_model.detect(cv2.cvtColor(page, cv2.COLOR_BGR2RGB))
+        
+        regions = defaultdict(list)
+        for block in layout:
+            x1, y1, x2, y2 = [int(v) for v in block.coordinates]
+            x1, y1 = max(x1, 0), max(y1, 0)
+            x2, y2 = min(x2, width), min(y2, height)
+            if x2 > x1 and y2 > y1:
+                regions[block.type].append((x1, y1, x2, y2))
+        
+        if not any(regions.get(label) for label in ("Text", "Title", "List", "Table")):
+            return None
+        
+        # Keep reading order top-to-bottom within each region type
+        def in_reading_order(label):
+            return sorted(regions.get(label, []), key=lambda b: (b[1], b[0]))
+        
+        title_text = "\n".join(self._ocr_region(page, bbox) for bbox in in_reading_order("Title"))
+        text_boxes = sorted(regions.get("Text", []) + regions.get("List", []), key=lambda b: (b[1], b[0]))
+        body_text = "\n".join(self._ocr_region(page, bbox) for bbox in text_boxes)
+        
+        table_cells = []
+        for x1, y1, x2, y2 in in_reading_order("Table"):
+            table_cells.extend(self.detect_table_structure(processed_img[y1:y2, x1:x2], offset=(x1, y1)))
+        
+        return title_text, body_text, table_cells
+    
     def extract_with_enhanced_ocr(self, image_path: str) -> ExtractedData:
         """Enhanced extraction using better OCR and table detection"""
         
         # Preprocess image
         processed_img = self.preprocess_image_for_tables(image_path)
         
+        # Preferred path: layout-routed OCR that skips figures entirely
+        routed = self._extract_with_layout_routing(image_path, processed_img)
+        if routed:
+            title_text, full_text, table_cells = routed
+            title = self._extract_title_offline(title_text if title_text.strip() else full_text)
+            table_data = self._organize_table_data(table_cells)
+            pattern_fields = self._extract_fields_with_patterns(full_text)
+            table_fields = self._extract_from_table_structure(table_data)
+            final_fields = {**pattern_fields, **table_fields}
+            
+            return ExtractedData(
+                document_title=title,
+                structured_fields=final_fields,
+                table_data=table_data,
+                confidence_scores=self._calculate_confidence_scores(final_fields, full_text),
+                processing_method="Offline Layout-Routed OCR + Table Detection"
+            )
+        
         # Method 1: EasyOCR if available (better for mixed language)
         full_text = ""
         if EASYOCR_AVAILABLE:
-            results = self.easyocr_reader.readtext(image_path)
+            results = self._read_page_text(image_path)
             full_text = " ".join([result[1] for result in results if result[2] > 0.3])
         else:
             # Fallback to Tesseract
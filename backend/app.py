@@ -5,7 +5,7 @@ FastAPI server for OCR-NER processing and asset mapping functionality
 
 from fastapi import FastAPI, File, UploadFile, HTTPException, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 import os
@@ -17,6 +17,18 @@ import asyncio
 import json
 from datetime import datetime
 import base64
+import functools
+import traceback
+
+try:
+    import aiofiles
+except ImportError:
+    aiofiles = None
+
+try:
+    import cv2
+except ImportError:
+    cv2 = None
 
 # Add OCR-NER to path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'OCR-NER'))
@@ -38,6 +50,12 @@ except ImportError as e:
     DocumentClassifierAgent = None
     ocr_modules_available = False
 
+try:
+    from model_registry import model_registry
+except ImportError as e:
+    print(f"❌ Model registry not available: {e}")
+    model_registry = None
+
 app = FastAPI(
     title="BanRakshak Backend API",
     description="Forest Rights Management Platform Backend",
@@ -80,6 +98,43 @@ processing_tasks: Dict[str, ProcessingStatus] = {}
 UPLOAD_DIR = Path("uploads")
 UPLOAD_DIR.mkdir(exist_ok=True)
 
+# Blocking file and CPU work in handlers runs off the event loop
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+async def run_blocking(fn, *args, **kwargs):
+    """Run a blocking call in the default thread pool"""
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(None, functools.partial(fn, *args, **kwargs))
+
+def _encoding(mode: str) -> Dict[str, str]:
+    return {} if "b" in mode else {"encoding": "utf-8"}
+
+def _write_file(path: str, data, mode: str):
+    with open(path, mode, **_encoding(mode)) as f:
+        f.write(data)
+
+def _read_file(path: str, mode: str):
+    with open(path, mode, **_encoding(mode)) as f:
+        return f.read()
+
+def _copy_upload(source, path: str):
+    with open(path, "wb") as buffer:
+        shutil.copyfileobj(source, buffer)
+
+async def write_file(path: str, data, mode: str = "wb"):
+    """Write bytes ("wb") or text ("w") without blocking the event loop"""
+    if aiofiles is None:
+        return await run_blocking(_write_file, path, data, mode)
+    async with aiofiles.open(path, mode, **_encoding(mode)) as f:
+        await f.write(data)
+
+async def read_file(path: str, mode: str = "r"):
+    """Read text ("r") or bytes ("rb") without blocking the event loop"""
+    if aiofiles is None:
+        return await run_blocking(_read_file, path, mode)
+    async with aiofiles.open(path, mode, **_encoding(mode)) as f:
+        return await f.read()
+
 # Initialize OCR components
 parser = None
 classifier = None
@@ -97,6 +152,53 @@ if ocr_modules_available and StructuredDocumentParser and DocumentClassifierAgen
 else:
     print("❌ OCR modules not available - running in limited mode")
 
+# Initialize local land-cover segmentation (UNet loaded once for the process)
+sys.path.append(os.path.join(os.path.dirname(__file__), 'asset-map'))
+
+land_cover_segmenter = None
+try:
+    from AssetMapInference import LandCoverSegmenter, colorize
+    land_cover_segmenter = LandCoverSegmenter()
+    print("✅ Land cover segmenter initialized successfully")
+except Exception as e:
+    print(f"⚠️ Local land cover segmenter not available, using remote model: {e}")
+
+segmentation_service = None
+try:
+    from segmentation_service import LocalSegmentationService, RemoteSegmentationService
+    if land_cover_segmenter is not None:
+        segmentation_service = LocalSegmentationService(land_cover_segmenter, colorize)
+    else:
+        # Pooled, lazily connected Gradio client (ASSET_MAPPING_SPACE may point at a local stub)
+        segmentation_service = RemoteSegmentationService()
+except ImportError as e:
+    print(f"❌ Segmentation service not available: {e}")
+
+# Keyed, atomically written DSS inputs (land cover per claim)
+sys.path.append(os.path.join(os.path.dirname(__file__), 'DSS'))
+try:
+    from result_store import land_cover_store, scheme_repository
+    from pipeline import DSSPipeline
+    dss_modules_available = True
+except ImportError as e:
+    print(f"❌ DSS modules not available: {e}")
+    land_cover_store = None
+    scheme_repository = None
+    DSSPipeline = None
+    dss_modules_available = False
+
+DSS_UNAVAILABLE = {"success": False, "error": "DSS modules not available"}
+
+@app.on_event("startup")
+async def warm_models():
+    """Optionally preload shared models, e.g. WARM_MODELS=easyocr,layout"""
+    warm_list = os.getenv("WARM_MODELS", "")
+    if model_registry and warm_list.strip():
+        names = [name.strip() for name in warm_list.split(",") if name.strip()]
+        loop = asyncio.get_event_loop()
+        warmed = await loop.run_in_executor(None, model_registry.warm, names)
+        print(f"🔥 Model warm-up: {warmed}")
+
 @app.get("/")
 async def root():
     """Health check endpoint"""
@@ -117,8 +219,55 @@ async def health_check():
         "services": {
             "ocr_parser": parser is not None,
             "document_classifier": classifier is not None,
+            "land_cover_segmenter": land_cover_segmenter is not None,
             "upload_directory": UPLOAD_DIR.exists()
-        }
+        },
+        "models": model_registry.stats() if model_registry else {},
+        "land_cover_tile_cache": land_cover_segmenter.tile_cache.stats() if land_cover_segmenter else {},
+        "segmentation_service": segmentation_service.stats() if segmentation_service else {},
+        "land_cover_store": land_cover_store.stats() if land_cover_store else {},
+        "scheme_repository": scheme_repository.stats() if scheme_repository else {}
+    }
+
+def analyze_document(file_path: str, filename: str, progress=None) -> Dict[str, Any]:
+    """OCR + classification of one document; progress(percent) is called between steps"""
+    if not parser or not classifier:
+        raise Exception("OCR components not available")
+    
+    # Step 1: Extract text and structure (30% progress)
+    if progress:
+        progress(30)
+    extraction_results = parser.parse_document_comprehensive(file_path, show_images=False)
+    
+    if extraction_results['processing_status'] != 'success':
+        raise Exception(f"Text extraction failed: {extraction_results['processing_status']}")
+    
+    # Step 2: Classify document (60% progress)
+    if progress:
+        progress(60)
+    classification = None
+    if extraction_results.get('full_text'):
+        classification = classifier.classify(extraction_results['full_text'])
+    
+    # Step 3: Prepare final results (90% progress)
+    if progress:
+        progress(90)
+    
+    # Create result object
+    return {
+        "extraction": extraction_results,
+        "classification": {
+            "document_type": classification.document_type if classification else "Unknown",
+            "confidence_level": classification.confidence_level.value if classification else "LOW",
+            "confidence_score": classification.confidence_score if classification else 0,
+            "reasoning": classification.reasoning if classification else "",
+            "key_indicators": classification.key_indicators if classification else [],
+            "suggested_actions": classification.suggested_actions if classification else [],
+            "document_purpose": classification.document_purpose if classification else "",
+            "issuing_authority": classification.issuing_authority if classification else ""
+        } if classification else None,
+        "processed_at": datetime.now().isoformat(),
+        "filename": filename
     }
 
 async def process_document_background(task_id: str, file_path: str, filename: str):
@@ -128,41 +277,11 @@ async def process_document_background(task_id: str, file_path: str, filename: st
         processing_tasks[task_id].status = "processing"
         processing_tasks[task_id].progress = 10
         
-        if not parser or not classifier:
-            raise Exception("OCR components not available")
+        def set_progress(percent: int):
+            processing_tasks[task_id].progress = percent
         
-        # Step 1: Extract text and structure (30% progress)
-        processing_tasks[task_id].progress = 30
-        extraction_results = parser.parse_document_comprehensive(file_path, show_images=False)
-        
-        if extraction_results['processing_status'] != 'success':
-            raise Exception(f"Text extraction failed: {extraction_results['processing_status']}")
-        
-        # Step 2: Classify document (60% progress)
-        processing_tasks[task_id].progress = 60
-        classification = None
-        if extraction_results.get('full_text'):
-            classification = classifier.classify(extraction_results['full_text'])
-        
-        # Step 3: Prepare final results (90% progress)
-        processing_tasks[task_id].progress = 90
-        
-        # Create result object
-        result = {
-            "extraction": extraction_results,
-            "classification": {
-                "document_type": classification.document_type if classification else "Unknown",
-                "confidence_level": classification.confidence_level.value if classification else "LOW",
-                "confidence_score": classification.confidence_score if classification else 0,
-                "reasoning": classification.reasoning if classification else "",
-                "key_indicators": classification.key_indicators if classification else [],
-                "suggested_actions": classification.suggested_actions if classification else [],
-                "document_purpose": classification.document_purpose if classification else "",
-                "issuing_authority": classification.issuing_authority if classification else ""
-            } if classification else None,
-            "processed_at": datetime.now().isoformat(),
-            "filename": filename
-        }
+        # OCR and classification block for seconds; keep them off the event loop
+        result = await run_blocking(analyze_document, file_path, filename, progress=set_progress)
         
         # Complete processing
         processing_tasks[task_id].status = "completed"
@@ -197,8 +316,12 @@ async def upload_document(
     # Save uploaded file
     file_path = UPLOAD_DIR / f"{task_id}_{file.filename}"
     try:
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        if aiofiles is not None:
+            async with aiofiles.open(file_path, "wb") as buffer:
+                while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                    await buffer.write(chunk)
+        else:
+            await run_blocking(_copy_upload, file.file, str(file_path))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to save file: {e}")
     
@@ -299,9 +422,9 @@ async def delete_task(task_id: str):
         raise HTTPException(status_code=404, detail="Task not found")
     
     # Remove file if it exists
-    for file_path in UPLOAD_DIR.glob(f"{task_id}_*"):
+    for file_path in await run_blocking(list, UPLOAD_DIR.glob(f"{task_id}_*")):
         try:
-            file_path.unlink()
+            await run_blocking(file_path.unlink)
         except Exception as e:
             print(f"Warning: Could not delete file {file_path}: {e}")
     
@@ -344,38 +467,38 @@ async def dss_analyze(request_data: Dict[str, Any]):
     """
     DSS Analysis endpoint for land cover and FRA data processing
     """
+    if not dss_modules_available:
+        return DSS_UNAVAILABLE
     try:
         analysis_type = request_data.get("analysisType", "land_cover")
         
         if analysis_type == "land_cover":
-            # Read the land cover data from the examples file
-            land_cover_file = os.path.join(os.path.dirname(__file__), "DSS", "examples", "land_cover.txt")
+            # Land cover for the requested claim, or the most recent asset-mapping run
+            claim_id = request_data.get("claimId")
+            # Store reads hit the disk on a cache miss
+            record = await run_blocking(land_cover_store.get, claim_id) if claim_id else await run_blocking(land_cover_store.latest)
             
-            if os.path.exists(land_cover_file):
-                land_cover_data = {}
-                with open(land_cover_file, 'r') as f:
-                    for line in f:
-                        line = line.strip()
-                        if ':' in line:
-                            key, value = line.split(':', 1)
-                            key = key.strip()
-                            value = value.strip().rstrip('%')
-                            try:
-                                land_cover_data[key] = float(value)
-                            except ValueError:
-                                continue
-                
+            if claim_id and record is None:
+                return {
+                    "success": False,
+                    "error": f"No land cover data found for claim {claim_id}",
+                    "message": "Please run asset mapping for this claim first"
+                }
+            
+            if record is not None:
                 return {
                     "success": True,
                     "data": {
-                        "landCoverAnalysis": land_cover_data,
+                        "landCoverAnalysis": record["land_cover_percentages"],
+                        "landCoverHectares": record.get("land_cover_hectares"),
+                        "claimId": record.get("key"),
                         "analysisType": "land_cover",
                         "timestamp": datetime.now().isoformat()
                     },
                     "message": "Land cover analysis completed successfully"
                 }
             else:
-                # Return mock data if file doesn't exist
+                # Return mock data if no asset mapping has been run yet
                 return {
                     "success": True,
                     "data": {
@@ -397,44 +520,30 @@ async def dss_analyze(request_data: Dict[str, Any]):
                 }
         
         elif analysis_type == "scheme_recommendations":
-            # Read the latest scheme analysis JSON from output directory
-            output_dir = os.path.join(os.path.dirname(__file__), "DSS", "output")
+            # Indexed lookup by claim ID or claimant, newest analysis otherwise
+            claim_id = request_data.get("claimId")
+            claimant_name = request_data.get("claimantName")
+            scheme_data = await run_blocking(scheme_repository.get, claim_id=claim_id, claimant_name=claimant_name)
             
-            if os.path.exists(output_dir):
-                # Find the latest scheme_analysis JSON file
-                scheme_files = [f for f in os.listdir(output_dir) if f.startswith("scheme_analysis_") and f.endswith(".json")]
-                
-                if scheme_files:
-                    # Sort by modification time to get the latest
-                    latest_file = max(scheme_files, key=lambda f: os.path.getmtime(os.path.join(output_dir, f)))
-                    scheme_file_path = os.path.join(output_dir, latest_file)
-                    
-                    with open(scheme_file_path, 'r', encoding='utf-8') as f:
-                        scheme_data = json.load(f)
-                    
-                    return {
-                        "success": True,
-                        "data": {
-                            "schemeAnalysis": scheme_data.get("developer_json", {}),
-                            "claimantName": scheme_data.get("claimant_name", ""),
-                            "processingTimestamp": scheme_data.get("processing_timestamp", ""),
-                            "analysisMetadata": scheme_data.get("analysis_metadata", {}),
-                            "analysisType": "scheme_recommendations",
-                            "timestamp": datetime.now().isoformat()
-                        },
-                        "message": "Scheme recommendations retrieved successfully"
-                    }
-                else:
-                    return {
-                        "success": False,
-                        "error": "No scheme analysis data found in output directory",
-                        "message": "Please run the scheme analysis pipeline first"
-                    }
+            if scheme_data is not None:
+                return {
+                    "success": True,
+                    "data": {
+                        "schemeAnalysis": scheme_data.get("developer_json", {}),
+                        "claimantName": scheme_data.get("claimant_name", ""),
+                        "claimId": scheme_data.get("claim_id"),
+                        "processingTimestamp": scheme_data.get("processing_timestamp", ""),
+                        "analysisMetadata": scheme_data.get("analysis_metadata", {}),
+                        "analysisType": "scheme_recommendations",
+                        "timestamp": datetime.now().isoformat()
+                    },
+                    "message": "Scheme recommendations retrieved successfully"
+                }
             else:
                 return {
                     "success": False,
-                    "error": "Output directory not found",
-                    "message": "Please create the output directory and run the analysis"
+                    "error": "No scheme analysis data found" + (f" for {claim_id or claimant_name}" if claim_id or claimant_name else ""),
+                    "message": "Please run the scheme analysis pipeline first"
                 }
         
         else:
@@ -450,6 +559,107 @@ async def dss_analyze(request_data: Dict[str, Any]):
             "error": f"DSS analysis failed: {str(e)}"
         }
 
+# End-to-end DSS pipeline (OCR -> profile -> schemes) with per-stage caching
+class DSSPipelineRequest(BaseModel):
+    claim_id: Optional[str] = None
+    ocr_task_id: Optional[str] = None  # Completed /api/ocr/upload task to take the document from
+    document_path: Optional[str] = None  # Document to OCR (cached by file hash)
+    document_analysis: Optional[Dict[str, Any]] = None  # Already extracted document analysis
+    land_cover: Optional[Dict[str, float]] = None  # Land cover percentages
+    image_path: Optional[str] = None  # Claim image to segment for land cover
+
+dss_pipeline = DSSPipeline(ocr=lambda path: analyze_document(path, os.path.basename(path))) if DSSPipeline else None
+
+@app.post("/api/dss/pipeline")
+async def run_dss_pipeline(request: DSSPipelineRequest):
+    """
+    Run OCR, profile building and scheme analysis for one claim in a single call
+    """
+    if dss_pipeline is None:
+        return DSS_UNAVAILABLE
+    try:
+        document_analysis = request.document_analysis
+        if document_analysis is None and request.ocr_task_id:
+            task = processing_tasks.get(request.ocr_task_id)
+            if not task or task.status != "completed":
+                return {
+                    "success": False,
+                    "error": f"OCR task {request.ocr_task_id} not found or not completed"
+                }
+            document_analysis = task.result
+        
+        land_cover_source = None
+        if request.land_cover is None and request.image_path and segmentation_service is not None:
+            async def segment_claim_image():
+                segmentation = await segmentation_service.segment(request.image_path)
+                if request.claim_id:
+                    await run_blocking(land_cover_store.save, request.claim_id, segmentation["land_cover_percentages"],
+                                       source=request.image_path)
+                return segmentation["land_cover_percentages"]
+            land_cover_source = segment_claim_image()
+        
+        result = await dss_pipeline.run(
+            claim_id=request.claim_id,
+            document_path=request.document_path,
+            document_analysis=document_analysis,
+            land_cover=request.land_cover,
+            land_cover_source=land_cover_source
+        )
+        
+        return {
+            "success": True,
+            "data": {
+                "claimId": result["claim_id"],
+                "profile": result["profile"],
+                "landCover": result["land_cover"],
+                "schemeAnalysis": result["scheme_analysis"].get("developer_json", {}),
+                "userReport": result["scheme_analysis"].get("user_report", ""),
+                "stages": result["stages"],
+                "timestamp": datetime.now().isoformat()
+            },
+            "message": "DSS pipeline completed successfully"
+        }
+    
+    except Exception as e:
+        return {
+            "success": False,
+            "error": f"DSS pipeline failed: {str(e)}"
+        }
+
+# Streamed scheme report: recommendations first, then the narrative as Gemini writes it
+class DSSStreamRequest(BaseModel):
+    profile: Dict[str, Any]  # FRAClaimantProfile, e.g. "profile" from /api/dss/pipeline
+    claim_id: Optional[str] = None  # Index the finished analysis under this claim
+    narrative: bool = True
+
+def sse_event(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+@app.post("/api/dss/schemes/stream")
+async def stream_scheme_report(request: DSSStreamRequest):
+    """
+    Server-sent events: "recommendations", "report" chunks, optional
+    "report_replace", then "done" (or "error")
+    """
+    if dss_pipeline is None:
+        return DSS_UNAVAILABLE
+    
+    def events():
+        # Sync generator: Starlette iterates it in a worker thread
+        try:
+            for event in dss_pipeline.scheme_agent.stream_analysis(request.profile, narrative=request.narrative):
+                if event["event"] == "done" and request.claim_id:
+                    scheme_repository.save(event["data"], claim_id=request.claim_id)
+                yield sse_event(event["event"], event["data"])
+        except Exception as e:
+            yield sse_event("error", {"success": False, "error": f"Scheme report failed: {str(e)}"})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 # FRA Atlas export endpoints
 class FRAExportRequest(BaseModel):
     data: str  # base64 image or JSON string
@@ -464,27 +674,24 @@ async def fra_atlas_export(request: FRAExportRequest):
     try:
         # Create output directory if it doesn't exist
         output_dir = os.path.join(os.path.dirname(__file__), "output", "fra_atlas")
-        os.makedirs(output_dir, exist_ok=True)
+        await run_blocking(os.makedirs, output_dir, exist_ok=True)
         
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         
         if request.type == "image":
             # Handle base64 image
-            import base64
-            
             # Remove data URL prefix if present
             if "base64," in request.data:
                 image_data = request.data.split("base64,")[1]
             else:
                 image_data = request.data
             
-            # Decode and save
-            image_bytes = base64.b64decode(image_data)
+            # Decode and save (large exports take a while to decode)
+            image_bytes = await run_blocking(base64.b64decode, image_data)
             filename = f"fra_polygon_{timestamp}.png"
             filepath = os.path.join(output_dir, filename)
             
-            with open(filepath, "wb") as f:
-                f.write(image_bytes)
+            await write_file(filepath, image_bytes, "wb")
             
             return {
                 "success": True,
@@ -498,8 +705,7 @@ async def fra_atlas_export(request: FRAExportRequest):
             filename = f"fra_claims_{timestamp}.geojson"
             filepath = os.path.join(output_dir, filename)
             
-            with open(filepath, "w", encoding="utf-8") as f:
-                f.write(request.data)
+            await write_file(filepath, request.data, "w")
             
             return {
                 "success": True,
@@ -523,14 +729,84 @@ async def fra_atlas_export(request: FRAExportRequest):
 class AssetMappingRequest(BaseModel):
     image_path: Optional[str] = None  # Path to existing image in backend
     image_filename: Optional[str] = None  # Filename of recently exported image
+    geojson: Optional[Dict[str, Any]] = None  # Claim polygon(s) in EPSG:4326
+    geojson_filename: Optional[str] = None  # Filename of a GeoJSON saved by /api/fra-atlas/export
+    imagery_path: Optional[str] = None  # Georeferenced imagery to segment (defaults to ASSET_IMAGERY_PATH)
+    claim_id: Optional[str] = None  # Key for the stored land cover result (a task ID is generated if omitted)
+
+# Georeferenced imagery used for polygon-masked land cover statistics
+ASSET_IMAGERY_PATH = os.getenv("ASSET_IMAGERY_PATH")
+
+async def _load_claim_geojson(request: AssetMappingRequest) -> Optional[Dict[str, Any]]:
+    """Claim polygons from the request body or a saved FRA Atlas export"""
+    if request.geojson:
+        return request.geojson
+    if request.geojson_filename:
+        geojson_path = os.path.join(os.path.dirname(__file__), "output", "fra_atlas", os.path.basename(request.geojson_filename))
+        return await run_blocking(json.loads, await read_file(geojson_path, "r"))
+    return None
+
+def _latest_png(output_dir: str) -> Optional[str]:
+    """Most recently modified PNG in output_dir, or None"""
+    png_files = [f for f in os.listdir(output_dir) if f.endswith('.png')]
+    if not png_files:
+        return None
+    return max(png_files, key=lambda f: os.path.getmtime(os.path.join(output_dir, f)))
+
+def _save_annotated(segmentation: Dict[str, Any], path: str) -> Optional[str]:
+    """Write the annotated segmentation image to path; None if there isn't one"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if segmentation.get("annotated_rgb") is not None and cv2 is not None:
+        cv2.imwrite(path, cv2.cvtColor(segmentation["annotated_rgb"], cv2.COLOR_RGB2BGR))
+    elif segmentation.get("annotated_image") and os.path.exists(segmentation["annotated_image"]):
+        shutil.copy2(segmentation["annotated_image"], path)
+    else:
+        return None
+    return path
 
 @app.post("/api/asset-mapping/process")
 async def process_asset_mapping(request: AssetMappingRequest):
     """
     Process FRA polygon image through asset mapping model and update DSS land cover data
     """
+    if segmentation_service is None or land_cover_store is None:
+        return {
+            "success": False,
+            "error": "Asset mapping not available: segmentation service or DSS store failed to load"
+        }
     try:
-        from gradio_client import Client, handle_file
+        result_id = request.claim_id or str(uuid.uuid4())
+        
+        # Polygon-masked statistics on georeferenced imagery, when a claim polygon is given
+        claim_geojson = await _load_claim_geojson(request)
+        imagery_path = request.imagery_path or ASSET_IMAGERY_PATH
+        if (claim_geojson and land_cover_segmenter is not None and imagery_path
+                and await run_blocking(os.path.exists, imagery_path)):
+            try:
+                prediction = await run_blocking(land_cover_segmenter.predict_polygon, imagery_path, claim_geojson)
+            except ValueError as e:
+                # Unusable claim geometry, e.g. a polygon outside the imagery
+                return JSONResponse(status_code=422, content={"success": False, "error": str(e)})
+            land_cover_data = prediction["class_percentages"]
+            
+            # Store for DSS under this claim's key
+            land_cover_file = await run_blocking(
+                land_cover_store.save,
+                result_id, land_cover_data, prediction["class_hectares"], prediction["total_hectares"], imagery_path
+            )
+            
+            return {
+                "success": True,
+                "message": "Polygon land cover computed and DSS data updated",
+                "land_cover_data": land_cover_data,
+                "land_cover_hectares": prediction["class_hectares"],
+                "total_hectares": prediction["total_hectares"],
+                "land_cover_file": land_cover_file,
+                "claim_id": result_id,
+                "processed_image": imagery_path,
+                "annotated_image": None,
+                "result": {"model": "local", "masked": True}
+            }
         
         # Determine image path
         if request.image_path:
@@ -542,95 +818,75 @@ async def process_asset_mapping(request: AssetMappingRequest):
         else:
             # Get the most recent image from fra_atlas directory
             output_dir = os.path.join(os.path.dirname(__file__), "output", "fra_atlas")
-            if not os.path.exists(output_dir):
+            if not await run_blocking(os.path.exists, output_dir):
                 return {
                     "success": False,
                     "error": "No FRA Atlas exports found. Please export a polygon image first."
                 }
             
             # Find the latest PNG file
-            png_files = [f for f in os.listdir(output_dir) if f.endswith('.png')]
-            if not png_files:
+            latest_file = await run_blocking(_latest_png, output_dir)
+            if latest_file is None:
                 return {
                     "success": False,
                     "error": "No polygon images found in output directory"
                 }
             
-            latest_file = max(png_files, key=lambda f: os.path.getmtime(os.path.join(output_dir, f)))
             image_path = os.path.join(output_dir, latest_file)
         
         # Verify image exists
-        if not os.path.exists(image_path):
+        if not await run_blocking(os.path.exists, image_path):
             return {
                 "success": False,
                 "error": f"Image not found: {image_path}"
             }
         
-        # Process image through Gradio asset mapping model
-        client = Client("TheAstrophile-KingK/asset-mapping")
-        result = client.predict(
-            input_image=handle_file(image_path),
-            api_name="/predict_image"
-        )
-        
-        # Parse the result
-        # Result format: {"annotated_image": "path/to/image", "land_cover_percentages": {...}}
-        land_cover_data = {}
-        
-        if isinstance(result, dict) and "land_cover_percentages" in result:
-            land_cover_data = result["land_cover_percentages"]
-        elif isinstance(result, tuple) and len(result) > 1:
-            # Sometimes Gradio returns tuple (annotated_image_path, land_cover_dict)
-            land_cover_data = result[1] if isinstance(result[1], dict) else {}
-        
-        # Save to DSS land_cover.txt
-        land_cover_file = os.path.join(os.path.dirname(__file__), "DSS", "examples", "land_cover.txt")
-        os.makedirs(os.path.dirname(land_cover_file), exist_ok=True)
-        
-        with open(land_cover_file, 'w') as f:
-            for key, value in land_cover_data.items():
-                f.write(f"{key}: {value}%\n")
+        # Segment with the local UNet or the pooled remote Space
+        segmentation = await segmentation_service.segment(image_path)
+        land_cover_data = segmentation["land_cover_percentages"]
+        result = segmentation["raw"]
         
-        # Also save the annotated image if available
-        annotated_image_path = None
-        if isinstance(result, dict) and "annotated_image" in result:
-            annotated_image_path = result["annotated_image"]
-        elif isinstance(result, tuple) and len(result) > 0:
-            annotated_image_path = result[0]
+        # Save the annotated image to output
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        saved_annotated_path = os.path.join(
+            os.path.dirname(__file__), 
+            "output", 
+            "fra_atlas", 
+            f"annotated_{timestamp}.png"
+        )
+        saved_annotated_path = await run_blocking(_save_annotated, segmentation, saved_annotated_path)
         
-        # Copy annotated image to output if it exists
-        saved_annotated_path = None
-        if annotated_image_path and os.path.exists(annotated_image_path):
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            saved_annotated_path = os.path.join(
-                os.path.dirname(__file__), 
-                "output", 
-                "fra_atlas", 
-                f"annotated_{timestamp}.png"
-            )
-            shutil.copy2(annotated_image_path, saved_annotated_path)
+        # Store for DSS under this claim's key
+        land_cover_file = await run_blocking(land_cover_store.save, result_id, land_cover_data, source=image_path)
         
         return {
             "success": True,
             "message": "Asset mapping completed and DSS data updated",
             "land_cover_data": land_cover_data,
             "land_cover_file": land_cover_file,
+            "claim_id": result_id,
             "processed_image": image_path,
             "annotated_image": saved_annotated_path,
             "result": result
         }
         
+    except TimeoutError as e:
+        return {
+            "success": False,
+            "error": str(e)
+        }
     except ImportError as e:
         return {
             "success": False,
             "error": f"gradio_client not installed: {str(e)}. Please install: pip install gradio_client"
         }
     except Exception as e:
-        import traceback
+        # Full traceback stays in the server log; clients only get the message
+        print(f"❌ Asset mapping processing failed: {e}")
+        traceback.print_exc()
         return {
             "success": False,
-            "error": f"Asset mapping processing failed: {str(e)}",
-            "traceback": traceback.format_exc()
+            "error": f"Asset mapping processing failed: {str(e)}"
         }
 
 if __name__ == "__main__":
@@ -1,50 +1,41 @@
-#INFERENCE WITH FILE UPLOAD DIALOG
-#INFERENCE WITH FILE UPLOAD DIALOG
-#INFERENCE WITH FILE UPLOAD DIALOG
-#INFERENCE WITH FILE UPLOAD DIALOG
+"""
+OpenEarthMap land-cover segmentation.
+
+LandCoverSegmenter loads the UNet once and can be imported by the API
+server; running this file directly keeps the original file-dialog workflow.
+"""
 
 import os
+import warnings
+import threading
 import torch
 import numpy as np
-import matplotlib.pyplot as plt
 from pathlib import Path
 import rasterio
+import rasterio.features
+from rasterio.features import geometry_mask
+from rasterio.warp import transform_geom
+from rasterio.enums import ColorInterp
+from rasterio.errors import NotGeoreferencedWarning, RasterioIOError
+from rasterio.windows import Window, from_bounds
 import cv2
 import sys
-import tkinter as tk
-from tkinter import filedialog
 
-sys.path.append(r"D:\SIH\open_earth_map") # path to your local folder 
+# Local clone of https://github.com/bao18/open_earth_map and trained weights
+OEM_REPO_PATH = os.getenv("OEM_REPO_PATH", r"D:\SIH\open_earth_map")
+MODEL_DIR = os.getenv("ASSET_MODEL_DIR", r"D:\SIH\models\outputs")
+MODEL_NAME = os.getenv("ASSET_MODEL_NAME", "best_model.pth")
+# Exported CPU artifact (see export_model.py); used instead of the fp32 checkpoint when present
+MODEL_ARTIFACT = os.getenv("ASSET_MODEL_ARTIFACT", os.path.join(MODEL_DIR, "best_model_cpu.pt"))
+
+sys.path.append(OEM_REPO_PATH) # path to your local folder
 import open_earth_map as oem
 
+from tile_cache import ClassMapTileCache, file_version, imagery_version, array_version
+
 PREDS_DIR = "predictions"
-os.makedirs(PREDS_DIR, exist_ok=True)
 N_CLASSES = 9
 
-root = tk.Tk()
-root.withdraw()
-
-# Open the file dialog and store the selected path
-print("Opening file dialog to select an image...")
-image_path = filedialog.askopenfilename(
-    title="Select a .tif image file",
-    filetypes=[("TIF files", "*.tif"), ("TIFF files", "*.tiff"), ("All files", "*.*")]
-)
-
-if not image_path:
-    print("No file selected. Exiting script.")
-    sys.exit()
-
-print(f"File selected: {image_path}")
-
-test_fns = [image_path]
-
-# Load dataset using the user-provided file path.
-test_data = oem.dataset.OpenEarthMapDataset(test_fns, n_classes=N_CLASSES, augm=None, testing=True)
-
-img, fn = test_data[0][0], test_data[0][2]
-
-
 # --- Define class names ---
 CLASS_NAMES = [
     "Background",
@@ -58,68 +49,504 @@ CLASS_NAMES = [
     "Building"
 ]
 
-# Load trained model network
-network = oem.networks.UNet(in_channels=3, n_classes=N_CLASSES)
-network = oem.utils.load_checkpoint(
-    network,
-    model_name="best_model.pth",
-    model_dir=r"D:\SIH\models\outputs"
-)
-
-DEVICE = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-network = network.to(DEVICE)
-img = img.to(DEVICE)
-
-# Run prediction
-with torch.no_grad():
-    prd_tensor = network(img.unsqueeze(0)).squeeze(0).cpu()
-
-class_map = np.argmax(prd_tensor.numpy(), axis=0)
-
-# Calculate class percentages
-total_pixels = class_map.size
-class_counts = np.bincount(class_map.flatten(), minlength=N_CLASSES)
-class_percentages = (class_counts / total_pixels) * 100
-
-print("\n--- Class distribution in the image ---")
-for i, pct in enumerate(class_percentages):
-    print(f"{CLASS_NAMES[i]}: {pct:.2f}%")
-print("-------------------------------------\n")
-
-prd_rgb = oem.utils.make_rgb(class_map)
-
-fout = os.path.join(PREDS_DIR, os.path.basename(fn))
-with rasterio.open(fn, "r") as src:
-    profile = src.profile
-    prd_resized = cv2.resize(
-        prd_rgb,
-        (profile["width"], profile["height"]),
-        interpolation=cv2.INTER_NEAREST,
+# OpenEarthMap palette, written as a GeoTIFF colormap on the class raster
+CLASS_COLORS = [
+    (0, 0, 0),
+    (128, 0, 0),
+    (0, 255, 36),
+    (148, 148, 148),
+    (255, 255, 255),
+    (34, 97, 38),
+    (0, 69, 255),
+    (75, 181, 73),
+    (222, 31, 7)
+]
+
+# --- Tiled inference settings ---
+TILE_SIZE = 512      # network input size, must be a multiple of 32 for the UNet
+TILE_OVERLAP = 64    # pixels shared by neighbouring tiles, blended on stitch
+BLOCK_SIZE = 1024    # output block written per step; bounds peak memory
+TILE_BATCH_SIZE = 4  # tiles per forward pass on CPU
+SCALE_SAMPLE_SIZE = 1024  # longest side of the decimated read that sets a raster's brightness scale
+
+
+def _blend_weights(tile_size: int, overlap: int) -> np.ndarray:
+    """2D weight that ramps down linearly across the overlap band of a tile"""
+    ramp = np.ones(tile_size, dtype=np.float32)
+    if overlap > 0:
+        edge = np.arange(1, overlap + 1, dtype=np.float32) / (overlap + 1)
+        ramp[:overlap] = edge
+        ramp[-overlap:] = edge[::-1]
+    return np.outer(ramp, ramp)
+
+
+def _tile_starts(length: int, tile_size: int, stride: int) -> list:
+    """Tile offsets covering [0, length), with the last tile flush to the end"""
+    if length <= tile_size:
+        return [0]
+    starts = list(range(0, length - tile_size + 1, stride))
+    if starts[-1] != length - tile_size:
+        starts.append(length - tile_size)
+    return starts
+
+
+def _rgb_bands(src) -> list:
+    return [1, 2, 3] if src.count >= 3 else [1, 1, 1]
+
+
+def _raster_scale(src) -> float:
+    """
+    Divisor mapping a raster's pixel values to [0, 1], the same for every window.
+
+    uint8 uses the dtype range. Other dtypes (e.g. 12-bit data in uint16) use
+    the maximum of a decimated read of the whole raster, so neighbouring
+    blocks get the same brightness whatever the block size.
+    """
+    if src.dtypes[0] == "uint8":
+        return 255.0
+    step = max(1, -(-max(src.height, src.width) // SCALE_SAMPLE_SIZE))
+    out_shape = (3, -(-src.height // step), -(-src.width // step))
+    max_val = float(src.read(_rgb_bands(src), out_shape=out_shape).max())
+    return max_val if max_val > 0 else 1.0
+
+
+def _read_rgb(src, window: Window, scale: float) -> np.ndarray:
+    """Read the first three bands (or a grey band three times) of a window as float32 in [0, 1], CHW"""
+    img = src.read(_rgb_bands(src), window=window).astype(np.float32) / scale
+    # The sampled maximum can miss the brightest pixels
+    return np.minimum(img, 1.0, out=img)
+
+
+def _predict_block(network, image: np.ndarray, device, tile_size: int, overlap: int, batch_size: int,
+                   channels_last: bool = False) -> np.ndarray:
+    """Run overlapping tiles over one block and return blended class probabilities"""
+    _, height, width = image.shape
+    stride = tile_size - overlap
+    weights = _blend_weights(tile_size, overlap)
+
+    probs = np.zeros((N_CLASSES, height, width), dtype=np.float32)
+    weight_sum = np.zeros((height, width), dtype=np.float32)
+
+    positions = [(y, x) for y in _tile_starts(height, tile_size, stride)
+                 for x in _tile_starts(width, tile_size, stride)]
+
+    for i in range(0, len(positions), batch_size):
+        batch_pos = positions[i:i + batch_size]
+        tiles = np.zeros((len(batch_pos), 3, tile_size, tile_size), dtype=np.float32)
+        for j, (y, x) in enumerate(batch_pos):
+            tile = image[:, y:y + tile_size, x:x + tile_size]
+            tiles[j, :, :tile.shape[1], :tile.shape[2]] = tile  # zero-pad small edge blocks
+
+        batch = torch.from_numpy(tiles).to(device)
+        if channels_last:
+            batch = batch.contiguous(memory_format=torch.channels_last)
+        with torch.inference_mode():
+            out = torch.softmax(network(batch), dim=1).float().cpu().numpy()
+
+        for j, (y, x) in enumerate(batch_pos):
+            h = min(tile_size, height - y)
+            w = min(tile_size, width - x)
+            probs[:, y:y + h, x:x + w] += out[j, :, :h, :w] * weights[:h, :w]
+            weight_sum[y:y + h, x:x + w] += weights[:h, :w]
+
+    return probs / weight_sum
+
+
+def _iter_class_blocks(network, src, region: Window, device, tile_size: int, overlap: int,
+                       block_size: int, batch_size: int, channels_last: bool = False,
+                       tile_cache=None, source_id: str = None, model_version: str = None):
+    """Yield (block window, class map) pairs covering region of an open raster
+
+    Blocks lie on a fixed block_size grid anchored at the raster origin, so the
+    same block always gets the same class map and can be served from tile_cache.
+    """
+    height, width = src.height, src.width
+    scale = None
+    col_start = (int(region.col_off) // block_size) * block_size
+    row_start = (int(region.row_off) // block_size) * block_size
+    col_end = int(region.col_off + region.width)
+    row_end = int(region.row_off + region.height)
+
+    for by in range(row_start, row_end, block_size):
+        for bx in range(col_start, col_end, block_size):
+            bh = min(block_size, height - by)
+            bw = min(block_size, width - bx)
+            window = Window(bx, by, bw, bh)
+
+            # Raster blocks use the block size as the grid "zoom" level
+            cache_key = (source_id, block_size, bx // block_size, by // block_size, model_version)
+            if tile_cache is not None:
+                cached = tile_cache.get(*cache_key)
+                if cached is not None:
+                    yield window, cached
+                    continue
+
+            # Expand the block by a halo so tiles at its border have context
+            x0, y0 = max(bx - overlap, 0), max(by - overlap, 0)
+            x1, y1 = min(bx + bw + overlap, width), min(by + bh + overlap, height)
+            if scale is None:
+                scale = _raster_scale(src)
+            image = _read_rgb(src, Window(x0, y0, x1 - x0, y1 - y0), scale)
+
+            probs = _predict_block(network, image, device, tile_size, overlap, batch_size, channels_last)
+            core = probs[:, by - y0:by - y0 + bh, bx - x0:bx - x0 + bw]
+            class_map = np.argmax(core, axis=0).astype(np.uint8)
+
+            if tile_cache is not None:
+                tile_cache.put(*cache_key, class_map)
+            yield window, class_map
+
+
+def predict_raster_tiled(network, image_path: str, output_path: str = None, device=None,
+                         tile_size: int = TILE_SIZE, overlap: int = TILE_OVERLAP,
+                         block_size: int = BLOCK_SIZE, batch_size: int = TILE_BATCH_SIZE,
+                         channels_last: bool = False) -> dict:
+    """
+    Segment a GeoTIFF of any size with bounded memory.
+
+    The raster is processed in output blocks of block_size pixels. Each block is
+    read with an overlap-wide halo through a rasterio window, split into
+    overlapping tiles that go through the network in batches, blended back
+    together and written to the output GeoTIFF window by window. Peak memory
+    depends only on block_size, never on the raster size.
+
+    Returns the per-class pixel counts and percentages.
+    """
+    device = device or torch.device("cpu")
+    network.eval()
+    class_counts = np.zeros(N_CLASSES, dtype=np.int64)
+
+    with rasterio.open(image_path) as src:
+        dst = None
+        if output_path:
+            profile = src.profile.copy()
+            profile.update(dtype=rasterio.uint8, count=1, compress="deflate", nodata=None,
+                           tiled=True, blockxsize=256, blockysize=256, BIGTIFF="IF_SAFER")
+            dst = rasterio.open(output_path, "w", **profile)
+            dst.write_colormap(1, {i: color for i, color in enumerate(CLASS_COLORS)})
+
+        try:
+            full = Window(0, 0, src.width, src.height)
+            for window, class_map in _iter_class_blocks(network, src, full, device, tile_size, overlap,
+                                                        block_size, batch_size, channels_last):
+                class_counts += np.bincount(class_map.ravel(), minlength=N_CLASSES)
+                if dst is not None:
+                    dst.write(class_map, 1, window=window)
+        finally:
+            if dst is not None:
+                dst.close()
+
+    total_pixels = class_counts.sum()
+    class_percentages = (class_counts / total_pixels) * 100 if total_pixels else np.zeros(N_CLASSES)
+    return {
+        "class_counts": class_counts,
+        "class_percentages": class_percentages,
+        "output_path": output_path
+    }
+
+
+def geojson_geometries(geojson: dict) -> list:
+    """Polygon geometries from a FeatureCollection, Feature or bare geometry"""
+    if geojson.get("type") == "FeatureCollection":
+        geometries = [feature.get("geometry") for feature in geojson.get("features", [])]
+    elif geojson.get("type") == "Feature":
+        geometries = [geojson.get("geometry")]
+    else:
+        geometries = [geojson]
+    return [g for g in geometries if g and g.get("type") in ("Polygon", "MultiPolygon")]
+
+
+def pixel_area_m2(src, geometries: list) -> float:
+    """Ground area of one pixel in square metres for the raster CRS"""
+    transform = src.transform
+    area = abs(transform.a * transform.e - transform.b * transform.d)
+    if src.crs and src.crs.is_geographic:
+        # Degrees to metres at the latitude of the claim
+        bounds = rasterio.features.bounds({"type": "GeometryCollection", "geometries": geometries})
+        lat = np.radians((bounds[1] + bounds[3]) / 2)
+        return area * 111320.0 * 111320.0 * np.cos(lat)
+    linear_units = src.crs.linear_units_factor[1] if src.crs else 1.0
+    return area * linear_units * linear_units
+
+
+def polygon_land_cover(network, image_path: str, geojson: dict, device=None,
+                       geojson_crs: str = "EPSG:4326", tile_size: int = TILE_SIZE,
+                       overlap: int = TILE_OVERLAP, block_size: int = BLOCK_SIZE,
+                       batch_size: int = TILE_BATCH_SIZE, channels_last: bool = False,
+                       tile_cache=None, model_version: str = None) -> dict:
+    """
+    Land-cover area inside claim polygons.
+
+    The polygons are reprojected to the raster CRS. Only the blocks under their
+    bounding window are segmented (or read from tile_cache), and each class map
+    block is masked with the rasterized polygons, so pixels outside the claim
+    never count towards the statistics.
+    """
+    device = device or torch.device("cpu")
+    network.eval()
+    class_counts = np.zeros(N_CLASSES, dtype=np.int64)
+
+    geometries = geojson_geometries(geojson)
+    if not geometries:
+        raise ValueError("No Polygon or MultiPolygon geometry in GeoJSON")
+
+    with rasterio.open(image_path) as src:
+        if src.crs and geojson_crs:
+            geometries = [transform_geom(geojson_crs, src.crs, g) for g in geometries]
+
+        # Only the polygons' bounding window goes through the network
+        bounds = rasterio.features.bounds({"type": "GeometryCollection", "geometries": geometries})
+        exact = from_bounds(*bounds, transform=src.transform)
+        col0, row0 = int(np.floor(exact.col_off)), int(np.floor(exact.row_off))
+        col1 = int(np.ceil(exact.col_off + exact.width))
+        row1 = int(np.ceil(exact.row_off + exact.height))
+        col0, row0 = max(col0, 0), max(row0, 0)
+        col1, row1 = min(col1, src.width), min(row1, src.height)
+        if col1 <= col0 or row1 <= row0:
+            raise ValueError("Claim polygon does not overlap the image")
+        region = Window(col0, row0, col1 - col0, row1 - row0)
+
+        source_id = imagery_version(image_path)
+        for window, class_map in _iter_class_blocks(network, src, region, device, tile_size, overlap,
+                                                    block_size, batch_size, channels_last,
+                                                    tile_cache, source_id, model_version):
+            mask = geometry_mask(geometries, out_shape=class_map.shape,
+                                 transform=src.window_transform(window), invert=True)
+            class_counts += np.bincount(class_map[mask], minlength=N_CLASSES)
+
+        area_m2 = pixel_area_m2(src, geometries)
+
+    total_pixels = class_counts.sum()
+    class_percentages = (class_counts / total_pixels) * 100 if total_pixels else np.zeros(N_CLASSES)
+    class_hectares = class_counts * area_m2 / 10000.0
+    return {
+        "class_counts": class_counts,
+        "class_percentages": class_percentages,
+        "class_hectares": class_hectares,
+        "total_hectares": float(class_hectares.sum()),
+        "window": region
+    }
+
+
+def _read_preview(path: str, max_side: int = 1024) -> np.ndarray:
+    """Decimated read of a raster for plotting, without loading it in full"""
+    with rasterio.open(path) as src:
+        scale = max(src.height, src.width) / max_side
+        out_shape = (max(1, int(src.height / max(scale, 1))), max(1, int(src.width / max(scale, 1))))
+        if src.count >= 3:
+            return np.moveaxis(src.read([1, 2, 3], out_shape=(3, *out_shape)), 0, -1)
+        return src.read(1, out_shape=out_shape)
+
+
+class _ArrayRaster:
+    """Minimal rasterio-style reader over an in-memory HxWxC image"""
+
+    def __init__(self, image: np.ndarray):
+        image = np.asarray(image)
+        self.image = image[:, :, None] if image.ndim == 2 else image
+        self.height, self.width, self.count = self.image.shape
+        self.dtypes = [self.image.dtype.name] * self.count
+
+    def read(self, indexes, window: Window = None, out_shape: tuple = None) -> np.ndarray:
+        rows, cols = window.toslices() if window is not None else (slice(None), slice(None))
+        image = self.image[rows, cols]
+        if out_shape is not None:
+            # Nearest-neighbour decimation, like a rasterio read with out_shape
+            ys = np.arange(out_shape[-2]) * image.shape[0] // out_shape[-2]
+            xs = np.arange(out_shape[-1]) * image.shape[1] // out_shape[-1]
+            image = image[ys][:, xs]
+        return np.stack([image[:, :, i - 1] for i in indexes])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def _open_image(image):
+    """Windowed reader for an image path (any GDAL format) or an HxWx3 RGB array"""
+    if not isinstance(image, (str, Path)):
+        return _ArrayRaster(image)
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", NotGeoreferencedWarning)  # plain PNG/JPEG exports
+            src = rasterio.open(str(image))
+    except RasterioIOError:
+        raise ValueError(f"Could not read image from path: {image}")
+    if src.colorinterp[0] != ColorInterp.palette:
+        return src
+    # Palette images need their colour table applied; decode those in full
+    src.close()
+    img = cv2.imread(str(image), cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError(f"Could not read image from path: {image}")
+    return _ArrayRaster(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
+
+
+def colorize(class_map: np.ndarray) -> np.ndarray:
+    """Map a class raster to an RGB image using the OpenEarthMap palette"""
+    palette = np.array(CLASS_COLORS, dtype=np.uint8)
+    return palette[class_map]
+
+
+class LandCoverSegmenter:
+    """
+    Long-lived land-cover segmentation service.
+
+    The UNet is loaded once, put in eval mode and kept in memory; predict()
+    can then be called for every request. On CPU the exported TorchScript
+    artifact from export_model.py is preferred over the fp32 checkpoint.
+    """
+
+    def __init__(self, model_dir: str = MODEL_DIR, model_name: str = MODEL_NAME,
+                 device=None, num_threads: int = None, artifact_path: str = MODEL_ARTIFACT,
+                 tile_cache: ClassMapTileCache = None):
+        self.device = device or torch.device("cpu")
+
+        # Use every core for intra-op parallelism; one predict at a time avoids oversubscription
+        num_threads = num_threads or int(os.getenv("TORCH_NUM_THREADS", os.cpu_count() or 1))
+        torch.set_num_threads(num_threads)
+        try:
+            torch.set_num_interop_threads(1)
+        except RuntimeError:
+            pass  # already set once in this process
+        self.num_threads = num_threads
+
+        self.channels_last = False
+        if artifact_path and os.path.exists(artifact_path) and self.device.type == "cpu":
+            from export_model import load_artifact
+            self.network, self.channels_last = load_artifact(artifact_path)
+            self.model_path = artifact_path
+        else:
+            network = oem.networks.UNet(in_channels=3, n_classes=N_CLASSES)
+            network = oem.utils.load_checkpoint(network, model_name=model_name, model_dir=model_dir)
+            self.network = network.to(self.device).eval()
+            self.model_path = os.path.join(model_dir, model_name)
+        self._lock = threading.Lock()
+
+        # Class-map tiles are cached per imagery block and model version
+        self.tile_cache = tile_cache if tile_cache is not None else ClassMapTileCache()
+        self.model_version = file_version(self.model_path)
+
+    def predict(self, image) -> dict:
+        """
+        Segment an image (file path or HxWx3 RGB array) and return its class
+        map and per-class percentages.
+
+        The image goes through the same block iterator as predict_raster(), so
+        only one block and its class probabilities are in memory at a time and
+        blocks already segmented for the same imagery come from the tile cache.
+        """
+        if isinstance(image, (str, Path)):
+            source_id = imagery_version(str(image))
+        else:
+            source_id = array_version(image)
+        with _open_image(image) as src:
+            class_map = np.zeros((src.height, src.width), dtype=np.uint8)
+            with self._lock:
+                for window, block in _iter_class_blocks(
+                        self.network, src, Window(0, 0, src.width, src.height), self.device,
+                        TILE_SIZE, TILE_OVERLAP, BLOCK_SIZE, TILE_BATCH_SIZE, self.channels_last,
+                        self.tile_cache, source_id, self.model_version):
+                    rows, cols = window.toslices()
+                    class_map[rows, cols] = block
+
+        class_counts = np.bincount(class_map.ravel(), minlength=N_CLASSES)
+        class_percentages = (class_counts / class_map.size) * 100
+        return {
+            "class_map": class_map,
+            "class_counts": {CLASS_NAMES[i]: int(c) for i, c in enumerate(class_counts)},
+            "class_percentages": {CLASS_NAMES[i]: round(float(p), 2) for i, p in enumerate(class_percentages)}
+        }
+
+    def predict_polygon(self, image_path: str, geojson: dict, geojson_crs: str = "EPSG:4326") -> dict:
+        """Per-class hectares and percentages inside claim polygons on a georeferenced raster"""
+        with self._lock:
+            result = polygon_land_cover(self.network, image_path, geojson, device=self.device,
+                                        geojson_crs=geojson_crs, channels_last=self.channels_last,
+                                        tile_cache=self.tile_cache, model_version=self.model_version)
+        return {
+            "class_percentages": {CLASS_NAMES[i]: round(float(p), 2) for i, p in enumerate(result["class_percentages"])},
+            "class_hectares": {CLASS_NAMES[i]: round(float(h), 4) for i, h in enumerate(result["class_hectares"])},
+            "total_hectares": round(result["total_hectares"], 4)
+        }
+
+    def predict_raster(self, image_path: str, output_path: str = None) -> dict:
+        """Segment a GeoTIFF of any size with the tiled streaming engine"""
+        with self._lock:
+            result = predict_raster_tiled(self.network, image_path, output_path, device=self.device,
+                                          channels_last=self.channels_last)
+        return {
+            "class_counts": {CLASS_NAMES[i]: int(c) for i, c in enumerate(result["class_counts"])},
+            "class_percentages": {CLASS_NAMES[i]: round(float(p), 2) for i, p in enumerate(result["class_percentages"])},
+            "output_path": output_path
+        }
+
+
+def main():
+    """Pick a GeoTIFF with a file dialog, segment it and plot the result"""
+    import matplotlib.pyplot as plt
+    import tkinter as tk
+    from tkinter import filedialog
+
+    os.makedirs(PREDS_DIR, exist_ok=True)
+
+    root = tk.Tk()
+    root.withdraw()
+
+    # Open the file dialog and store the selected path
+    print("Opening file dialog to select an image...")
+    image_path = filedialog.askopenfilename(
+        title="Select a .tif image file",
+        filetypes=[("TIF files", "*.tif"), ("TIFF files", "*.tiff"), ("All files", "*.*")]
     )
-    profile.update(dtype=rasterio.uint8, count=3)
-    with rasterio.open(fout, "w", **profile) as dst:
-        for i in range(3):
-            dst.write(prd_resized[:, :, i], i + 1)
-print(f"Prediction saved to: {fout}")
-
-fig, axs = plt.subplots(2, 1, figsize=(6, 8))
-
-img_np = np.moveaxis(img.cpu().numpy(), 0, -1)
-img_np = img_np / img_np.max()
-axs[0].imshow(img_np)
-axs[0].set_title(f"Original: {os.path.basename(fn)}")
-axs[0].axis("off")
-
-axs[1].imshow(prd_rgb)
-axs[1].set_title("Predicted Segmentation")
-axs[1].axis("off")
-
-plt.tight_layout()
-plt.show()
-
-# Pie chart with class names
-plt.figure(figsize=(6, 6))
-plt.pie(class_percentages, labels=CLASS_NAMES,
-        autopct="%1.1f%%", startangle=90)
-plt.title("Class Distribution in Image")
-plt.show()
\ No newline at end of file
+
+    if not image_path:
+        print("No file selected. Exiting script.")
+        sys.exit()
+
+    print(f"File selected: {image_path}")
+
+    fn = image_path
+
+    # Load trained model network
+    DEVICE = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    segmenter = LandCoverSegmenter(device=DEVICE)
+
+    # Run tiled prediction, streaming the class raster to disk
+    fout = os.path.join(PREDS_DIR, os.path.basename(fn))
+    result = segmenter.predict_raster(fn, fout)
+    class_percentages = list(result["class_percentages"].values())
+
+    print("\n--- Class distribution in the image ---")
+    for name, pct in result["class_percentages"].items():
+        print(f"{name}: {pct:.2f}%")
+    print("-------------------------------------\n")
+    print(f"Prediction saved to: {fout}")
+
+    fig, axs = plt.subplots(2, 1, figsize=(6, 8))
+
+    img_np = _read_preview(fn).astype(np.float32)
+    img_np = img_np / img_np.max()
+    axs[0].imshow(img_np)
+    axs[0].set_title(f"Original: {os.path.basename(fn)}")
+    axs[0].axis("off")
+
+    axs[1].imshow(colorize(_read_preview(fout)))
+    axs[1].set_title("Predicted Segmentation")
+    axs[1].axis("off")
+
+    plt.tight_layout()
+    plt.show()
+
+    # Pie chart with class names
+    plt.figure(figsize=(6, 6))
+    plt.pie(class_percentages, labels=CLASS_NAMES,
+            autopct="%1.1f%%", startangle=90)
+    plt.title("Class Distribution in Image")
+    plt.show()
+
+
+if __name__ == "__main__":
+    main()
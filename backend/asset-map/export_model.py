@@ -0,0 +1,205 @@
+"""
+Export the OpenEarthMap UNet to a fast CPU artifact and benchmark it.
+
+Two export modes are supported:
+    channels_last  fp32 TorchScript, frozen, with NHWC memory layout
+    int8           post-training static int8 quantization (FX graph mode),
+                   calibrated on sample tiles, then frozen TorchScript
+
+Dynamic quantization only rewrites Linear/LSTM layers, and the UNet is made
+of convolutions, so the int8 path uses static quantization instead.
+
+Usage:
+    python export_model.py --mode int8 --calibration-dir samples/images
+    python export_model.py --mode channels_last --eval-images val/images --eval-labels val/labels
+"""
+
+import os
+import glob
+import time
+import argparse
+import numpy as np
+import torch
+import rasterio
+
+from AssetMapInference import (
+    oem, N_CLASSES, MODEL_DIR, MODEL_NAME, TILE_SIZE, TILE_OVERLAP, TILE_BATCH_SIZE,
+    _predict_block
+)
+
+DEFAULT_ARTIFACT = os.path.join(MODEL_DIR, "best_model_cpu.pt")
+ARTIFACT_MODES = ["channels_last", "int8"]
+
+
+def load_fp32_network(model_dir: str = MODEL_DIR, model_name: str = MODEL_NAME):
+    """Load the eager fp32 checkpoint in eval mode"""
+    network = oem.networks.UNet(in_channels=3, n_classes=N_CLASSES)
+    network = oem.utils.load_checkpoint(network, model_name=model_name, model_dir=model_dir)
+    return network.eval()
+
+
+def _read_image(path: str) -> np.ndarray:
+    """Read an RGB raster as CHW float32 in [0, 1]"""
+    with rasterio.open(path) as src:
+        img = src.read([1, 2, 3]).astype(np.float32)
+    return img / 255.0 if img.max() > 1 else img
+
+
+def _calibration_tiles(image_paths, tile_size: int = TILE_SIZE, max_tiles: int = 32):
+    """Yield tile_size crops from sample images to calibrate int8 observers"""
+    count = 0
+    for path in image_paths:
+        img = _read_image(path)
+        _, height, width = img.shape
+        for y in range(0, max(height - tile_size, 0) + 1, tile_size):
+            for x in range(0, max(width - tile_size, 0) + 1, tile_size):
+                tile = np.zeros((3, tile_size, tile_size), dtype=np.float32)
+                crop = img[:, y:y + tile_size, x:x + tile_size]
+                tile[:, :crop.shape[1], :crop.shape[2]] = crop
+                yield torch.from_numpy(tile).unsqueeze(0)
+                count += 1
+                if count >= max_tiles:
+                    return
+
+
+def export_artifact(network, output_path: str = DEFAULT_ARTIFACT, mode: str = "channels_last",
+                    calibration_images=None) -> str:
+    """Export network as a frozen TorchScript artifact for CPU inference"""
+    if mode not in ARTIFACT_MODES:
+        raise ValueError(f"Unsupported export mode: {mode}. Supported modes: {ARTIFACT_MODES}")
+
+    network = network.eval().cpu()
+    example = torch.rand(1, 3, TILE_SIZE, TILE_SIZE)
+
+    if mode == "int8":
+        from torch.ao.quantization import get_default_qconfig_mapping
+        from torch.ao.quantization.quantize_fx import prepare_fx, convert_fx
+
+        if not calibration_images:
+            raise ValueError("int8 export needs calibration images")
+
+        torch.backends.quantized.engine = "x86" if "x86" in torch.backends.quantized.supported_engines else "qnnpack"
+        prepared = prepare_fx(network, get_default_qconfig_mapping(torch.backends.quantized.engine), (example,))
+        with torch.inference_mode():
+            for tile in _calibration_tiles(calibration_images):
+                prepared(tile)
+        network = convert_fx(prepared)
+    else:
+        network = network.to(memory_format=torch.channels_last)
+        example = example.contiguous(memory_format=torch.channels_last)
+
+    # Trace under no_grad: tensors created in inference_mode cannot be serialized as constants
+    with torch.no_grad():
+        scripted = torch.jit.trace(network, example)
+        scripted = torch.jit.freeze(scripted)
+
+    # Record the layout so the loader feeds inputs the way the artifact was traced
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    torch.jit.save(scripted, output_path, _extra_files={"mode": mode})
+    print(f"✅ Exported {mode} artifact to {output_path}")
+    return output_path
+
+
+def load_artifact(path: str):
+    """Load an exported artifact; returns (module, channels_last)"""
+    extra_files = {"mode": ""}
+    module = torch.jit.load(path, map_location="cpu", _extra_files=extra_files).eval()
+    mode = extra_files["mode"].decode() if isinstance(extra_files["mode"], bytes) else extra_files["mode"]
+    # oneDNN op fusion/prepacking can't be serialized, so apply it after loading
+    if mode == "channels_last":
+        module = torch.jit.optimize_for_inference(module)
+    return module, mode == "channels_last"
+
+
+def _confusion_matrix(prediction: np.ndarray, label: np.ndarray) -> np.ndarray:
+    valid = label < N_CLASSES
+    pairs = label[valid].astype(np.int64) * N_CLASSES + prediction[valid]
+    return np.bincount(pairs, minlength=N_CLASSES * N_CLASSES).reshape(N_CLASSES, N_CLASSES)
+
+
+def mean_iou(confusion: np.ndarray) -> float:
+    """Mean IoU over classes present in either labels or predictions"""
+    intersection = np.diag(confusion)
+    union = confusion.sum(axis=0) + confusion.sum(axis=1) - intersection
+    present = union > 0
+    return float(np.mean(intersection[present] / union[present])) if present.any() else 0.0
+
+
+def _latency_ms(network, channels_last: bool, runs: int = 10) -> float:
+    """Median forward latency of one batch of tiles"""
+    batch = torch.rand(TILE_BATCH_SIZE, 3, TILE_SIZE, TILE_SIZE)
+    if channels_last:
+        batch = batch.contiguous(memory_format=torch.channels_last)
+    timings = []
+    with torch.inference_mode():
+        network(batch)  # warm-up
+        for _ in range(runs):
+            start = time.perf_counter()
+            network(batch)
+            timings.append((time.perf_counter() - start) * 1000)
+    return float(np.median(timings))
+
+
+def benchmark(fp32_network, artifact_path: str, eval_images=None, eval_labels=None) -> dict:
+    """Compare latency and mIoU of the fp32 checkpoint and an exported artifact"""
+    artifact, channels_last = load_artifact(artifact_path)
+    candidates = {"fp32": (fp32_network.eval(), False), "artifact": (artifact, channels_last)}
+
+    report = {}
+    for name, (network, is_channels_last) in candidates.items():
+        entry = {"latency_ms_per_batch": round(_latency_ms(network, is_channels_last), 2)}
+
+        if eval_images and eval_labels:
+            confusion = np.zeros((N_CLASSES, N_CLASSES), dtype=np.int64)
+            for image_path, label_path in zip(eval_images, eval_labels):
+                probs = _predict_block(network, _read_image(image_path), torch.device("cpu"),
+                                       TILE_SIZE, TILE_OVERLAP, TILE_BATCH_SIZE, channels_last=is_channels_last)
+                with rasterio.open(label_path) as src:
+                    label = src.read(1)
+                confusion += _confusion_matrix(np.argmax(probs, axis=0), label)
+            entry["miou"] = round(mean_iou(confusion), 4)
+
+        report[name] = entry
+
+    report["speedup"] = round(report["fp32"]["latency_ms_per_batch"] / report["artifact"]["latency_ms_per_batch"], 2)
+    if "miou" in report["fp32"]:
+        report["miou_delta"] = round(report["artifact"]["miou"] - report["fp32"]["miou"], 4)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export and benchmark a CPU artifact of the land-cover UNet")
+    parser.add_argument("--mode", choices=ARTIFACT_MODES, default="channels_last")
+    parser.add_argument("--output", default=DEFAULT_ARTIFACT)
+    parser.add_argument("--calibration-dir", help="Directory of sample .tif images for int8 calibration")
+    parser.add_argument("--eval-images", help="Directory of labelled .tif images for the mIoU comparison")
+    parser.add_argument("--eval-labels", help="Directory of label rasters matching --eval-images by filename")
+    args = parser.parse_args()
+
+    network = load_fp32_network()
+
+    calibration_images = sorted(glob.glob(os.path.join(args.calibration_dir, "*.tif"))) if args.calibration_dir else None
+    export_artifact(network, args.output, mode=args.mode, calibration_images=calibration_images)
+
+    eval_images, eval_labels = None, None
+    if args.eval_images and args.eval_labels:
+        eval_images = sorted(glob.glob(os.path.join(args.eval_images, "*.tif")))
+        eval_labels = [os.path.join(args.eval_labels, os.path.basename(p)) for p in eval_images]
+
+    # Reload fp32 weights, the channels_last export converts the module in place
+    report = benchmark(load_fp32_network(), args.output, eval_images, eval_labels)
+
+    print("\n--- CPU benchmark ---")
+    for name in ("fp32", "artifact"):
+        line = f"{name}: {report[name]['latency_ms_per_batch']:.1f} ms / batch of {TILE_BATCH_SIZE}"
+        if "miou" in report[name]:
+            line += f", mIoU {report[name]['miou']:.4f}"
+        print(line)
+    print(f"Speed-up: {report['speedup']}x")
+    if "miou_delta" in report:
+        print(f"mIoU change: {report['miou_delta']:+.4f}")
+    print("---------------------\n")
+
+
+if __name__ == "__main__":
+    main()
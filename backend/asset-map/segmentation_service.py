@@ -0,0 +1,197 @@
+"""
+Segmentation services used by /api/asset-mapping/process.
+
+Both services expose the same async segment(image_path) call and return a
+dict with "land_cover_percentages", an optional "annotated_image" path or
+"annotated_rgb" array, and the raw model output. The API picks the local
+UNet when it is available and the hosted Gradio Space otherwise; tests can
+point the remote service at a local stub server through ASSET_MAPPING_SPACE.
+"""
+
+import os
+import queue
+import asyncio
+import hashlib
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+ASSET_MAPPING_SPACE = os.getenv("ASSET_MAPPING_SPACE", "TheAstrophile-KingK/asset-mapping")
+ASSET_MAPPING_TIMEOUT = float(os.getenv("ASSET_MAPPING_TIMEOUT", "120"))
+ASSET_MAPPING_CONCURRENCY = int(os.getenv("ASSET_MAPPING_CONCURRENCY", "2"))
+ASSET_MAPPING_CACHE_SIZE = int(os.getenv("ASSET_MAPPING_CACHE_SIZE", "128"))
+
+
+def image_hash(image_path: str) -> str:
+    """SHA-256 of the image bytes, used as the response cache key"""
+    digest = hashlib.sha256()
+    with open(image_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def parse_gradio_result(result: Any) -> Dict[str, Any]:
+    """Normalize the Space output into land cover percentages and annotated image path"""
+    # Result format: {"annotated_image": "path/to/image", "land_cover_percentages": {...}}
+    land_cover_data = {}
+    annotated_image_path = None
+
+    if isinstance(result, dict):
+        land_cover_data = result.get("land_cover_percentages", {})
+        annotated_image_path = result.get("annotated_image")
+    elif isinstance(result, (tuple, list)):
+        # Sometimes Gradio returns tuple (annotated_image_path, land_cover_dict)
+        if len(result) > 1 and isinstance(result[1], dict):
+            land_cover_data = result[1]
+        if len(result) > 0:
+            annotated_image_path = result[0]
+
+    return {
+        "land_cover_percentages": land_cover_data,
+        "annotated_image": annotated_image_path,
+        "raw": result
+    }
+
+
+class SegmentationService(ABC):
+    """Common interface for local and remote land-cover segmentation"""
+
+    name = "base"
+
+    @abstractmethod
+    async def segment(self, image_path: str) -> Dict[str, Any]:
+        """Land cover percentages and annotated image for one image"""
+
+    def stats(self) -> Dict[str, Any]:
+        return {"service": self.name}
+
+
+class LocalSegmentationService(SegmentationService):
+    """In-process UNet (LandCoverSegmenter) run off the event loop"""
+
+    name = "local"
+
+    def __init__(self, segmenter, colorize):
+        self.segmenter = segmenter
+        self.colorize = colorize
+
+    async def segment(self, image_path: str) -> Dict[str, Any]:
+        loop = asyncio.get_event_loop()
+        prediction = await loop.run_in_executor(None, self.segmenter.predict, image_path)
+        return {
+            "land_cover_percentages": prediction["class_percentages"],
+            "annotated_rgb": self.colorize(prediction["class_map"]),
+            "raw": {"land_cover_percentages": prediction["class_percentages"], "model": "local"}
+        }
+
+
+class RemoteSegmentationService(SegmentationService):
+    """
+    Gradio Space client with pooling, timeouts and response caching.
+
+    Clients are created lazily (each one fetches the Space config once) and
+    reused across requests. predict() runs in a bounded thread pool so it
+    never blocks the event loop, and identical images are answered from an
+    LRU cache keyed by their content hash.
+    """
+
+    name = "remote"
+
+    def __init__(self, space: str = ASSET_MAPPING_SPACE, timeout: float = ASSET_MAPPING_TIMEOUT,
+                 max_concurrency: int = ASSET_MAPPING_CONCURRENCY, cache_size: int = ASSET_MAPPING_CACHE_SIZE,
+                 client_factory=None):
+        self.space = space
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.cache_size = cache_size
+        self._client_factory = client_factory
+
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="asset-mapping")
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._pool: "queue.LifoQueue" = queue.LifoQueue()
+        self._clients_created = 0
+        self._pool_lock = threading.Lock()
+
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def _new_client(self):
+        if self._client_factory:
+            return self._client_factory(self.space)
+        from gradio_client import Client
+        return Client(self.space)
+
+    def _acquire_client(self):
+        """Reuse an idle client, or create one while under the concurrency cap"""
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            pass
+        with self._pool_lock:
+            if self._clients_created < self.max_concurrency:
+                self._clients_created += 1
+                return self._new_client()
+        return self._pool.get()
+
+    def _input_file(self, image_path: str):
+        try:
+            from gradio_client import handle_file
+        except ImportError:
+            # Injected test clients can take the plain path
+            if self._client_factory:
+                return image_path
+            raise
+        return handle_file(image_path)
+
+    def _predict_blocking(self, image_path: str) -> Any:
+        client = self._acquire_client()
+        try:
+            return client.predict(
+                input_image=self._input_file(image_path),
+                api_name="/predict_image"
+            )
+        finally:
+            self._pool.put(client)
+
+    async def segment(self, image_path: str) -> Dict[str, Any]:
+        loop = asyncio.get_event_loop()
+        key = await loop.run_in_executor(None, image_hash, image_path)
+
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            self.cache_hits += 1
+            return self._cache[key]
+        self.cache_misses += 1
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        await self._semaphore.acquire()
+        future = loop.run_in_executor(self._executor, self._predict_blocking, image_path)
+        # Release only when the call really finishes, even if we stop waiting on it
+        future.add_done_callback(lambda _: self._semaphore.release())
+        try:
+            result = await asyncio.wait_for(asyncio.shield(future), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"Asset mapping service did not respond within {self.timeout:.0f}s")
+
+        parsed = parse_gradio_result(result)
+        self._cache[key] = parsed
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return parsed
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "service": self.name,
+            "space": self.space,
+            "clients": self._clients_created,
+            "max_concurrency": self.max_concurrency,
+            "cached_responses": len(self._cache),
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses
+        }
@@ -0,0 +1,144 @@
+"""
+On-disk LRU cache of segmented class-map tiles.
+
+Neighbouring claims in a village share imagery, so class maps are cached per
+imagery tile and reused instead of re-running the network. Tiles are keyed by
+(imagery content hash, zoom, x, y, model version), so the same imagery
+uploaded again under a new path still hits the cache, and stored as
+compressed uint8 arrays; the least recently used tiles are evicted once the
+cache grows past its size limit.
+"""
+
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+
+from segmentation_service import image_hash
+
+TILE_CACHE_DIR = os.getenv("ASSET_TILE_CACHE_DIR", os.path.join(os.path.dirname(__file__), "..", "cache", "landcover_tiles"))
+TILE_CACHE_MB = int(os.getenv("ASSET_TILE_CACHE_MB", "512"))
+IMAGERY_HASH_MEMO_SIZE = 1024
+TILE_FORMAT = 2  # Bumped when preprocessing changes the class map a block gets (2: raster-wide scaling)
+
+
+def file_version(path: str) -> str:
+    """Version tag for a file that changes whenever the file is replaced"""
+    try:
+        stat = os.stat(path)
+        return f"{os.path.abspath(path)}:{stat.st_size}:{int(stat.st_mtime)}"
+    except OSError:
+        return os.path.abspath(path)
+
+
+_imagery_hashes: "OrderedDict[str, str]" = OrderedDict()
+_imagery_hashes_lock = threading.Lock()
+
+
+def imagery_version(path: str) -> str:
+    """
+    Content hash of an imagery file, the tile cache's source key.
+
+    Hashes are memoized per file_version(), so an unchanged file is read once.
+    """
+    version = file_version(path)
+    with _imagery_hashes_lock:
+        if version in _imagery_hashes:
+            _imagery_hashes.move_to_end(version)
+            return _imagery_hashes[version]
+    digest = image_hash(path)
+    with _imagery_hashes_lock:
+        _imagery_hashes[version] = digest
+        if len(_imagery_hashes) > IMAGERY_HASH_MEMO_SIZE:
+            _imagery_hashes.popitem(last=False)
+    return digest
+
+
+def array_version(image: np.ndarray) -> str:
+    """Content hash of an in-memory image, the tile cache's source key"""
+    image = np.ascontiguousarray(image)
+    digest = hashlib.sha256(f"{image.shape}|{image.dtype}".encode("utf-8"))
+    digest.update(memoryview(image).cast("B"))
+    return digest.hexdigest()
+
+
+class ClassMapTileCache:
+    def __init__(self, cache_dir: str = TILE_CACHE_DIR, max_mb: int = TILE_CACHE_MB):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_mb * 1024 * 1024
+        os.makedirs(cache_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        # Rebuild LRU order from disk: least recently touched first
+        entries = []
+        for name in os.listdir(cache_dir):
+            if name.endswith(".npz"):
+                stat = os.stat(os.path.join(cache_dir, name))
+                entries.append((stat.st_mtime, name, stat.st_size))
+        self._index = OrderedDict((name, size) for _, name, size in sorted(entries))
+        self._total_bytes = sum(self._index.values())
+
+    @staticmethod
+    def _key(source: str, zoom: int, x: int, y: int, model_version: str) -> str:
+        raw = f"{source}|{zoom}|{x}|{y}|{model_version}|{TILE_FORMAT}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest() + ".npz"
+
+    def get(self, source: str, zoom: int, x: int, y: int, model_version: str) -> Optional[np.ndarray]:
+        """Cached class map for a tile, or None"""
+        name = self._key(source, zoom, x, y, model_version)
+        path = os.path.join(self.cache_dir, name)
+        with self._lock:
+            if name not in self._index:
+                self.misses += 1
+                return None
+            self._index.move_to_end(name)
+        try:
+            with np.load(path) as data:
+                class_map = data["class_map"]
+            os.utime(path)  # keep LRU order across restarts
+        except (OSError, KeyError, ValueError):
+            with self._lock:
+                self._total_bytes -= self._index.pop(name, 0)
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return class_map
+
+    def put(self, source: str, zoom: int, x: int, y: int, model_version: str, class_map: np.ndarray):
+        """Store a tile's class map, evicting least recently used tiles if needed"""
+        name = self._key(source, zoom, x, y, model_version)
+        path = os.path.join(self.cache_dir, name)
+
+        # Write to a temp file and rename so readers never see a partial tile
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez_compressed(f, class_map=class_map.astype(np.uint8))
+        os.replace(tmp_path, path)
+        size = os.path.getsize(path)
+
+        with self._lock:
+            self._total_bytes += size - self._index.pop(name, 0)
+            self._index[name] = size
+            while self._total_bytes > self.max_bytes and len(self._index) > 1:
+                evicted, evicted_size = self._index.popitem(last=False)
+                self._total_bytes -= evicted_size
+                try:
+                    os.remove(os.path.join(self.cache_dir, evicted))
+                except OSError:
+                    pass
+
+    def stats(self) -> dict:
+        return {
+            "tiles": len(self._index),
+            "size_mb": round(self._total_bytes / (1024 * 1024), 2),
+            "max_mb": round(self.max_bytes / (1024 * 1024), 2),
+            "hits": self.hits,
+            "misses": self.misses
+        }
@@ -0,0 +1,149 @@
+"""
+Batch land-cover breakdown for many FRA claim polygons.
+
+Takes a GeoJSON FeatureCollection of claims and one segmented class raster
+(as written by predict_raster_tiled) and produces a table of per-class
+hectares and percentages keyed by claim, in a single pass over the raster.
+
+Usage:
+    python zonal_stats.py claims.geojson predictions/district.tif claims_land_cover.csv
+"""
+
+import argparse
+import numpy as np
+import pandas as pd
+import rasterio
+import rasterio.features
+from rasterio.features import rasterize
+from rasterio.warp import transform_geom
+from rasterio.windows import Window, from_bounds
+
+from AssetMapInference import N_CLASSES, CLASS_NAMES, geojson_geometries, pixel_area_m2
+
+ZONAL_BLOCK_SIZE = 4096  # raster rows/cols read per block
+
+
+def _claim_ids(features: list, id_field: str) -> list:
+    """Claim key for each feature: id_field, then 'id', then the feature index"""
+    ids = []
+    for i, feature in enumerate(features):
+        properties = feature.get("properties") or {}
+        claim_id = properties.get(id_field, properties.get("id", feature.get("id")))
+        ids.append(str(claim_id) if claim_id is not None else str(i))
+    return ids
+
+
+def zonal_land_cover(class_raster_path: str, geojson: dict, id_field: str = "claim_id",
+                     geojson_crs: str = "EPSG:4326", block_size: int = ZONAL_BLOCK_SIZE) -> pd.DataFrame:
+    """
+    Per-claim x per-class land cover from one class raster.
+
+    All polygons are burned into a label image (claim index + 1, 0 outside any
+    claim) block by block, and the claim x class pixel-count matrix comes from
+    a single bincount over (claim, class) pairs per block. Where claims overlap,
+    the pixel is counted for the later feature. Claims that fall outside the
+    raster are skipped and get zero area with in_raster False.
+    """
+    features = [f for f in geojson.get("features", []) if geojson_geometries(f)]
+    if not features:
+        raise ValueError("No Polygon or MultiPolygon features in GeoJSON")
+    claim_ids = _claim_ids(features, id_field)
+    n_claims = len(features)
+
+    counts = np.zeros((n_claims + 1) * N_CLASSES, dtype=np.int64)
+
+    with rasterio.open(class_raster_path) as src:
+        geometries = [f["geometry"] for f in features]
+        if src.crs and geojson_crs:
+            geometries = [transform_geom(geojson_crs, src.crs, g) for g in geometries]
+
+        # Bounds of every claim, used to skip claims that don't touch a block
+        claim_bounds = np.array([rasterio.features.bounds(g) for g in geometries])
+        shapes = list(zip(geometries, range(1, n_claims + 1)))
+
+        left, bottom, right, top = src.bounds
+        in_raster = ((claim_bounds[:, 0] < right) & (claim_bounds[:, 2] > left) &
+                     (claim_bounds[:, 1] < top) & (claim_bounds[:, 3] > bottom))
+        if not in_raster.any():
+            raise ValueError("No claim polygon overlaps the class raster")
+        if not in_raster.all():
+            outside = [claim_ids[i] for i in np.flatnonzero(~in_raster)]
+            print(f"⚠️ Skipping {len(outside)} claims outside the class raster: {', '.join(outside[:10])}"
+                  f"{' ...' if len(outside) > 10 else ''}")
+        claim_bounds[~in_raster] = np.nan  # Never touch a block
+
+        # Only read the part of the raster covered by claims, clipped to the raster
+        exact = from_bounds(np.nanmin(claim_bounds[:, 0]), np.nanmin(claim_bounds[:, 1]),
+                            np.nanmax(claim_bounds[:, 2]), np.nanmax(claim_bounds[:, 3]), transform=src.transform)
+        col0, row0 = max(int(np.floor(exact.col_off)), 0), max(int(np.floor(exact.row_off)), 0)
+        col1 = min(int(np.ceil(exact.col_off + exact.width)), src.width)
+        row1 = min(int(np.ceil(exact.row_off + exact.height)), src.height)
+        region = Window(col0, row0, col1 - col0, row1 - row0)
+
+        for by in range(int(region.row_off), int(region.row_off + region.height), block_size):
+            for bx in range(int(region.col_off), int(region.col_off + region.width), block_size):
+                window = Window(bx, by,
+                                min(block_size, int(region.col_off + region.width) - bx),
+                                min(block_size, int(region.row_off + region.height) - by))
+
+                left, bottom, right, top = rasterio.windows.bounds(window, src.transform)
+                touching = ((claim_bounds[:, 0] <= right) & (claim_bounds[:, 2] >= left) &
+                            (claim_bounds[:, 1] <= top) & (claim_bounds[:, 3] >= bottom))
+                if not touching.any():
+                    continue
+
+                classes = src.read(1, window=window)
+                labels = rasterize([shapes[i] for i in np.flatnonzero(touching)],
+                                   out_shape=classes.shape, transform=src.window_transform(window),
+                                   fill=0, dtype="int32")
+
+                valid = (labels > 0) & (classes < N_CLASSES)
+                pairs = labels[valid].astype(np.int64) * N_CLASSES + classes[valid]
+                counts += np.bincount(pairs, minlength=counts.size)
+
+        # Pixel area per claim (varies with latitude on geographic rasters)
+        areas_m2 = np.array([pixel_area_m2(src, [g]) for g in geometries])
+
+    matrix = counts.reshape(n_claims + 1, N_CLASSES)[1:]
+    hectares = matrix * areas_m2[:, None] / 10000.0
+    totals = matrix.sum(axis=1, keepdims=True)
+    percentages = np.divide(matrix * 100.0, totals, out=np.zeros(matrix.shape), where=totals > 0)
+
+    table = pd.DataFrame({"claim_id": claim_ids, "in_raster": in_raster,
+                          "total_hectares": hectares.sum(axis=1).round(4)})
+    for i, name in enumerate(CLASS_NAMES):
+        table[f"{name}_ha"] = hectares[:, i].round(4)
+    for i, name in enumerate(CLASS_NAMES):
+        table[f"{name}_pct"] = percentages[:, i].round(2)
+    return table
+
+
+def write_table(table: pd.DataFrame, output_path: str):
+    """Write the claim table as Parquet or CSV depending on the extension"""
+    if output_path.endswith(".parquet"):
+        table.to_parquet(output_path, index=False)
+    else:
+        table.to_csv(output_path, index=False)
+
+
+def main():
+    import json
+
+    parser = argparse.ArgumentParser(description="Land-cover breakdown for many claim polygons")
+    parser.add_argument("claims", help="GeoJSON FeatureCollection of claim polygons")
+    parser.add_argument("class_raster", help="Segmented class raster (one band of class ids)")
+    parser.add_argument("output", help="Output table (.csv or .parquet)")
+    parser.add_argument("--id-field", default="claim_id", help="Feature property holding the claim id")
+    parser.add_argument("--crs", default="EPSG:4326", help="CRS of the GeoJSON coordinates")
+    args = parser.parse_args()
+
+    with open(args.claims, "r", encoding="utf-8") as f:
+        geojson = json.load(f)
+
+    table = zonal_land_cover(args.class_raster, geojson, id_field=args.id_field, geojson_crs=args.crs)
+    write_table(table, args.output)
+    print(f"✅ Land cover for {len(table)} claims saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
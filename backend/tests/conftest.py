@@ -0,0 +1,9 @@
+import os
+import sys
+
+# The backend modules are flat scripts that import their neighbours by name
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for folder in ("OCR-NER", "DSS", "asset-map"):
+    path = os.path.join(BACKEND_DIR, folder)
+    if path not in sys.path:
+        sys.path.insert(0, path)
@@ -0,0 +1,144 @@
+import numpy as np
+import pytest
+
+rasterio = pytest.importorskip("rasterio")
+torch = pytest.importorskip("torch")
+AssetMapInference = pytest.importorskip("AssetMapInference")
+
+from rasterio.transform import from_origin
+
+
+class ConstantNetwork(torch.nn.Module):
+    """Predicts class 7 (agriculture) everywhere"""
+
+    def forward(self, batch):
+        logits = torch.zeros(batch.shape[0], AssetMapInference.N_CLASSES, *batch.shape[2:])
+        logits[:, 7] = 1.0
+        return logits
+
+
+@pytest.fixture
+def small_raster(tmp_path):
+    """64x64 RGB GeoTIFF covering lon 80.00-80.064, lat 20.00-20.064"""
+    path = tmp_path / "claim.tif"
+    data = np.random.default_rng(0).integers(0, 255, size=(3, 64, 64), dtype=np.uint8)
+    with rasterio.open(path, "w", driver="GTiff", width=64, height=64, count=3, dtype="uint8",
+                       crs="EPSG:4326", transform=from_origin(80.0, 20.064, 0.001, 0.001)) as dst:
+        dst.write(data)
+    return str(path)
+
+
+def square(lon, lat, size):
+    return {"type": "Polygon", "coordinates": [[
+        [lon, lat], [lon + size, lat], [lon + size, lat + size], [lon, lat + size], [lon, lat]
+    ]]}
+
+
+def test_polygon_inside_raster_counts_only_claim_pixels(small_raster):
+    result = AssetMapInference.polygon_land_cover(ConstantNetwork(), small_raster, square(80.01, 20.01, 0.02),
+                                                  tile_size=32, overlap=8, block_size=32)
+
+    assert result["class_counts"].sum() == pytest.approx(400, abs=60)
+    assert result["class_percentages"][7] == pytest.approx(100.0)
+
+
+def test_polygon_outside_raster_is_a_clear_error(small_raster):
+    with pytest.raises(ValueError, match="does not overlap"):
+        AssetMapInference.polygon_land_cover(ConstantNetwork(), small_raster, square(85.0, 25.0, 0.01),
+                                             tile_size=32, overlap=8, block_size=32)
+
+
+def test_reuploaded_imagery_hits_tile_cache(small_raster, tmp_path):
+    from tile_cache import ClassMapTileCache
+
+    class CountingNetwork(ConstantNetwork):
+        calls = 0
+
+        def forward(self, batch):
+            CountingNetwork.calls += 1
+            return super().forward(batch)
+
+    reupload = tmp_path / "upload_2.tif"
+    reupload.write_bytes(open(small_raster, "rb").read())
+    cache = ClassMapTileCache(str(tmp_path / "tiles"))
+    claim = square(80.01, 20.01, 0.02)
+
+    first = AssetMapInference.polygon_land_cover(CountingNetwork(), small_raster, claim, tile_size=32, overlap=8,
+                                                 block_size=32, tile_cache=cache, model_version="v1")
+    calls = CountingNetwork.calls
+    second = AssetMapInference.polygon_land_cover(CountingNetwork(), str(reupload), claim, tile_size=32, overlap=8,
+                                                  block_size=32, tile_cache=cache, model_version="v1")
+
+    assert CountingNetwork.calls == calls
+    assert cache.hits > 0
+    assert (second["class_counts"] == first["class_counts"]).all()
+
+
+@pytest.fixture
+def class_raster(tmp_path):
+    """64x64 class raster, class 7 in the west half and class 2 in the east half"""
+    path = tmp_path / "classes.tif"
+    classes = np.full((64, 64), 7, dtype=np.uint8)
+    classes[:, 32:] = 2
+    with rasterio.open(path, "w", driver="GTiff", width=64, height=64, count=1, dtype="uint8",
+                       crs="EPSG:4326", transform=from_origin(80.0, 20.064, 0.001, 0.001)) as dst:
+        dst.write(classes, 1)
+    return str(path)
+
+
+def test_zonal_stats_skips_claims_outside_raster(class_raster):
+    from zonal_stats import zonal_land_cover
+
+    claims = {"type": "FeatureCollection", "features": [
+        {"type": "Feature", "properties": {"claim_id": "inside"}, "geometry": square(80.005, 20.01, 0.02)},
+        {"type": "Feature", "properties": {"claim_id": "outside"}, "geometry": square(85.0, 25.0, 0.01)},
+    ]}
+    table = zonal_land_cover(class_raster, claims, block_size=32).set_index("claim_id")
+
+    assert table.loc["inside", "in_raster"]
+    assert table.loc["inside", "total_hectares"] > 0
+    assert not table.loc["outside", "in_raster"]
+    assert table.loc["outside", "total_hectares"] == 0
+
+
+def test_zonal_stats_rejects_batch_entirely_outside_raster(class_raster):
+    from zonal_stats import zonal_land_cover
+
+    claims = {"type": "FeatureCollection", "features": [
+        {"type": "Feature", "properties": {"claim_id": "outside"}, "geometry": square(85.0, 25.0, 0.01)},
+    ]}
+    with pytest.raises(ValueError, match="No claim polygon overlaps"):
+        zonal_land_cover(class_raster, claims)
+
+
+class BrightnessNetwork(torch.nn.Module):
+    """Per-pixel classifier: class 7 where the red channel is above 0.5, class 2 elsewhere"""
+
+    def forward(self, batch):
+        logits = torch.zeros(batch.shape[0], AssetMapInference.N_CLASSES, *batch.shape[2:])
+        logits[:, 7] = (batch[:, 0] > 0.5).float()
+        logits[:, 2] = (batch[:, 0] <= 0.5).float()
+        return logits
+
+
+def test_uint16_predictions_do_not_depend_on_block_size(tmp_path):
+    path = tmp_path / "uint16.tif"
+    # 12-bit data in uint16, darker in the west than in the east
+    data = np.tile(np.linspace(0, 4095, 96, dtype=np.uint16), (3, 64, 1))
+    with rasterio.open(path, "w", driver="GTiff", width=96, height=64, count=3, dtype="uint16",
+                       crs="EPSG:4326", transform=from_origin(80.0, 20.064, 0.001, 0.001)) as dst:
+        dst.write(data)
+
+    class_maps = []
+    for block_size in (32, 96):
+        with rasterio.open(path) as src:
+            class_map = np.zeros((64, 96), dtype=np.uint8)
+            for window, block in AssetMapInference._iter_class_blocks(
+                    BrightnessNetwork(), src, rasterio.windows.Window(0, 0, 96, 64), torch.device("cpu"),
+                    32, 8, block_size, 4):
+                rows, cols = window.toslices()
+                class_map[rows, cols] = block
+        class_maps.append(class_map)
+
+    assert (class_maps[0] == class_maps[1]).all()
+    assert (class_maps[0][:, :40] == 2).all() and (class_maps[0][:, 56:] == 7).all()
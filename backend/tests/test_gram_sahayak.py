@@ -0,0 +1,46 @@
+import pytest
+
+pytest.importorskip("google.generativeai")
+
+from recommendation_cache import RecommendationCache
+from result_store import ResultStore
+from test1 import GramSahayakAgent
+
+
+def profile(name):
+    return {
+        "holder_name": name,
+        "social_category": "ST",
+        "fra_right_type": "Individual Forest Rights",
+        "land_use_primary": "Agriculture",
+        "water_access": "Limited",
+        "land_use_distribution": {"Agriculture": 62.5, "Forest": 30.0},
+        "location": {"district": "Chamba", "state": "Himachal Pradesh"}
+    }
+
+
+@pytest.fixture
+def agent(tmp_path, monkeypatch):
+    agent = GramSahayakAgent(api_key="test")
+    agent.recommendation_cache = RecommendationCache(agent.rule_engine, ResultStore("recommendations", str(tmp_path)))
+    calls = []
+
+    def narrative_stream(profile, developer_json, usage=None):
+        calls.append(profile)
+        yield "Namaste {holder_name}, "
+        yield "here are your schemes."
+
+    monkeypatch.setattr(agent, "_narrative_stream", narrative_stream)
+    agent.narrative_calls = calls
+    return agent
+
+
+def test_equivalent_profile_reuses_cached_report(agent):
+    first = agent.analyze_profile_with_search(profile_data=profile("Sita Devi"))
+    second = agent.analyze_profile_with_search(profile_data=profile("Ram Lal"))
+
+    assert first["analysis_metadata"]["recommendation_cache"] == "miss"
+    assert second["analysis_metadata"]["recommendation_cache"] == "hit"
+    assert "prompt_usage" not in second["analysis_metadata"]
+    assert "Ram Lal" in second["user_report"]
+    assert len(agent.narrative_calls) == 1
@@ -0,0 +1,62 @@
+import multiprocessing
+
+from result_store import SchemeAnalysisRepository
+
+
+def save_analyses(output_dir, prefix, count, compact_after):
+    repository = SchemeAnalysisRepository(output_dir, compact_after=compact_after)
+    for i in range(count):
+        repository.save({"claimant_name": f"{prefix} {i}", "processing_timestamp": f"2024-01-01T00:00:{i:02d}"},
+                        claim_id=f"{prefix}-{i}")
+
+
+def save_from_two_processes(output_dir, count, compact_after):
+    context = multiprocessing.get_context("spawn")
+    workers = [context.Process(target=save_analyses, args=(output_dir, prefix, count, compact_after))
+               for prefix in ("A", "B")]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(60)
+        assert worker.exitcode == 0
+
+
+def test_two_processes_keep_every_entry(tmp_path):
+    save_from_two_processes(str(tmp_path), 40, 1000)
+
+    repository = SchemeAnalysisRepository(str(tmp_path))
+    assert repository.stats()["claims"] == 80
+    assert repository.get(claim_id="A-39")["claimant_name"] == "A 39"
+    assert repository.get(claimant_name="B 7")["claim_id"] == "B-7"
+
+
+def test_compaction_under_concurrent_saves(tmp_path):
+    save_from_two_processes(str(tmp_path), 40, 7)
+
+    repository = SchemeAnalysisRepository(str(tmp_path))
+    stats = repository.stats()
+    assert stats["claims"] == 80
+    assert stats["log_entries"] < 7
+    assert len(list(tmp_path.glob("scheme_index.*.log"))) == 1
+
+
+def test_reader_sees_saves_from_another_instance(tmp_path):
+    reader = SchemeAnalysisRepository(str(tmp_path), compact_after=3)
+    writer = SchemeAnalysisRepository(str(tmp_path), compact_after=3)
+    assert reader.get() is None
+
+    for i in range(5):
+        writer.save({"claimant_name": "Sita", "processing_timestamp": f"2024-01-0{i + 1}"}, claim_id=f"C{i}")
+        assert reader.get(claimant_name="Sita")["claim_id"] == f"C{i}"
+    assert reader.stats()["claims"] == 5
+
+
+def test_existing_analyses_are_indexed(tmp_path):
+    save_analyses(str(tmp_path), "A", 3, 1000)
+    for path in tmp_path.glob("scheme_index*"):
+        path.unlink()
+
+    repository = SchemeAnalysisRepository(str(tmp_path))
+    assert repository.stats()["claims"] == 3
+    repository.save({"claimant_name": "New", "processing_timestamp": "2025"}, claim_id="N")
+    assert SchemeAnalysisRepository(str(tmp_path)).stats()["claims"] == 4
@@ -0,0 +1,35 @@
+import pytest
+
+from scheme_catalogue import GENERIC_SCHEME_INFO, SchemeCatalogue
+
+
+@pytest.fixture(scope="module")
+def catalogue():
+    return SchemeCatalogue.load()
+
+
+@pytest.mark.parametrize("name, key", [
+    ("PM-KISAN", "PM-KISAN"),
+    ("PM Fasal Bima", "PM Fasal Bima"),
+    ("Pradhan Mantri Fasal Bima Yojana (PMFBY)", "PM Fasal Bima"),
+    ("Kisan Samman", "PM-KISAN"),
+    ("PM Kisaan", "PM-KISAN"),
+    ("Skill India", "Skill India"),
+    ("Matsya Sampda", "PM Matsya Sampada"),
+    ("Rural Employment Guarantee Scheme", "MGNREGA"),
+])
+def test_known_names_match(catalogue, name, key):
+    assert catalogue.lookup(name)["key"] == key
+
+
+@pytest.mark.parametrize("name", [
+    "PM Kisan Maandhan",
+    "PM Yojana",
+    "National Mission",
+    "National Rural Livelihood Mission",
+    "Mission",
+    "PM",
+])
+def test_near_miss_names_do_not_match(catalogue, name):
+    assert catalogue.lookup(name) is None
+    assert catalogue.info(name) == {"official_name": name, **GENERIC_SCHEME_INFO}
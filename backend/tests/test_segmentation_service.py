@@ -0,0 +1,123 @@
+import asyncio
+import threading
+
+import numpy as np
+import pytest
+
+from segmentation_service import LocalSegmentationService, RemoteSegmentationService, SegmentationService
+
+
+class FakeClient:
+    """Stands in for gradio_client.Client; counts its calls and can be told to fail"""
+
+    created = []
+
+    def __init__(self, space, error=None):
+        self.space = space
+        self.error = error
+        self.calls = 0
+        FakeClient.created.append(self)
+
+    def predict(self, input_image, api_name):
+        self.calls += 1
+        if self.error:
+            raise self.error
+        return input_image + ".png", {"Tree": 60.0, "Water": 40.0}
+
+
+@pytest.fixture(autouse=True)
+def reset_clients():
+    FakeClient.created = []
+
+
+def images(tmp_path, count):
+    paths = []
+    for i in range(count):
+        path = tmp_path / f"image_{i}.png"
+        path.write_bytes(bytes([i]) * 16)
+        paths.append(str(path))
+    return paths
+
+
+def test_base_service_is_abstract():
+    with pytest.raises(TypeError):
+        SegmentationService()
+
+
+def test_remote_service_reuses_pooled_client(tmp_path):
+    service = RemoteSegmentationService(space="stub", max_concurrency=2, client_factory=FakeClient)
+
+    async def run():
+        return [await service.segment(path) for path in images(tmp_path, 3)]
+
+    results = asyncio.run(run())
+
+    assert len(FakeClient.created) == 1
+    assert FakeClient.created[0].calls == 3
+    assert FakeClient.created[0].space == "stub"
+    assert results[0]["land_cover_percentages"] == {"Tree": 60.0, "Water": 40.0}
+    assert results[0]["annotated_image"].endswith("image_0.png.png")
+    assert service.stats()["clients"] == 1
+
+
+def test_remote_service_caches_identical_images(tmp_path):
+    service = RemoteSegmentationService(space="stub", client_factory=FakeClient)
+    first, copy = images(tmp_path, 1)[0], str(tmp_path / "copy.png")
+    with open(first, "rb") as src, open(copy, "wb") as dst:
+        dst.write(src.read())
+
+    async def run():
+        return await service.segment(first), await service.segment(copy)
+
+    a, b = asyncio.run(run())
+
+    assert a is b
+    assert FakeClient.created[0].calls == 1
+    assert (service.cache_hits, service.cache_misses) == (1, 1)
+
+
+def test_remote_service_passes_client_errors_through(tmp_path):
+    error = ConnectionError("Space is sleeping")
+    service = RemoteSegmentationService(space="stub", max_concurrency=1,
+                                        client_factory=lambda space: FakeClient(space, error))
+    path = images(tmp_path, 1)[0]
+
+    async def run():
+        for _ in range(2):
+            with pytest.raises(ConnectionError, match="sleeping"):
+                await service.segment(path)
+
+    asyncio.run(run())
+
+    # The failed client went back to the pool and the concurrency slot was released
+    assert len(FakeClient.created) == 1
+    assert FakeClient.created[0].calls == 2
+    assert service.cache_misses == 2
+
+
+def test_remote_service_times_out(tmp_path):
+    release = threading.Event()
+
+    class SlowClient(FakeClient):
+        def predict(self, input_image, api_name):
+            release.wait(5)
+            return super().predict(input_image, api_name)
+
+    service = RemoteSegmentationService(space="stub", timeout=0.1, client_factory=SlowClient)
+    try:
+        with pytest.raises(TimeoutError):
+            asyncio.run(service.segment(images(tmp_path, 1)[0]))
+    finally:
+        release.set()
+
+
+def test_local_service_runs_segmenter(tmp_path):
+    class FakeSegmenter:
+        def predict(self, image_path):
+            return {"class_map": np.zeros((2, 2), dtype=np.uint8), "class_percentages": {"Background": 100.0}}
+
+    service = LocalSegmentationService(FakeSegmenter(), lambda class_map: np.stack([class_map] * 3, axis=-1))
+    result = asyncio.run(service.segment(images(tmp_path, 1)[0]))
+
+    assert result["land_cover_percentages"] == {"Background": 100.0}
+    assert result["annotated_rgb"].shape == (2, 2, 3)
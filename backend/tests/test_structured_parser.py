@@ -0,0 +1,101 @@
+import cv2
+import numpy as np
+import pytest
+
+structured_parser = pytest.importorskip("structured_parser")
+
+
+@pytest.fixture
+def parser():
+    parser = structured_parser.StructuredDocumentParser.__new__(structured_parser.StructuredDocumentParser)
+    parser._tesseract_languages = ['eng', 'hin']
+    return parser
+
+
+def blank_page(width=1400, height=420):
+    return np.full((height, width), 255, dtype=np.uint8)
+
+
+def devanagari_like_word(page, x, y, glyphs, size=28):
+    """A word in the shape of Devanagari: a headline with glyph bodies hanging from it"""
+    glyph_width = int(size * 0.7)
+    cv2.line(page, (x, y), (x + glyphs * glyph_width, y), 0, 2)
+    for i in range(glyphs):
+        left = x + i * glyph_width
+        cv2.line(page, (left + glyph_width - 4, y), (left + glyph_width - 4, y + size), 0, 2)
+        cv2.ellipse(page, (left + glyph_width // 2 - 2, y + size // 2), (glyph_width // 3, size // 4), 0, 0, 360, 0, 2)
+    return x + glyphs * glyph_width
+
+
+def test_english_table_is_not_devanagari(parser):
+    page = blank_page()
+    rows = ["Name of the holder of forest rights", "Village Gram Sabha and Panchayat",
+            "Area claimed in hectares", "Description of boundaries"]
+    for i, text in enumerate(rows):
+        top = 30 + i * 90
+        cv2.rectangle(page, (20, top), (1380, top + 90), 0, 2)
+        cv2.line(page, (760, top), (760, top + 90), 0, 2)
+        cv2.putText(page, text, (40, top + 55), cv2.FONT_HERSHEY_SIMPLEX, 1.0, 0, 2)
+        cv2.putText(page, text.split()[0].upper(), (790, top + 55), cv2.FONT_HERSHEY_SIMPLEX, 1.0, 0, 2)
+
+    assert parser._devanagari_word_ratio(page) < 0.05
+    assert parser.detect_ocr_language(page) == 'eng'
+
+
+def test_boxed_all_caps_fields_are_not_devanagari(parser):
+    page = blank_page(height=300)
+    for i, text in enumerate(["TITLE FOR FOREST LAND", "DISTRICT TRIBAL WELFARE OFFICER"]):
+        (w, h), _ = cv2.getTextSize(text, cv2.FONT_HERSHEY_DUPLEX, 1.2, 3)
+        cv2.putText(page, text, (50, 80 + i * 120), cv2.FONT_HERSHEY_DUPLEX, 1.2, 0, 3)
+        cv2.rectangle(page, (40, 80 + i * 120 - h - 10), (60 + w, 80 + i * 120 + 12), 0, 2)
+
+    assert parser.detect_ocr_language(page) == 'eng'
+
+
+def test_headline_words_are_devanagari(parser):
+    page = blank_page(height=200)
+    x = 40
+    for glyphs in (3, 5, 2, 4, 6):
+        x = devanagari_like_word(page, x, 60, glyphs) + 25
+    x = 40
+    for glyphs in (4, 2, 5, 3):
+        x = devanagari_like_word(page, x, 130, glyphs) + 25
+
+    assert parser.detect_ocr_language(page) == 'hin'
+
+
+def test_mixed_page_uses_both_languages(parser):
+    page = blank_page(height=260)
+    x = 40
+    for glyphs in (3, 5, 4):
+        x = devanagari_like_word(page, x, 60, glyphs) + 25
+    for i, text in enumerate(["Name of the holder", "Village and Gram Panchayat"]):
+        cv2.putText(page, text, (40, 160 + i * 60), cv2.FONT_HERSHEY_SIMPLEX, 1.0, 0, 2)
+
+    ratio = parser._devanagari_word_ratio(page)
+    assert 0.05 <= ratio <= 0.85
+    assert parser.detect_ocr_language(page) == 'eng+hin'
+
+
+@pytest.mark.parametrize("ratio, language", [
+    (0.0, 'eng'), (0.049, 'eng'), (0.05, 'eng+hin'), (0.85, 'eng+hin'), (0.851, 'hin'), (1.0, 'hin'),
+])
+def test_language_thresholds(parser, monkeypatch, ratio, language):
+    monkeypatch.setattr(parser, "_devanagari_word_ratio", lambda binary: ratio)
+    assert parser.detect_ocr_language(blank_page()) == language
+
+
+def test_without_hindi_pack_reads_english(parser):
+    parser._tesseract_languages = ['eng']
+    page = blank_page(height=200)
+    devanagari_like_word(page, 40, 60, 5)
+
+    assert parser.detect_ocr_language(page) == 'eng'
+
+
+def test_failed_script_check_falls_back_to_english(parser, monkeypatch):
+    def broken(binary):
+        raise cv2.error("connected components failed")
+
+    monkeypatch.setattr(parser, "_devanagari_word_ratio", broken)
+    assert parser.detect_ocr_language(blank_page()) == 'eng'